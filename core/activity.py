@@ -0,0 +1,133 @@
+# core/activity.py
+"""Buffered ActivityLog writer.
+
+``log()`` is what views and services call instead of
+``ActivityLog.objects.create``. Entries carry structured fields next to the
+free-text description: the action, the actor (``ActivityLog.user``) and the
+object they concern (``object_type`` / ``object_id``).
+
+With ``ACTIVITY_LOG_BUFFERED`` on, entries are kept in a per-process buffer
+and written with one ``bulk_create`` when ``ACTIVITY_LOG_BUFFER_SIZE`` entries
+are waiting, ``ACTIVITY_LOG_FLUSH_SECONDS`` after the first one arrived (a
+daemon timer), or at interpreter exit. A mutation therefore no longer pays for
+its own log INSERT and SQLite write lock. An entry logged inside a
+transaction joins the buffer when that transaction commits and is dropped if
+it rolls back. Timestamps are taken when the entry is logged, not when it is
+flushed.
+
+With the setting off (the default), ``log()`` saves the row straight away.
+A flush that hits a database error puts its entries back and re-arms the
+timer, so they are retried without waiting for the next ``log()``.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_buffer = []
+_timer = None
+
+
+def _buffered():
+    return getattr(settings, 'ACTIVITY_LOG_BUFFERED', False)
+
+
+def _buffer_size():
+    return max(1, int(getattr(settings, 'ACTIVITY_LOG_BUFFER_SIZE', 50)))
+
+
+def _flush_seconds():
+    return float(getattr(settings, 'ACTIVITY_LOG_FLUSH_SECONDS', 2))
+
+
+def actor(request):
+    """Username of the authenticated user behind ``request``, else None."""
+    user = getattr(request, 'user', None)
+    return user.get_username() if user is not None and user.is_authenticated else None
+
+
+def log(action, description='', actor=None, obj=None, object_type=None, object_id=None):
+    """Record an activity; ``obj`` (a model instance) fills ``object_type`` / ``object_id``."""
+    if obj is not None:
+        object_type = object_type or obj._meta.model_name
+        object_id = obj.pk if object_id is None else object_id
+    entry = ActivityLog(
+        action=action, description=description, user=actor or None, timestamp=timezone.now(),
+        object_type=object_type, object_id=None if object_id is None else str(object_id),
+    )
+    if not _buffered():
+        entry.save()
+        return entry
+    # Outside a transaction this runs at once
+    transaction.on_commit(lambda: _enqueue(entry))
+    return entry
+
+
+def pending():
+    """Entries waiting in the buffer."""
+    with _lock:
+        return len(_buffer)
+
+
+def _start_timer():
+    """Arm the flush timer unless it is already running; call with ``_lock`` held."""
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(_flush_seconds(), _flush_on_timer)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _enqueue(entry):
+    with _lock:
+        _buffer.append(entry)
+        full = len(_buffer) >= _buffer_size()
+        if not full:
+            _start_timer()
+    if full:
+        flush()
+
+
+def flush():
+    """Write every buffered entry with one bulk_create; returns how many were written."""
+    global _timer
+    with _lock:
+        entries = _buffer[:]
+        _buffer.clear()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if not entries:
+        return 0
+    try:
+        ActivityLog.objects.bulk_create(entries)
+    except DatabaseError:
+        # Keep them for the next flush rather than losing the audit trail (e.g. database locked)
+        logger.exception("Activity log flush failed; %d entries kept for the next attempt", len(entries))
+        with _lock:
+            _buffer[:0] = entries
+            _start_timer()
+        return 0
+    return len(entries)
+
+
+def _flush_on_timer():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        flush()
+    finally:
+        # The timer thread opened its own connection; do not leave it behind
+        connections.close_all()
+
+
+atexit.register(flush)
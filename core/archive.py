@@ -0,0 +1,194 @@
+# core/archive.py
+"""Move closed academic years out of the hot tables.
+
+IssueRecord, Enrollment and PendingReport rows of an academic year, and the
+ActivityLog rows whose timestamp falls in it (June to June, see
+``ACADEMIC_YEAR_START_MONTH``), are copied into the ``Archived*`` tables with
+their ids unchanged and then deleted from the hot tables. Both steps are raw
+``INSERT ... SELECT`` / ``DELETE`` statements over id chunks, so neither the
+cascade collector nor per-row signals run. PendingItem rows of the year are
+dropped: they are derived, and the archived PendingReport rows keep the
+year's pending snapshot. ``ArchiveManifest`` records what moved per table.
+
+Reads stay transparent: ``model_for(IssueRecord, academic_year)`` returns
+the archive model when that year has been archived, and the report views use
+it (``/api/activity-logs/?academic_year=`` for the moved logs), so day-to-day
+queries only scan current cohorts while old years remain available on demand.
+An archived year is closed: the issue endpoints refuse writes into it.
+
+Each year moves in one transaction, so a failure leaves it entirely in the
+hot tables with no manifest rows.
+
+A year is only archived once it is quiet (no issues in the last
+``QUIET_DAYS`` days) unless ``force`` is given. Archiving is repeatable: late
+rows are moved on the next run and added to the manifest.
+"""
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import activity
+from .backfill import normalize_academic_year
+from .models import (
+    ActivityLog, ArchivedActivityLog, ArchivedEnrollment, ArchivedIssueRecord, ArchivedPendingReport,
+    ArchiveManifest, Enrollment, IssueRecord, PendingItem, PendingReport,
+)
+
+BATCH_SIZE = 2000
+QUIET_DAYS = 30
+ACADEMIC_YEAR_START_MONTH = 6
+
+# Hot model -> archive model, in the order they are moved
+ARCHIVE_MODELS = {
+    IssueRecord: ArchivedIssueRecord,
+    Enrollment: ArchivedEnrollment,
+    PendingReport: ArchivedPendingReport,
+    ActivityLog: ArchivedActivityLog,
+}
+
+
+class ArchiveError(Exception):
+    """The academic year cannot be archived (missing, or still in use)."""
+
+
+def is_archived(academic_year):
+    academic_year = normalize_academic_year(academic_year)
+    return bool(academic_year) and ArchiveManifest.objects.filter(academic_year=academic_year).exists()
+
+
+def model_for(model, academic_year):
+    """``model``, or its archive model when ``academic_year`` has been archived."""
+    return models_for(academic_year, model)[0]
+
+
+def models_for(academic_year, *models):
+    """``model_for`` for several models at once, with one manifest lookup."""
+    archived = bool(academic_year) and is_archived(academic_year)
+    return tuple(ARCHIVE_MODELS[model] if archived else model for model in models)
+
+
+def manifest():
+    return list(ArchiveManifest.objects.order_by('academic_year', 'table').values(
+        'academic_year', 'table', 'rows', 'first_id', 'last_id', 'archived_at',
+    ))
+
+
+def _variants(model, academic_year):
+    """Stored spellings of ``academic_year`` in ``model`` ('2023/24', '2023-2024', ...)."""
+    stored = model.objects.values_list('academic_year', flat=True).distinct()
+    return [value for value in stored if value and normalize_academic_year(value) == academic_year]
+
+
+def _span(academic_year):
+    """[start, end) timestamps of an academic year such as '2023-2024', or None if it does not parse."""
+    start, _, end = academic_year.partition('-')
+    if not (start.isdigit() and end.isdigit()):
+        return None
+    tz = timezone.get_current_timezone()
+    return (datetime(int(start), ACADEMIC_YEAR_START_MONTH, 1, tzinfo=tz),
+            datetime(int(end), ACADEMIC_YEAR_START_MONTH, 1, tzinfo=tz))
+
+
+def _rows(model, academic_year):
+    if model is ActivityLog:
+        span = _span(academic_year)
+        if span is None:
+            return model.objects.none()
+        return model.objects.filter(timestamp__gte=span[0], timestamp__lt=span[1])
+    return model.objects.filter(academic_year__in=_variants(model, academic_year))
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _move(model, ids, academic_year, batch_size, say):
+    """Copy ``ids`` into the archive table chunk by chunk, deleting each chunk from ``model`` after it."""
+    archive = ARCHIVE_MODELS[model]
+    quote = connection.ops.quote_name
+    columns = [field.column for field in model._meta.concrete_fields]
+    select = ', '.join(quote(column) for column in columns)
+    insert, literal, params = select, '', []
+    if archive is ArchivedActivityLog:
+        insert, literal, params = f"{select}, {quote('academic_year')}", ', %s', [academic_year]
+    hot_table, archive_table = quote(model._meta.db_table), quote(archive._meta.db_table)
+    size = max(1, min(batch_size, (connection.features.max_query_params or batch_size) - len(params)))
+    moved = 0
+    with connection.cursor() as cursor:
+        for chunk in _chunks(ids, size):
+            marks = ', '.join(['%s'] * len(chunk))
+            cursor.execute(
+                f"INSERT INTO {archive_table} ({insert}) SELECT {select}{literal} FROM {hot_table} WHERE id IN ({marks})",
+                [*params, *chunk],
+            )
+            cursor.execute(f"DELETE FROM {hot_table} WHERE id IN ({marks})", chunk)
+            moved += len(chunk)
+            say(f"{academic_year} {model._meta.db_table}: {moved}/{len(ids)}")
+    return moved
+
+
+def _drop_pending_items(academic_year):
+    variants = _variants(PendingItem, academic_year)
+    if not variants:
+        return 0
+    marks = ', '.join(['%s'] * len(variants))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(PendingItem._meta.db_table)} WHERE academic_year IN ({marks})", variants,
+        )
+        return cursor.rowcount
+
+
+def archive(academic_years, dry_run=False, force=False, batch_size=BATCH_SIZE, progress=None):
+    """Archive each of ``academic_years``; returns per-year, per-table row counts."""
+    say = progress or (lambda message: None)
+    years = list(dict.fromkeys(normalize_academic_year(str(value or '')) for value in academic_years))
+    years = [year for year in years if year]
+    if not years:
+        raise ArchiveError('Provide at least one academic_year.')
+
+    if not force:
+        since = timezone.localdate() - timedelta(days=QUIET_DAYS)
+        busy = sorted(
+            year for year in years
+            if IssueRecord.objects.filter(academic_year__in=_variants(IssueRecord, year), date_issued__gte=since).exists()
+        )
+        if busy:
+            raise ArchiveError(
+                f"Academic year(s) {', '.join(busy)} had issues in the last {QUIET_DAYS} days; "
+                "archive them once they are closed, or pass force."
+            )
+
+    results = []
+    for year in years:
+        tables = {}
+        # One transaction per year: a failure part-way leaves neither moved rows nor a manifest behind
+        with transaction.atomic():
+            for model in ARCHIVE_MODELS:
+                ids = list(_rows(model, year).order_by('id').values_list('id', flat=True))
+                tables[model._meta.db_table] = len(ids)
+                if dry_run or not ids:
+                    continue
+                moved = _move(model, ids, year, batch_size, say)
+                entry, _ = ArchiveManifest.objects.get_or_create(academic_year=year, table=model._meta.db_table)
+                entry.rows += moved
+                entry.first_id = min(filter(None, (entry.first_id, ids[0])))
+                entry.last_id = max(filter(None, (entry.last_id, ids[-1])))
+                entry.save()
+            tables[PendingItem._meta.db_table] = (
+                _rows(PendingItem, year).count() if dry_run else _drop_pending_items(year)
+            )
+        results.append({'academic_year': year, 'tables': tables})
+
+    totals = {}
+    for result in results:
+        for table, rows in result['tables'].items():
+            totals[table] = totals.get(table, 0) + rows
+    if not dry_run and any(totals.values()):
+        activity.log(
+            action='archive_academic_years',
+            description=f"Archived {', '.join(years)}: {sum(totals.values())} rows moved out of the hot tables",
+        )
+    return {'dry_run': dry_run, 'academic_years': results, 'totals': totals}
@@ -0,0 +1,148 @@
+# core/backfill.py
+"""Set-based backfills of Enrollment and DepartmentItemRequirement rows.
+
+Both read what exists in a handful of queries, work out the missing or
+changed rows in memory and write them with chunked bulk_create /
+bulk_update, so the query count depends on the batch size rather than on
+the number of students or departments. Both are safe to repeat.
+Shared by the API views and the management commands.
+"""
+import re
+
+from django.db import transaction
+
+from .models import Department, DepartmentItemRequirement, Enrollment, Item, Student
+from .pending import LEGACY_DEPARTMENT_FIELDS
+from .versioning import bump_table_version
+
+BATCH_SIZE = 2000
+
+LEGACY_ITEMS = (
+    ('2PN', '200 Pages Note Book'),
+    ('2PR', '200 Pages Record'),
+    ('2PO', '200 Pages Observation'),
+    ('1PN', '100 Pages Note Book'),
+    ('1PR', '100 Pages Record'),
+    ('1PO', '100 Pages Observation'),
+)
+
+_DASHES = re.compile(r"[\u2010-\u2015\u2212]")
+_DIGITS = re.compile(r"\d+")
+
+
+def normalize_academic_year(value):
+    """Upper-case, unicode dashes and '/' to '-', no spaces, short end year expanded: '2023/24' -> '2023-2024'."""
+    s = _DASHES.sub('-', (value or '').strip().upper()).replace('/', '-').replace(' ', '')
+    if '-' in s:
+        parts = s.split('-')
+        try:
+            start = int(parts[0][:4])
+            end = parts[1]
+            if len(end) == 2 and end.isdigit():
+                return f"{start}-{int(str(start)[:2] + end)}"
+        except Exception:
+            pass
+    return s
+
+
+def normalize_year(value):
+    """Digits only, without leading zeros: '01' -> '1'; anything without digits is returned stripped."""
+    digits = ''.join(_DIGITS.findall((value or '').strip()))
+    return str(int(digits)) if digits.isdigit() else (value or '').strip()
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _write(label, rows, write, batch_size, say):
+    done = 0
+    for chunk in _chunks(rows, batch_size):
+        write(chunk)
+        done += len(chunk)
+        say(f"{label}: {done}/{len(rows)}")
+
+
+def backfill_enrollments(batch_size=BATCH_SIZE, dry_run=False, progress=None):
+    """One Enrollment per student for their current department and year; returns counts."""
+    say = progress or (lambda message: None)
+    existing = set(Enrollment.objects.values_list('student_id', 'department_id', 'academic_year', 'year'))
+    to_create = []
+    students = skipped = 0
+    for student_id, dept_id, dept_ay, year in Student.objects.values_list(
+        'id', 'department_id', 'department__academic_year', 'year',
+    ).iterator(chunk_size=batch_size):
+        students += 1
+        ay = normalize_academic_year(dept_ay) if dept_id else ''
+        yr = normalize_year(str(year or ''))
+        if not ay or not yr:
+            skipped += 1
+            continue
+        key = (student_id, dept_id, ay, yr)
+        if key not in existing:
+            existing.add(key)
+            to_create.append(Enrollment(student_id=student_id, department_id=dept_id, academic_year=ay, year=yr))
+    say(f"{students} students read, {len(to_create)} enrollments to create")
+
+    if not dry_run:
+        with transaction.atomic():
+            _write('enrollments created', to_create,
+                   lambda chunk: Enrollment.objects.bulk_create(chunk, ignore_conflicts=True), batch_size, say)
+    return {'students': students, 'created': len(to_create), 'skipped': skipped, 'dry_run': dry_run}
+
+
+def backfill_requirements(batch_size=BATCH_SIZE, dry_run=False, progress=None):
+    """Create the legacy items if missing and one requirement per department and legacy item; returns counts.
+
+    Requirement quantities follow the department's legacy allotment columns.
+    """
+    say = progress or (lambda message: None)
+    item_ids = dict(Item.objects.filter(item_code__in=[code for code, _ in LEGACY_ITEMS]).values_list('item_code', 'id'))
+    missing_items = [Item(item_code=code, name=name, quantity=0) for code, name in LEGACY_ITEMS if code not in item_ids]
+
+    with transaction.atomic():
+        if missing_items and not dry_run:
+            Item.objects.bulk_create(missing_items, ignore_conflicts=True)
+            item_ids = dict(Item.objects.filter(item_code__in=[code for code, _ in LEGACY_ITEMS]).values_list('item_code', 'id'))
+            bump_table_version(Item)
+        elif missing_items:
+            # Not created in a dry run, but every department would get a requirement for them
+            item_ids.update({item.item_code: None for item in missing_items})
+
+        existing = {
+            (dept_id, item_id): (req_id, qty)
+            for req_id, dept_id, item_id, qty in DepartmentItemRequirement.objects.filter(
+                item_id__in=item_ids.values()
+            ).values_list('id', 'department_id', 'item_id', 'required_qty')
+        }
+        to_create, to_update = [], []
+        departments = 0
+        for row in Department.objects.values('id', *LEGACY_DEPARTMENT_FIELDS.values()).iterator(chunk_size=batch_size):
+            departments += 1
+            for code, field in LEGACY_DEPARTMENT_FIELDS.items():
+                if code not in item_ids:
+                    continue
+                qty = row[field] or 0
+                current = existing.get((row['id'], item_ids[code]))
+                if current is None:
+                    to_create.append(DepartmentItemRequirement(department_id=row['id'], item_id=item_ids[code], required_qty=qty))
+                elif current[1] != qty:
+                    to_update.append(DepartmentItemRequirement(id=current[0], required_qty=qty))
+        say(f"{departments} departments read, {len(to_create)} requirements to create, {len(to_update)} to update")
+
+        if not dry_run:
+            _write('requirements created', to_create,
+                   lambda chunk: DepartmentItemRequirement.objects.bulk_create(chunk, ignore_conflicts=True), batch_size, say)
+            _write('requirements updated', to_update,
+                   lambda chunk: DepartmentItemRequirement.objects.bulk_update(chunk, ['required_qty']), batch_size, say)
+            if to_create or to_update:
+                bump_table_version(DepartmentItemRequirement)
+
+    return {
+        'departments': departments,
+        'items_created': len(missing_items),
+        'requirements_created': len(to_create),
+        'requirements_updated': len(to_update),
+        'dry_run': dry_run,
+    }
@@ -0,0 +1,202 @@
+# core/caching.py
+"""Read-through cache for reference data used on hot paths.
+
+Three namespaces are cached: the item catalog (code -> id/name), cohort ->
+department resolution and per-department requirement vectors. Each namespace
+has a generation, a ``TableVersion`` counter named ``cache:<namespace>`` next
+to the ETag counters of core/versioning.py; writes to ``Item``, ``Department``
+or ``DepartmentItemRequirement`` bump it (``bump_table_version``, called by
+core/signals.py and by every bulk path), which orphans every old key at once.
+Because the generation lives in the database, a write on one worker process
+invalidates the entries of all of them, whatever the cache backend.
+
+The backend is the Django cache named by ``REFERENCE_CACHE_ALIAS``
+(local memory by default); entries also expire after
+``REFERENCE_CACHE_TIMEOUT`` seconds. Generations are read with one query and
+then remembered for the rest of the request; outside a request they are read
+on every lookup.
+
+Cohort rosters (for the issue counter's distribution sessions) are keyed by
+the students/enrollments change-log version instead: the database triggers
+behind core/sync.py see every write, bulk ones included, so a roster change
+simply produces a new key.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import request_finished, request_started
+from django.db.models import Max
+
+from .models import ChangeLogEntry, Enrollment, Item, Department, DepartmentItemRequirement
+from .versioning import bump_versions, version_stamps
+
+ITEMS = 'items'
+DEPARTMENTS = 'departments'
+REQUIREMENTS = 'requirements'
+ROSTERS = 'rosters'
+NAMESPACES = (ITEMS, DEPARTMENTS, REQUIREMENTS, ROSTERS)
+
+# Which cached namespaces depend on which model
+MODEL_NAMESPACES = {
+    Item: (ITEMS, REQUIREMENTS),
+    Department: (DEPARTMENTS, REQUIREMENTS),
+    DepartmentItemRequirement: (REQUIREMENTS,),
+}
+
+_MISSING = object()
+_request = threading.local()
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'invalidations': 0})
+
+
+def _cache():
+    return caches[getattr(settings, 'REFERENCE_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'REFERENCE_CACHE_TIMEOUT', 300)
+
+
+def _count(namespace, field):
+    with _stats_lock:
+        _stats[namespace][field] += 1
+
+
+def _generation_table(namespace):
+    return f"cache:{namespace}"
+
+
+def _start_request(**kwargs):
+    _request.generations = {}
+
+
+def _end_request(**kwargs):
+    _request.generations = None
+
+
+request_started.connect(_start_request, dispatch_uid='reference_cache_request_started')
+request_finished.connect(_end_request, dispatch_uid='reference_cache_request_finished')
+
+
+def _generation(namespace):
+    memo = getattr(_request, 'generations', None)
+    if memo:
+        return memo[namespace]
+    stamps = version_stamps(*(_generation_table(ns) for ns in NAMESPACES))
+    generations = {ns: stamps[_generation_table(ns)] for ns in NAMESPACES}
+    if memo is not None:
+        memo.update(generations)
+    return generations[namespace]
+
+
+def _get_or_load(namespace, key, loader):
+    cache = _cache()
+    # Hash free-form keys (cohort names contain spaces) so memcached accepts them
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    full_key = f"aims:ref:{namespace}:{_generation(namespace)}:{digest}"
+    value = cache.get(full_key, _MISSING)
+    if value is not _MISSING:
+        _count(namespace, 'hits')
+        return value
+    _count(namespace, 'misses')
+    value = loader()
+    cache.set(full_key, value, _timeout())
+    return value
+
+
+def invalidate(*models):
+    """Drop every cached namespace that depends on one of ``models``."""
+    namespaces = sorted({ns for model in models for ns in MODEL_NAMESPACES.get(model, ())})
+    if not namespaces:
+        return
+    bump_versions(*(_generation_table(ns) for ns in namespaces))
+    if getattr(_request, 'generations', None):
+        # Re-read on the next lookup of this request
+        _request.generations = {}
+    for namespace in namespaces:
+        _count(namespace, 'invalidations')
+
+
+def cache_stats():
+    with _stats_lock:
+        stats = {ns: dict(_stats[ns]) for ns in NAMESPACES}
+    for values in stats.values():
+        lookups = values['hits'] + values['misses']
+        values['hit_ratio'] = round(values['hits'] / lookups, 4) if lookups else None
+    return stats
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# --- Item catalog ---------------------------------------------------------
+
+def item_catalog():
+    """``{item_code.lower(): {'id', 'item_code', 'name'}}`` for every item. Stock levels are not cached."""
+    def load():
+        return {
+            code.lower(): {'id': item_id, 'item_code': code, 'name': name}
+            for item_id, code, name in Item.objects.values_list('id', 'item_code', 'name')
+        }
+    return _get_or_load(ITEMS, 'catalog', load)
+
+
+def resolve_item(item_code):
+    """Catalog entry for ``item_code`` (case-insensitive), or None."""
+    return item_catalog().get((item_code or '').strip().lower())
+
+
+# --- Cohort -> department ---------------------------------------------------
+
+def resolve_department_id(course_code, course, academic_year, year):
+    """Department id for a cohort, matched case-insensitively on all four columns, or None."""
+    parts = [str(value or '').strip() for value in (course_code, course, academic_year, year)]
+    key = '|'.join(part.lower() for part in parts)
+
+    def load():
+        return Department.objects.filter(
+            course_code__iexact=parts[0],
+            course__iexact=parts[1],
+            academic_year__iexact=parts[2],
+            year__iexact=parts[3],
+        ).values_list('id', flat=True).first()
+    return _get_or_load(DEPARTMENTS, key, load)
+
+
+# --- Requirement vectors ----------------------------------------------------
+
+def department_requirements(department_id):
+    """Serialized requirement rows for a department, ordered by item code."""
+    def load():
+        from .serializers import DepartmentItemRequirementSerializer
+
+        qs = DepartmentItemRequirement.objects.filter(
+            department_id=department_id
+        ).select_related('item').order_by('item__item_code')
+        return [dict(row) for row in DepartmentItemRequirementSerializer(qs, many=True).data]
+    return _get_or_load(REQUIREMENTS, str(department_id), load)
+
+
+# --- Cohort rosters ---------------------------------------------------------
+
+def roster_version():
+    """Latest change-log id across students and enrollments; moves on any roster write."""
+    return ChangeLogEntry.objects.filter(table_name__in=('students', 'enrollments')).aggregate(v=Max('id'))['v'] or 0
+
+
+def cohort_roster(department_id, academic_year, year):
+    """Students enrolled in a cohort as ``{'version', 'student_id', 'usn', 'name'}`` columns, ordered by USN."""
+    version = roster_version()
+
+    def load():
+        rows = list(Enrollment.objects.filter(
+            department_id=department_id, academic_year__iexact=academic_year, year=str(year),
+        ).order_by('student__usn').values_list('student_id', 'student__usn', 'student__name').distinct())
+        ids, usns, names = (list(column) for column in zip(*rows)) if rows else ([], [], [])
+        return {'version': version, 'student_id': ids, 'usn': usns, 'name': names}
+    return _get_or_load(ROSTERS, f"{department_id}|{academic_year.lower()}|{year}|{version}", load)
@@ -0,0 +1,83 @@
+# core/exports.py
+"""Server-side CSV / XLSX exports streamed from chunked querysets.
+
+CSV is generated row by row straight into a StreamingHttpResponse. XLSX uses
+openpyxl's write-only mode, which spools rows to a temporary file instead of
+holding a worksheet in memory. The workbook is built when the response starts
+and saved to a ``SpooledTemporaryFile`` (memory up to ``XLSX_SPOOL_BYTES``,
+then disk), which is streamed back in ``XLSX_STREAM_CHUNK`` byte chunks.
+"""
+import csv
+import datetime
+import tempfile
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FILE_TYPES = ('csv', 'xlsx')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+XLSX_STREAM_CHUNK = 64 * 1024
+
+
+class _Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    # Excel has no timezone support; export aware datetimes in local time.
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def _csv_chunks(headers, rows):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'  # BOM so Excel opens UTF-8 CSV correctly
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def csv_response(filename, headers, rows):
+    response = StreamingHttpResponse(_csv_chunks(headers, rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def _xlsx_chunks(headers, rows, sheet_title):
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    from openpyxl.workbook.child import INVALID_TITLE_REGEX
+
+    def value_of(value):
+        value = _cell(value)
+        # openpyxl refuses control characters that XML cannot carry
+        return ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str) else value
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=INVALID_TITLE_REGEX.sub(' ', sheet_title).strip()[:31] or 'Export')
+    sheet.append(headers)
+    for row in rows:
+        sheet.append([value_of(value) for value in row])
+    with tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES) as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while chunk := spool.read(XLSX_STREAM_CHUNK):
+            yield chunk
+
+
+def xlsx_response(filename, headers, rows, sheet_title='Export'):
+    response = StreamingHttpResponse(_xlsx_chunks(headers, rows, sheet_title), content_type=XLSX_CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
+    return response
+
+
+def export_response(file_type, filename, headers, rows, sheet_title='Export'):
+    if file_type == 'xlsx':
+        return xlsx_response(filename, headers, rows, sheet_title=sheet_title)
+    return csv_response(filename, headers, rows)
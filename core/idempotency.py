@@ -0,0 +1,79 @@
+# core/idempotency.py
+"""Idempotency keys for POSTs that counters retry over unreliable networks.
+
+A client sends ``Idempotency-Key: <uuid>`` (or ``idempotency_key`` in a
+queued batch entry). The first successful run stores its response under the
+key together with a fingerprint of the payload; a retry with the same key and
+payload gets that response replayed instead of running again. The row is
+written in the same transaction as the work it describes, so two concurrent
+retries cannot both apply: the second one hits the unique constraint, rolls
+back and replays the first one's response.
+
+Only successful outcomes are stored. A rejected request (validation, stock)
+wrote nothing, so running it again on retry is harmless.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 100
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+
+class KeyReused(Exception):
+    """The key was already used for a different payload."""
+
+
+def request_key(request):
+    """Idempotency key from the request header, or None."""
+    key = (request.headers.get(HEADER) or '').strip()
+    return key or None
+
+
+def fingerprint(payload):
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def stored(scope, keys):
+    """``{key: IdempotencyKey}`` for the keys already used in ``scope`` (one query)."""
+    return {row.key: row for row in IdempotencyKey.objects.filter(scope=scope, key__in=list(keys))}
+
+
+def check(row, payload_fingerprint):
+    if row.fingerprint != payload_fingerprint:
+        raise KeyReused(row.key)
+    return row
+
+
+def replay_response(row):
+    return Response(row.response_body, status=row.status_code, headers={REPLAY_HEADER: 'true'})
+
+
+def conflict_response(key):
+    return Response(
+        {'error': f"Idempotency key {key} was already used for a different request."},
+        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+    )
+
+
+def remember(scope, key, payload_fingerprint, status_code, body):
+    """Store an outcome. Call inside the transaction that did the work; a duplicate raises IntegrityError."""
+    return IdempotencyKey.objects.create(
+        scope=scope, key=key, fingerprint=payload_fingerprint, status_code=status_code, response_body=body,
+    )
+
+
+def purge_expired():
+    """Delete keys older than ``IDEMPOTENCY_KEY_RETENTION_HOURS``; returns the number removed."""
+    hours = getattr(settings, 'IDEMPOTENCY_KEY_RETENTION_HOURS', 72)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - timedelta(hours=hours)).delete()
+    return deleted
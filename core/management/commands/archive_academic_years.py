@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.archive import BATCH_SIZE, ArchiveError, archive, manifest
+
+
+class Command(BaseCommand):
+    help = "Move closed academic years out of the hot tables into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_years', nargs='*', help="Academic years to archive, e.g. 2022-2023")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Count the rows without moving them')
+        parser.add_argument('--force', action='store_true', help='Archive even if the year had issues recently')
+        parser.add_argument('--manifest', action='store_true', help='Only print what has been archived so far')
+
+    def handle(self, *args, **options):
+        if options['manifest'] or not options['academic_years']:
+            for entry in manifest():
+                self.stdout.write(f"  {entry['academic_year']:<12} {entry['table']:<24} {entry['rows']:8d} rows  "
+                                  f"ids {entry['first_id']}-{entry['last_id']}  {entry['archived_at']:%Y-%m-%d %H:%M}")
+            return
+        try:
+            result = archive(
+                options['academic_years'], dry_run=options['dry_run'], force=options['force'],
+                batch_size=max(1, options['batch_size']), progress=self.stdout.write,
+            )
+        except ArchiveError as exc:
+            raise CommandError(str(exc))
+
+        for year in result['academic_years']:
+            for table, rows in year['tables'].items():
+                self.stdout.write(f"  {year['academic_year']:<12} {table:<24} {rows:8d}")
+        verb = 'Would archive' if result['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {sum(result['totals'].values())} rows"))
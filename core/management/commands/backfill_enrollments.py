@@ -1,26 +1,19 @@
 from django.core.management.base import BaseCommand
-from core.models import Student, Enrollment
+from core.backfill import BATCH_SIZE, backfill_enrollments
+
 
 class Command(BaseCommand):
     help = "Backfill Enrollment records for existing Students using their current Department and Year"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per read chunk and per bulk write')
+        parser.add_argument('--dry-run', action='store_true', help='Count what would be created without writing')
+
     def handle(self, *args, **options):
-        created = 0
-        skipped = 0
-        for s in Student.objects.select_related('department').all():
-            dept = s.department
-            if not dept:
-                skipped += 1
-                continue
-            ay = (dept.academic_year or '').strip()
-            year = (s.year or '').strip()
-            # Ensure one enrollment per (student, department, ay, year)
-            obj, was_created = Enrollment.objects.get_or_create(
-                student=s,
-                department=dept,
-                academic_year=ay,
-                year=year,
-            )
-            if was_created:
-                created += 1
-        self.stdout.write(self.style.SUCCESS(f"Backfill complete. Created: {created}, Skipped: {skipped}"))
+        counts = backfill_enrollments(
+            batch_size=max(1, options['batch_size']), dry_run=options['dry_run'], progress=self.stdout.write,
+        )
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfill complete. {verb}: {counts['created']}, Skipped: {counts['skipped']}"
+        ))
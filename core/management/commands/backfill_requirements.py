@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.backfill import BATCH_SIZE, backfill_requirements
+
+
+class Command(BaseCommand):
+    help = "Create the legacy items if missing and DepartmentItemRequirement rows from the Department allotment columns"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per read chunk and per bulk write')
+        parser.add_argument('--dry-run', action='store_true', help='Count what would change without writing')
+
+    def handle(self, *args, **options):
+        counts = backfill_requirements(
+            batch_size=max(1, options['batch_size']), dry_run=options['dry_run'], progress=self.stdout.write,
+        )
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfill complete. Items: {counts['items_created']}. {verb} requirements: "
+            f"{counts['requirements_created']}, updated: {counts['requirements_updated']}"
+        ))
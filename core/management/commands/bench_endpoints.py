@@ -0,0 +1,165 @@
+import json
+import platform
+import statistics
+from datetime import datetime
+from time import perf_counter
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+
+from core.models import User, Student
+from core.synthetic import generate_dataset
+
+DEFAULT_SCALES = '1000,10000,100000'
+UPLOAD_ROWS = 500
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _upload_rows(students):
+    """Half the rows update existing students, half create new ones in the same cohorts."""
+    rows = []
+    for index, s in enumerate(students):
+        dept = s.department
+        usn = s.usn if index % 2 == 0 else f"BU{s.usn[3:]}"
+        rows.append({
+            'usn': usn, 'name': s.name, 'course_code': dept.course_code, 'course': dept.course,
+            'academic_year': dept.academic_year, 'year': dept.year, 'program_type': dept.program_type,
+        })
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Time the hot API endpoints against synthetic datasets at several scales (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default=DEFAULT_SCALES, help='Comma-separated student counts')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per endpoint; best and median are reported')
+        parser.add_argument('--endpoints', default='', help='Comma-separated subset of endpoint names to run')
+        parser.add_argument('--output', default='bench_endpoints.json', help='Where to write the JSON results')
+        parser.add_argument('--compare', default='', help='Earlier results file to print the change against')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(value) for value in options['scales'].split(',') if value.strip()]
+        except ValueError:
+            raise CommandError('--scales must be a comma-separated list of integers')
+        selected = {name.strip() for name in options['endpoints'].split(',') if name.strip()}
+        repeat = max(1, options['repeat'])
+
+        results = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'repeat': repeat,
+            'scales': {},
+        }
+        for scale in scales:
+            self.stdout.write(f"Scale {scale}:")
+            try:
+                with transaction.atomic():
+                    results['scales'][str(scale)] = self._run_scale(scale, repeat, selected)
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        with open(options['output'], 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _cases(self, students):
+        sample = students[len(students) // 2]
+        upload = _upload_rows(students[:UPLOAD_ROWS])
+        issue = {
+            'student_usn': sample.usn,
+            'course_code': sample.department.course_code, 'course': sample.department.course,
+            'academic_year': sample.department.academic_year, 'year': sample.department.year,
+            'issues': [{'item_code': '2PN', 'quantity': 1}, {'item_code': '1PN', 'quantity': 1}],
+        }
+        return [
+            ('bulk_upload', 'post', '/api/students/bulk_upload/', upload),
+            ('issue_create', 'post', '/api/issue-records/', issue),
+            ('student_records', 'get', f'/api/student-records/{sample.usn}/', None),
+            ('generate_pending_reports', 'post', '/api/generate-pending-reports/', {}),
+            ('help_threads', 'get', '/api/help-threads/', None),
+            ('dashboard_summary', 'get', '/api/dashboard-summary/', None),
+        ]
+
+    def _run_scale(self, scale, repeat, selected):
+        start = perf_counter()
+        counts = generate_dataset(
+            students=scale, help_threads=min(200, max(20, scale // 500)), prefix='BEN',
+        )
+        self.stdout.write(f"  dataset ready in {perf_counter() - start:.1f}s")
+
+        admin, _ = User.objects.update_or_create(
+            username='bench_admin',
+            defaults={'role': User.Role.ADMIN, 'approval_status': User.ApprovalStatus.APPROVED, 'is_staff': True},
+        )
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(admin)
+        students = list(Student.objects.select_related('department').filter(usn__startswith='BEN').order_by('id'))
+
+        endpoints = {}
+        for name, method, url, payload in self._cases(students):
+            if selected and name not in selected:
+                continue
+            timings = []
+            counter = _QueryCounter()
+            for _ in range(repeat):
+                counter.count = 0
+                with connection.execute_wrapper(counter):
+                    began = perf_counter()
+                    if method == 'get':
+                        response = client.get(url)
+                    else:
+                        response = client.post(url, data=json.dumps(payload), content_type='application/json')
+                    elapsed = (perf_counter() - began) * 1000
+                timings.append(elapsed)
+            endpoints[name] = {
+                'status': response.status_code,
+                'best_ms': round(min(timings), 2),
+                'median_ms': round(statistics.median(timings), 2),
+                'queries': counter.count,
+                'response_bytes': len(response.content) if not response.streaming else None,
+            }
+            self.stdout.write(
+                f"  {name:<26} {endpoints[name]['best_ms']:10.1f} ms  {counter.count:7d} queries  [{response.status_code}]"
+            )
+        return {'dataset': counts, 'endpoints': endpoints}
+
+    def _compare(self, path, results):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                previous = json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read {path}: {exc}")
+        self.stdout.write(f"Change vs {path} (best_ms):")
+        for scale, current in results['scales'].items():
+            before = previous.get('scales', {}).get(scale, {}).get('endpoints', {})
+            for name, row in current['endpoints'].items():
+                old = before.get(name)
+                if not old or not old.get('best_ms'):
+                    continue
+                change = (row['best_ms'] - old['best_ms']) / old['best_ms'] * 100
+                self.stdout.write(
+                    f"  {scale:>7} {name:<26} {old['best_ms']:10.1f} -> {row['best_ms']:10.1f} ms ({change:+.1f}%)"
+                    f"  queries {old.get('queries')} -> {row['queries']}"
+                )
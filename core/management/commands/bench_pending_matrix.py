@@ -0,0 +1,106 @@
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from core.models import Department, DepartmentItemRequirement, Enrollment, IssueRecord, Item, Student
+from core.pending import compute, pending_for_department
+from core.pending_matrix import build
+from core.versioning import bump_table_version
+
+ACADEMIC_YEAR = '2098-2099'
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Time the NumPy pending matrix against the per-student loop for one academic year (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50000)
+        parser.add_argument('--items', type=int, default=30)
+        parser.add_argument('--departments', type=int, default=40)
+        parser.add_argument('--issues-per-student', type=int, default=4)
+        parser.add_argument('--loop-sample', type=int, default=2000,
+                            help='Students timed with the per-student loop; the result is scaled to the full roster')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per variant; the best time is reported')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options)
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, options):
+        rng = random.Random(11)
+        items = Item.objects.bulk_create([
+            Item(item_code=f'BPM{n:02d}', name=f'Bench item {n}', quantity=0) for n in range(options['items'])
+        ])
+        bump_table_version(Item)
+        depts = Department.objects.bulk_create([
+            Department(course_code=f'BPM{n}', course=f'BENCH MATRIX {n}', academic_year=ACADEMIC_YEAR, year=str(n % 3 + 1))
+            for n in range(options['departments'])
+        ])
+        DepartmentItemRequirement.objects.bulk_create([
+            DepartmentItemRequirement(department=dept, item=item, required_qty=rng.randint(0, 4))
+            for dept in depts for item in items
+        ], batch_size=2000)
+        students = Student.objects.bulk_create([
+            Student(usn=f'BPM{n:07d}', name=f'Bench Student {n}', department=depts[n % len(depts)], year=depts[n % len(depts)].year)
+            for n in range(options['students'])
+        ], batch_size=2000)
+        Enrollment.objects.bulk_create([
+            Enrollment(student=s, department=s.department, academic_year=ACADEMIC_YEAR, year=s.year) for s in students
+        ], batch_size=2000)
+        IssueRecord.objects.bulk_create([
+            IssueRecord(student=s, item_code=rng.choice(items).item_code, qty_issued=rng.randint(1, 2),
+                        academic_year=ACADEMIC_YEAR, year=s.year, status='Issued')
+            for s in students for _ in range(options['issues_per_student'])
+        ], batch_size=2000)
+        self.stdout.write(f"Seeded {len(students)} students x {len(items)} items in {len(depts)} departments")
+
+    def _best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            fn()
+            timings.append(perf_counter() - start)
+        return min(timings)
+
+    def _loop(self, enrollments):
+        # What the student-records view does for one student, repeated per student
+        for enrollment in enrollments:
+            issued = dict(
+                IssueRecord.objects.filter(
+                    student_id=enrollment.student_id, academic_year__iexact=ACADEMIC_YEAR, year=enrollment.year,
+                ).values('item_code').annotate(total=Sum('qty_issued')).values_list('item_code', 'total')
+            )
+            pending_for_department(enrollment.department, issued)
+
+    def _run(self, options):
+        repeat = max(1, options['repeat'])
+        matrix = build(ACADEMIC_YEAR)
+        self.stdout.write(f"Matrix: {len(matrix)} students x {len(matrix.item_codes)} items, "
+                          f"{int(matrix.pending.sum())} pending in total")
+
+        sample = list(Enrollment.objects.select_related('department').filter(
+            academic_year=ACADEMIC_YEAR).order_by('id')[:options['loop_sample']])
+        scale = len(matrix) / len(sample) if sample else 0
+        cases = [
+            ('per-student loop', lambda: self._loop(sample), scale),
+            ('dict engine (pending.compute)', lambda: compute(academic_year=ACADEMIC_YEAR), 1),
+            ('numpy matrix', lambda: build(ACADEMIC_YEAR), 1),
+        ]
+        baseline = None
+        for label, fn, factor in cases:
+            elapsed = self._best(fn, 1 if factor != 1 else repeat) * factor
+            baseline = baseline or elapsed
+            note = ' (scaled from sample)' if factor != 1 else ''
+            self.stdout.write(f"{label:<30} {elapsed * 1000:10.1f} ms   x{baseline / elapsed if elapsed else 0:7.1f}{note}")
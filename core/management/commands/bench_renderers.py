@@ -0,0 +1,42 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import ColumnarJSONRenderer
+
+
+class Command(BaseCommand):
+    help = "Compare payload size and encode time of JSONRenderer and ColumnarJSONRenderer on pending-report shaped rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Number of synthetic rows')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per renderer; the best time is reported')
+
+    def handle(self, *args, **options):
+        rows = [
+            {
+                'id': i, 'student': i, 'usn': f'1AB24CS{i:05d}', 'name': f'Student {i}',
+                'course': 'COMPUTER SCIENCE', 'course_code': 'CS', 'academic_year': '2024-2028', 'year': '1',
+                'qty_2PN': 4, 'qty_2PR': 2, 'qty_2PO': 1, 'qty_1PN': 6, 'qty_1PR': 0, 'qty_1PO': 0,
+            }
+            for i in range(options['rows'])
+        ]
+        repeat = max(1, options['repeat'])
+        results = []
+        for label, renderer in (('json', JSONRenderer()), ('columnar', ColumnarJSONRenderer())):
+            best = None
+            payload = b''
+            for _ in range(repeat):
+                start = perf_counter()
+                payload = renderer.render(rows)
+                elapsed = perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append((label, len(payload), best))
+
+        base_bytes, base_time = results[0][1], results[0][2]
+        for label, size, elapsed in results:
+            self.stdout.write(
+                f"{label:<9} {size / 1024:10.1f} KiB ({size / base_bytes:5.2f}x)   "
+                f"{elapsed * 1000:8.1f} ms ({elapsed / base_time:5.2f}x)"
+            )
@@ -0,0 +1,76 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from core.models import Department, Student, Enrollment
+from core.serializers import StudentSerializer, EnrollmentSerializer
+from core.views import StudentViewSet, EnrollmentViewSet
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare nested serializer output with ?fields= and ?flat=1 for students and enrollments (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Number of synthetic students to create')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per variant; the best time is reported')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = max(1, options['repeat'])
+        try:
+            with transaction.atomic():
+                self._seed(rows)
+                self._run(repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, rows):
+        depts = Department.objects.bulk_create([
+            Department(course_code=f'BN{i}', course=f'BENCH COURSE {i}', academic_year='2099-2100', year='1')
+            for i in range(10)
+        ])
+        students = Student.objects.bulk_create([
+            Student(usn=f'BENCH{i:07d}', name=f'Bench Student {i}', department=depts[i % 10], year='1')
+            for i in range(rows)
+        ])
+        Enrollment.objects.bulk_create([
+            Enrollment(student=s, department=s.department, academic_year='2099-2100', year='1')
+            for s in students
+        ])
+
+    def _best(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = perf_counter()
+            fn()
+            timings.append(perf_counter() - start)
+        return min(timings)
+
+    def _run(self, repeat):
+        factory = RequestFactory()
+        students = Student.objects.select_related('department').filter(usn__startswith='BENCH')
+        enrollments = Enrollment.objects.select_related('student', 'department').filter(academic_year='2099-2100')
+        sparse_request = Request(factory.get('/', {'fields': 'id,usn,name,department_id'}))
+        cases = [
+            ('students nested', lambda: StudentSerializer(list(students), many=True).data),
+            ('students ?fields=', lambda: StudentSerializer(
+                list(students), many=True, context={'request': sparse_request}).data),
+            ('students ?flat=1', lambda: list(students.values(*StudentViewSet.flat_fields))),
+            ('enrollments nested', lambda: EnrollmentSerializer(list(enrollments), many=True).data),
+            ('enrollments ?flat=1', lambda: list(enrollments.values(*EnrollmentViewSet.flat_fields))),
+        ]
+        baseline = {}
+        for label, fn in cases:
+            elapsed = self._best(fn, repeat)
+            table = label.split()[0]
+            baseline.setdefault(table, elapsed)
+            speedup = baseline[table] / elapsed if elapsed else 0
+            self.stdout.write(f"{label:<22} {elapsed * 1000:9.1f} ms   x{speedup:5.1f}")
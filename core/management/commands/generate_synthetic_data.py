@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.synthetic import generate_dataset, purge_dataset
+
+
+class Command(BaseCommand):
+    help = "Generate a realistic synthetic dataset (departments, students, enrollments, issues, orders, help threads)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000, help='Number of students to create')
+        parser.add_argument('--academic-years', type=int, default=2, help='Academic years of departments to create')
+        parser.add_argument('--issues-per-student', type=int, default=2)
+        parser.add_argument('--orders-per-item', type=int, default=5)
+        parser.add_argument('--help-threads', type=int, default=20)
+        parser.add_argument('--messages-per-thread', type=int, default=5)
+        parser.add_argument('--prefix', default='SYN', help='Marker for generated USNs, usernames and course names')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--purge', action='store_true', help='Delete a previously generated dataset with this prefix and exit')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['purge']:
+            with transaction.atomic():
+                deleted = purge_dataset(prefix)
+            self.stdout.write(self.style.SUCCESS(f"Purged synthetic data '{prefix}': {deleted}"))
+            return
+
+        with transaction.atomic():
+            counts = generate_dataset(
+                students=options['students'],
+                academic_years=options['academic_years'],
+                issues_per_student=options['issues_per_student'],
+                orders_per_item=options['orders_per_item'],
+                help_threads=options['help_threads'],
+                messages_per_thread=options['messages_per_thread'],
+                prefix=prefix,
+                seed=options['seed'],
+                progress=lambda message: self.stdout.write(f"  {message}"),
+            )
+        summary = ', '.join(f"{table}: {count}" for table, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Synthetic data '{prefix}' created. {summary}"))
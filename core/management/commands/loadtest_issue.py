@@ -0,0 +1,235 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.models import Max, Sum
+
+from core.models import Student, Item, IssueRecord
+from core.synthetic import ITEMS, generate_dataset, purge_dataset
+
+PREFIX = 'LT'
+# Academic years far from real data so the synthetic departments never collide
+FIRST_YEAR = 1990
+LOCK_MARKERS = ('locked', 'deadlock', 'could not serialize', 'lock timeout')
+ISSUE_CODES = [code for code, _, _ in ITEMS]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class _Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.lock_errors = 0
+        self.transport_errors = 0
+        self.issued = defaultdict(int)  # item_code -> qty confirmed by 201 responses
+
+    def add(self, op, status, elapsed_ms, body=b''):
+        with self.lock:
+            self.latencies[op].append(elapsed_ms)
+            self.statuses[op][status] += 1
+            if status >= 500 and any(marker in body.decode('utf-8', 'replace').lower() for marker in LOCK_MARKERS):
+                self.lock_errors += 1
+
+
+class Command(BaseCommand):
+    help = "Drive concurrent issue / lookup / pending-page traffic at the API and check stock consistency"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='', help='Running server to target; default starts one in-process')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent clients (threads)')
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run')
+        parser.add_argument('--students', type=int, default=500, help='Synthetic students to create for the run')
+        parser.add_argument('--mix', default='issue=4,lookup=4,pending=2', help='Relative weights of the traffic types')
+        parser.add_argument('--think-ms', type=float, default=0.0, help='Pause between a client\'s requests')
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--output', default='', help='Also write the report as JSON to this file')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the synthetic data and stock changes afterwards')
+
+    def handle(self, *args, **options):
+        mix = self._parse_mix(options['mix'])
+        if Student.objects.filter(usn__startswith=PREFIX).exists():
+            raise CommandError(f"Synthetic '{PREFIX}' data already exists; run generate_synthetic_data --purge --prefix {PREFIX} first.")
+
+        self.stdout.write(f"Seeding {options['students']} students...")
+        generate_dataset(students=options['students'], issues_per_student=0, prefix=PREFIX, first_year=FIRST_YEAR)
+        stock_before = dict(Item.objects.values_list('item_code', 'quantity'))
+        last_issue_id = IssueRecord.objects.aggregate(last=Max('id'))['last'] or 0
+        cohorts = list(
+            Student.objects.filter(usn__startswith=PREFIX).values_list(
+                'usn', 'department__course_code', 'department__course', 'department__academic_year', 'department__year'
+            )
+        )
+        connections.close_all()
+
+        server = None
+        base_url = options['base_url'].rstrip('/')
+        if not base_url:
+            server = ThreadedWSGIServer(('127.0.0.1', 0), _QuietHandler, allow_reuse_address=False)
+            server.set_app(get_wsgi_application())
+            # Failed requests are counted in the report; keep per-request tracebacks off the console
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+        self.stdout.write(f"Target {base_url}: {options['clients']} clients for {options['duration']:.0f}s")
+
+        results = _Results()
+        deadline = time.monotonic() + options['duration']
+        workers = [
+            threading.Thread(target=self._client, args=(
+                base_url, cohorts, mix, deadline, options['think_ms'] / 1000.0, results, random.Random(options['seed'] + n),
+            ))
+            for n in range(options['clients'])
+        ]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+        if server:
+            server.shutdown()
+            server.server_close()
+
+        report = self._report(results, elapsed, stock_before, last_issue_id)
+        self._print(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2)
+
+        if not options['keep_data']:
+            purge_dataset(PREFIX)
+            for code, quantity in stock_before.items():
+                Item.objects.filter(item_code=code).update(quantity=quantity)
+            self.stdout.write("Synthetic data removed and stock restored.")
+
+    def _parse_mix(self, raw):
+        mix = {}
+        for part in raw.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in ('issue', 'lookup', 'pending'):
+                raise CommandError(f"Unknown traffic type in --mix: {name}")
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f"Weight for {name} must be a number")
+        return mix
+
+    def _request(self, results, op, url, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = Request(url, data=data, method='POST' if data is not None else 'GET')
+        request.add_header('Accept', 'application/json')
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        began = time.perf_counter()
+        try:
+            with urlopen(request, timeout=60) as response:
+                status, body = response.status, response.read()
+        except HTTPError as exc:
+            status, body = exc.code, exc.read()
+        except (URLError, OSError):
+            with results.lock:
+                results.transport_errors += 1
+            return None, b''
+        results.add(op, status, (time.perf_counter() - began) * 1000, body)
+        return status, body
+
+    def _client(self, base_url, cohorts, mix, deadline, think, results, rng):
+        ops, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            op = rng.choices(ops, weights)[0]
+            usn, code, course, ay, year = rng.choice(cohorts)
+            if op == 'issue':
+                lines = [{'item_code': item, 'quantity': rng.randint(1, 2)} for item in rng.sample(ISSUE_CODES, rng.randint(1, 2))]
+                status, _ = self._request(results, 'issue', f"{base_url}/api/issue-bulk-create/", {
+                    'student_usn': usn, 'course_code': code, 'course': course,
+                    'academic_year': ay, 'year': year, 'issues': lines,
+                })
+                if status == 201:
+                    with results.lock:
+                        for line in lines:
+                            results.issued[line['item_code']] += line['quantity']
+            elif op == 'lookup':
+                self._request(results, 'lookup', f"{base_url}/api/students/search/?{urlencode({'q': usn[:8]})}")
+                self._request(results, 'lookup', f"{base_url}/api/student-records/{quote(usn)}/")
+            else:
+                cohort = urlencode({'course_code': code, 'course': course, 'academic_year': ay, 'year': year})
+                self._request(results, 'pending', f"{base_url}/api/requirements/?{cohort}")
+                self._request(results, 'pending', f"{base_url}/api/pending-reports/?flat=1&{cohort}")
+            if think:
+                time.sleep(think)
+
+    def _report(self, results, elapsed, stock_before, last_issue_id):
+        stock_after = dict(Item.objects.values_list('item_code', 'quantity'))
+        recorded = dict(
+            IssueRecord.objects.filter(id__gt=last_issue_id).values('item_code').annotate(total=Sum('qty_issued')).values_list('item_code', 'total')
+        )
+        violations = []
+        for code in ISSUE_CODES:
+            before, after = stock_before.get(code, 0), stock_after.get(code, 0)
+            records = recorded.get(code, 0)
+            confirmed = results.issued.get(code, 0)
+            if after < 0:
+                violations.append(f"{code}: negative stock {after}")
+            if before - after != records:
+                violations.append(f"{code}: stock fell by {before - after} but {records} were recorded as issued")
+            if records != confirmed:
+                violations.append(f"{code}: {records} recorded as issued, {confirmed} confirmed to clients")
+
+        operations = {}
+        total = 0
+        for op, latencies in results.latencies.items():
+            total += len(latencies)
+            operations[op] = {
+                'requests': len(latencies),
+                'per_second': round(len(latencies) / elapsed, 2) if elapsed else 0,
+                'p50_ms': round(_percentile(latencies, 0.50), 2),
+                'p95_ms': round(_percentile(latencies, 0.95), 2),
+                'p99_ms': round(_percentile(latencies, 0.99), 2),
+                'statuses': dict(results.statuses[op]),
+            }
+        return {
+            'seconds': round(elapsed, 2),
+            'requests': total,
+            'per_second': round(total / elapsed, 2) if elapsed else 0,
+            'operations': operations,
+            'lock_errors': results.lock_errors,
+            'transport_errors': results.transport_errors,
+            'stock_violations': violations,
+        }
+
+    def _print(self, report):
+        self.stdout.write(f"{report['requests']} requests in {report['seconds']}s ({report['per_second']}/s)")
+        for op, row in sorted(report['operations'].items()):
+            self.stdout.write(
+                f"  {op:<8} {row['requests']:6d} req {row['per_second']:8.1f}/s  "
+                f"p50 {row['p50_ms']:7.1f}  p95 {row['p95_ms']:7.1f}  p99 {row['p99_ms']:7.1f} ms  {row['statuses']}"
+            )
+        self.stdout.write(f"  lock errors: {report['lock_errors']}, transport errors: {report['transport_errors']}")
+        if report['stock_violations']:
+            for violation in report['stock_violations']:
+                self.stdout.write(self.style.ERROR(f"  stock violation: {violation}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("  stock consistent"))
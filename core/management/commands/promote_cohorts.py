@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.promotion import BATCH_SIZE, PromotionError, promote
+
+
+class Command(BaseCommand):
+    help = "Promote every cohort of one academic year to the next year of study (set-based)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='from_academic_year', required=True, help='Academic year to promote from')
+        parser.add_argument('--to', dest='to_academic_year', required=True,
+                            help='Academic year of the new departments (may equal --from for batch-style years)')
+        parser.add_argument('--course-code', default='', help='Only this course code')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Show per-cohort counts without writing')
+
+    def handle(self, *args, **options):
+        try:
+            result = promote(
+                options['from_academic_year'], options['to_academic_year'], course_code=options['course_code'] or None,
+                dry_run=options['dry_run'], batch_size=max(1, options['batch_size']),
+            )
+        except PromotionError as exc:
+            raise CommandError(str(exc))
+
+        for cohort in result['cohorts']:
+            target = (f"-> {cohort['to_academic_year']} year {cohort['to_year']} ({cohort['department']} department)"
+                      if cohort['status'] == 'promoted' else 'completed')
+            self.stdout.write(
+                f"  {cohort['course_code']:<10} {cohort['from_academic_year']} year {cohort['from_year']}: "
+                f"{cohort['students']:6d} students {target}"
+            )
+        totals = result['totals']
+        verb = 'Would promote' if result['dry_run'] else 'Promoted'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['students_promoted']} students in {totals['cohorts']} cohorts; "
+            f"completed: {totals['students_completed']}, departments created: {totals['departments_created']}"
+        ))
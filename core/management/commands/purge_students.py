@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.purge import BATCH_SIZE, PurgeError, purge
+
+
+class Command(BaseCommand):
+    help = "Delete students (all, or those of an academic year / course / departments) with chunked raw deletes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--academic-year', default='', help='Only students of departments in this academic year')
+        parser.add_argument('--course-code', default='', help='Only students of this course code')
+        parser.add_argument('--department', type=int, action='append', dest='department_ids', default=[],
+                            help='Only students of this department id (repeatable)')
+        parser.add_argument('--all', action='store_true', help='Required to purge every student when no scope is given')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Count the rows without deleting them')
+        parser.add_argument('--no-vacuum', action='store_true', help='Skip VACUUM / ANALYZE afterwards')
+
+    def handle(self, *args, **options):
+        scoped = options['academic_year'] or options['course_code'] or options['department_ids']
+        if not scoped and not options['all']:
+            raise CommandError('Give --academic-year, --course-code or --department, or --all to purge every student.')
+        try:
+            result = purge(
+                academic_year=options['academic_year'], course_code=options['course_code'],
+                department_ids=options['department_ids'], dry_run=options['dry_run'],
+                reclaim=not options['no_vacuum'], batch_size=max(1, options['batch_size']), progress=self.stdout.write,
+            )
+        except PurgeError as exc:
+            raise CommandError(str(exc))
+
+        for table, rows in result['deleted'].items():
+            self.stdout.write(f"  {table:<28} {rows:8d}")
+        verb = 'Would delete' if result['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {result['students']} students"))
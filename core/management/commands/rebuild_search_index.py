@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core.search import rebuild_student_index, rebuild_message_indexes
+
+
+class Command(BaseCommand):
+    help = "Rebuild the student, help-message and activity-log search indexes"
+
+    def handle(self, *args, **options):
+        indexed = rebuild_student_index()
+        counts = rebuild_message_indexes()
+        self.stdout.write(self.style.SUCCESS(
+            f"Search indexes rebuilt. Students: {indexed}, Help messages: {counts['help_messages']}, "
+            f"Activity logs: {counts['activity_logs']}"
+        ))
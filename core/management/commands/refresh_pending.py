@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Department
+from core.pending import BATCH_SIZE, refresh
+
+
+class Command(BaseCommand):
+    help = "Rebuild PendingItem rows from requirements and issue records (all cohorts, or one)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course-code', default='', help='Limit to departments with this course code')
+        parser.add_argument('--academic-year', default='', help='Limit to this academic year')
+        parser.add_argument('--year', default='', help='Limit to this year of study')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        department_ids = None
+        if options['course_code']:
+            department_ids = list(
+                Department.objects.filter(course_code__iexact=options['course_code']).values_list('id', flat=True)
+            )
+            if not department_ids:
+                raise CommandError(f"No department with course code {options['course_code']}")
+        counts = refresh(
+            academic_year=options['academic_year'] or None, year=options['year'] or None,
+            batch_size=options['batch_size'], department_ids=department_ids,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Pending items refreshed. Created: {counts['created']}, Updated: {counts['updated']}, "
+            f"Deleted: {counts['deleted']}"
+        ))
@@ -0,0 +1,166 @@
+# core/metrics.py
+"""In-process request metrics and their Prometheus text rendering.
+
+Filled by ``core.middleware.RequestProfilingMiddleware``. Every endpoint
+(method + URL route) gets cumulative histograms for wall time, SQL query
+count, SQL time and response size, plus a rolling window of recent wall
+times for p50/p95/p99. Numbers are per worker process.
+"""
+import threading
+from collections import defaultdict, deque
+
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_WINDOW = 500
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class EndpointStats:
+    def __init__(self, window):
+        self.duration_ms = Histogram(DURATION_BUCKETS_MS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_ms = Histogram(DURATION_BUCKETS_MS)
+        self.response_bytes = Histogram(SIZE_BUCKETS_BYTES)
+        self.recent_ms = deque(maxlen=window)
+        self.statuses = defaultdict(int)
+        self.slow = 0
+
+
+class MetricsRegistry:
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, method, route, status, duration_ms, queries, db_ms, response_bytes, slow=False):
+        key = (method, route)
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats(self.window)
+            stats.duration_ms.observe(duration_ms)
+            stats.queries.observe(queries)
+            stats.db_ms.observe(db_ms)
+            if response_bytes is not None:
+                stats.response_bytes.observe(response_bytes)
+            stats.recent_ms.append(duration_ms)
+            stats.statuses[status] += 1
+            if slow:
+                stats.slow += 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def snapshot(self):
+        """Copy of the per-endpoint stats, safe to read outside the lock."""
+        with self._lock:
+            copies = {}
+            for key, stats in self._endpoints.items():
+                copy = EndpointStats(self.window)
+                for name in ('duration_ms', 'queries', 'db_ms', 'response_bytes'):
+                    source, target = getattr(stats, name), getattr(copy, name)
+                    target.counts, target.count, target.total = list(source.counts), source.count, source.total
+                copy.recent_ms.extend(stats.recent_ms)
+                copy.statuses.update(stats.statuses)
+                copy.slow = stats.slow
+                copies[key] = copy
+            return copies
+
+
+registry = MetricsRegistry()
+
+
+def _quantile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _histogram_lines(name, histogram, labels, scale=1.0):
+    lines = []
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound * scale)} {count}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.total * scale}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def render_prometheus(extra_lines=()):
+    """Prometheus text exposition (format 0.0.4) of the registry."""
+    snapshot = registry.snapshot()
+    lines = []
+    histograms = (
+        ('aims_request_duration_seconds', 'Request wall time.', 'duration_ms', 0.001),
+        ('aims_request_db_queries', 'SQL queries per request.', 'queries', 1.0),
+        ('aims_request_db_duration_seconds', 'Time spent in SQL per request.', 'db_ms', 0.001),
+        ('aims_response_size_bytes', 'Response body size.', 'response_bytes', 1.0),
+    )
+    for name, help_text, attr, scale in histograms:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (method, route), stats in sorted(snapshot.items()):
+            lines.extend(_histogram_lines(name, getattr(stats, attr), {'method': method, 'route': route}, scale))
+
+    lines.append("# HELP aims_request_duration_recent_seconds Wall-time quantiles over the most recent requests.")
+    lines.append("# TYPE aims_request_duration_recent_seconds summary")
+    for (method, route), stats in sorted(snapshot.items()):
+        recent = list(stats.recent_ms)
+        for q in QUANTILES:
+            value = _quantile(recent, q) / 1000.0
+            lines.append(f"aims_request_duration_recent_seconds{_labels(method=method, route=route, quantile=q)} {value}")
+        # Sum and count cover the same window as the quantiles
+        lines.append(f"aims_request_duration_recent_seconds_sum{_labels(method=method, route=route)} {sum(recent) / 1000.0}")
+        lines.append(f"aims_request_duration_recent_seconds_count{_labels(method=method, route=route)} {len(recent)}")
+
+    lines.append("# HELP aims_requests_total Requests by response status.")
+    lines.append("# TYPE aims_requests_total counter")
+    for (method, route), stats in sorted(snapshot.items()):
+        for status_code, count in sorted(stats.statuses.items()):
+            lines.append(f"aims_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+
+    lines.append("# HELP aims_slow_requests_total Requests over the slow-request threshold.")
+    lines.append("# TYPE aims_slow_requests_total counter")
+    for (method, route), stats in sorted(snapshot.items()):
+        lines.append(f"aims_slow_requests_total{_labels(method=method, route=route)} {stats.slow}")
+
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def reference_cache_lines(stats):
+    """Prometheus lines for core.caching.cache_stats()."""
+    lines = []
+    for field in ('hits', 'misses', 'invalidations'):
+        name = f"aims_reference_cache_{field}_total"
+        lines.append(f"# HELP {name} Reference cache {field}.")
+        lines.append(f"# TYPE {name} counter")
+        for namespace, values in sorted(stats.items()):
+            lines.append(f"{name}{_labels(namespace=namespace)} {values[field]}")
+    return lines
@@ -0,0 +1,127 @@
+# core/middleware.py
+"""Request profiling: wall time, SQL count / time and response size per endpoint.
+
+Enabled with ``REQUEST_PROFILING_ENABLED``; when off the middleware removes
+itself at startup (``MiddlewareNotUsed``) and costs nothing. Requests slower
+than ``REQUEST_PROFILING_SLOW_MS`` are appended to the JSONL file at
+``REQUEST_PROFILING_SLOW_LOG`` together with their most expensive queries.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SQL_PREVIEW_CHARS = 500
+
+_slow_log_lock = threading.Lock()
+
+
+class _QueryRecorder:
+    """``connection.execute_wrapper`` hook that counts and times every statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.by_sql = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_ms += elapsed
+            entry = self.by_sql[sql]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def top(self, limit):
+        ranked = sorted(self.by_sql.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return [
+            {'sql': sql[:SQL_PREVIEW_CHARS], 'count': count, 'ms': round(ms, 3)}
+            for sql, (count, ms) in ranked
+        ]
+
+
+def _response_size(response):
+    if response.has_header('Content-Length'):
+        try:
+            return int(response['Content-Length'])
+        except ValueError:
+            return None
+    if getattr(response, 'streaming', False):
+        return None
+    return len(response.content)
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = float(getattr(settings, 'REQUEST_PROFILING_SLOW_MS', 500))
+        self.slow_log = getattr(settings, 'REQUEST_PROFILING_SLOW_LOG', None)
+        self.top_queries = int(getattr(settings, 'REQUEST_PROFILING_TOP_QUERIES', 5))
+        self.skip_prefixes = tuple(p for p in (settings.STATIC_URL, settings.MEDIA_URL) if p)
+        self.skip_prefixes = tuple(p if p.startswith('/') else f'/{p}' for p in self.skip_prefixes)
+
+    def __call__(self, request):
+        if self.skip_prefixes and request.path.startswith(self.skip_prefixes):
+            return self.get_response(request)
+
+        recorder = _QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        # Router patterns are regexes ('^api/items/$'); drop the anchors for readable labels
+        route = (match.route or match.view_name).replace('^', '').replace('$', '') if match else 'unmatched'
+        size = _response_size(response)
+        slow = duration_ms >= self.slow_ms
+        registry.record(
+            request.method, route, response.status_code, duration_ms,
+            recorder.count, recorder.total_ms, size, slow=slow,
+        )
+        if slow and self.slow_log:
+            self._log_slow(request, route, response, duration_ms, recorder, size)
+        return response
+
+    def _log_slow(self, request, route, response, duration_ms, recorder, size):
+        entry = {
+            'timestamp': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'queries': recorder.count,
+            'db_ms': round(recorder.total_ms, 3),
+            'response_bytes': size,
+            'top_queries': recorder.top(self.top_queries),
+        }
+        line = json.dumps(entry, default=str) + '\n'
+        try:
+            directory = os.path.dirname(str(self.slow_log))
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with _slow_log_lock, open(self.slow_log, 'a', encoding='utf-8') as handle:
+                handle.write(line)
+        except OSError as exc:
+            logger.warning("Could not write slow request log %s: %s", self.slow_log, exc)
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_student_search USING fts5(
+        usn, name, department,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_student_search_ai AFTER INSERT ON core_student BEGIN
+        INSERT INTO core_student_search(rowid, usn, name, department)
+        SELECT NEW.id, NEW.usn, NEW.name,
+               COALESCE((SELECT course_code || ' ' || course FROM core_department WHERE id = NEW.department_id), '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_student_search_au AFTER UPDATE ON core_student BEGIN
+        DELETE FROM core_student_search WHERE rowid = OLD.id;
+        INSERT INTO core_student_search(rowid, usn, name, department)
+        SELECT NEW.id, NEW.usn, NEW.name,
+               COALESCE((SELECT course_code || ' ' || course FROM core_department WHERE id = NEW.department_id), '');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_student_search_ad AFTER DELETE ON core_student BEGIN
+        DELETE FROM core_student_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_student_search_dept_au
+    AFTER UPDATE OF course_code, course ON core_department BEGIN
+        DELETE FROM core_student_search WHERE rowid IN (SELECT id FROM core_student WHERE department_id = NEW.id);
+        INSERT INTO core_student_search(rowid, usn, name, department)
+        SELECT id, usn, name, NEW.course_code || ' ' || NEW.course FROM core_student WHERE department_id = NEW.id;
+    END
+    """,
+    """
+    INSERT INTO core_student_search(rowid, usn, name, department)
+    SELECT s.id, s.usn, s.name, COALESCE(d.course_code, '') || ' ' || COALESCE(d.course, '')
+    FROM core_student s LEFT JOIN core_department d ON d.id = s.department_id
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_student_search_dept_au",
+    "DROP TRIGGER IF EXISTS core_student_search_ad",
+    "DROP TRIGGER IF EXISTS core_student_search_au",
+    "DROP TRIGGER IF EXISTS core_student_search_ai",
+    "DROP TABLE IF EXISTS core_student_search",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS core_student_usn_trgm ON core_student USING gin (usn gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS core_student_name_trgm ON core_student USING gin (name gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_student_name_trgm",
+    "DROP INDEX IF EXISTS core_student_usn_trgm",
+]
+
+
+def _run(statements_by_vendor):
+    def runner(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return runner
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0025_update_default_users'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
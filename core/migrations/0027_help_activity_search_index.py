@@ -0,0 +1,104 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_helpmessage_search USING fts5(
+        content,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_helpmessage_search_ai AFTER INSERT ON core_helpmessage BEGIN
+        INSERT INTO core_helpmessage_search(rowid, content) VALUES (NEW.id, COALESCE(NEW.content, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_helpmessage_search_au AFTER UPDATE OF content ON core_helpmessage BEGIN
+        DELETE FROM core_helpmessage_search WHERE rowid = OLD.id;
+        INSERT INTO core_helpmessage_search(rowid, content) VALUES (NEW.id, COALESCE(NEW.content, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_helpmessage_search_ad AFTER DELETE ON core_helpmessage BEGIN
+        DELETE FROM core_helpmessage_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    INSERT INTO core_helpmessage_search(rowid, content)
+    SELECT id, COALESCE(content, '') FROM core_helpmessage
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_activitylog_search USING fts5(
+        description, action, user,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_activitylog_search_ai AFTER INSERT ON core_activitylog BEGIN
+        INSERT INTO core_activitylog_search(rowid, description, action, user)
+        VALUES (NEW.id, COALESCE(NEW.description, ''), COALESCE(NEW.action, ''), COALESCE(NEW.user, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_activitylog_search_au AFTER UPDATE ON core_activitylog BEGIN
+        DELETE FROM core_activitylog_search WHERE rowid = OLD.id;
+        INSERT INTO core_activitylog_search(rowid, description, action, user)
+        VALUES (NEW.id, COALESCE(NEW.description, ''), COALESCE(NEW.action, ''), COALESCE(NEW.user, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_activitylog_search_ad AFTER DELETE ON core_activitylog BEGIN
+        DELETE FROM core_activitylog_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    INSERT INTO core_activitylog_search(rowid, description, action, user)
+    SELECT id, COALESCE(description, ''), COALESCE(action, ''), COALESCE(user, '') FROM core_activitylog
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_activitylog_search_ad",
+    "DROP TRIGGER IF EXISTS core_activitylog_search_au",
+    "DROP TRIGGER IF EXISTS core_activitylog_search_ai",
+    "DROP TABLE IF EXISTS core_activitylog_search",
+    "DROP TRIGGER IF EXISTS core_helpmessage_search_ad",
+    "DROP TRIGGER IF EXISTS core_helpmessage_search_au",
+    "DROP TRIGGER IF EXISTS core_helpmessage_search_ai",
+    "DROP TABLE IF EXISTS core_helpmessage_search",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS core_helpmessage_content_fts ON core_helpmessage "
+    "USING gin (to_tsvector('simple', coalesce(content, '')))",
+    "CREATE INDEX IF NOT EXISTS core_activitylog_description_fts ON core_activitylog "
+    "USING gin (to_tsvector('simple', coalesce(description, '')))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_activitylog_description_fts",
+    "DROP INDEX IF EXISTS core_helpmessage_content_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def runner(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return runner
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0026_student_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
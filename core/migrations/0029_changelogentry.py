@@ -0,0 +1,103 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:03
+
+from django.db import migrations, models
+
+
+# (sync table name, database table) pairs captured by the change log
+SYNCED_TABLES = [
+    ('students', 'core_student'),
+    ('departments', 'core_department'),
+    ('enrollments', 'core_enrollment'),
+]
+
+
+def _sqlite_forward():
+    statements = []
+    for name, db_table in SYNCED_TABLES:
+        for event, ref, op in (('INSERT', 'NEW', 'U'), ('UPDATE', 'NEW', 'U'), ('DELETE', 'OLD', 'D')):
+            statements.append(f"""
+                CREATE TRIGGER IF NOT EXISTS core_changelog_{name}_{event.lower()}
+                AFTER {event} ON {db_table} BEGIN
+                    DELETE FROM core_changelogentry WHERE table_name = '{name}' AND row_id = {ref}.id;
+                    INSERT INTO core_changelogentry(table_name, row_id, op, changed_at)
+                    VALUES ('{name}', {ref}.id, '{op}', datetime('now'));
+                END
+            """)
+        statements.append(
+            f"INSERT INTO core_changelogentry(table_name, row_id, op, changed_at) "
+            f"SELECT '{name}', id, 'U', datetime('now') FROM {db_table}"
+        )
+    return statements
+
+
+def _sqlite_backward():
+    return [
+        f"DROP TRIGGER IF EXISTS core_changelog_{name}_{event}"
+        for name, _ in SYNCED_TABLES for event in ('insert', 'update', 'delete')
+    ]
+
+
+def _postgres_forward():
+    statements = ["""
+        CREATE OR REPLACE FUNCTION core_changelog_capture() RETURNS trigger AS $$
+        DECLARE rid bigint;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN rid := OLD.id; ELSE rid := NEW.id; END IF;
+            DELETE FROM core_changelogentry WHERE table_name = TG_ARGV[0] AND row_id = rid;
+            INSERT INTO core_changelogentry(table_name, row_id, op, changed_at)
+            VALUES (TG_ARGV[0], rid, CASE WHEN TG_OP = 'DELETE' THEN 'D' ELSE 'U' END, now());
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """]
+    for name, db_table in SYNCED_TABLES:
+        statements.append(
+            f"CREATE TRIGGER core_changelog_{name} AFTER INSERT OR UPDATE OR DELETE ON {db_table} "
+            f"FOR EACH ROW EXECUTE FUNCTION core_changelog_capture('{name}')"
+        )
+        statements.append(
+            f"INSERT INTO core_changelogentry(table_name, row_id, op, changed_at) "
+            f"SELECT '{name}', id, 'U', now() FROM {db_table}"
+        )
+    return statements
+
+
+def _postgres_backward():
+    statements = [f"DROP TRIGGER IF EXISTS core_changelog_{name} ON {db_table}" for name, db_table in SYNCED_TABLES]
+    statements.append("DROP FUNCTION IF EXISTS core_changelog_capture()")
+    return statements
+
+
+def _run(statements_by_vendor):
+    def runner(apps, schema_editor):
+        builder = statements_by_vendor.get(schema_editor.connection.vendor)
+        for statement in (builder() if builder else []):
+            schema_editor.execute(statement, params=None)
+    return runner
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_tableversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=64)),
+                ('row_id', models.BigIntegerField()),
+                ('op', models.CharField(choices=[('U', 'Upsert'), ('D', 'Delete')], max_length=1)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['table_name', 'id'], name='core_changelog_table_id'), models.Index(fields=['table_name', 'row_id'], name='core_changelog_table_row')],
+            },
+        ),
+        migrations.RunPython(
+            _run({'sqlite': _sqlite_forward, 'postgresql': _postgres_forward}),
+            _run({'sqlite': _sqlite_backward, 'postgresql': _postgres_backward}),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('year', models.CharField(max_length=10)),
+                ('required_qty', models.PositiveIntegerField(default=0)),
+                ('issued_qty', models.PositiveIntegerField(default=0)),
+                ('pending_qty', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_items', to='core.department')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_items', to='core.item')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_items', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['department', 'academic_year', 'year'], name='core_pendingitem_cohort'), models.Index(fields=['item', 'pending_qty'], name='core_pendingitem_item')],
+                'unique_together': {('student', 'academic_year', 'year', 'item')},
+            },
+        ),
+    ]
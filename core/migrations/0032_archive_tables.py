@@ -0,0 +1,96 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_pendingitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedActivityLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(max_length=50)),
+                ('description', models.TextField()),
+                ('timestamp', models.DateTimeField()),
+                ('user', models.CharField(blank=True, max_length=100, null=True)),
+                ('academic_year', models.CharField(max_length=20)),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['academic_year'], name='core_archlog_year')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchiveManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('table', models.CharField(max_length=64)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('first_id', models.BigIntegerField(blank=True, null=True)),
+                ('last_id', models.BigIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('academic_year', 'table')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedEnrollment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('academic_year', models.CharField(max_length=20)),
+                ('year', models.CharField(max_length=10)),
+                ('department', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.department')),
+                ('student', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['academic_year', 'year'], name='core_archenroll_cohort')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedIssueRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('item_code', models.CharField(max_length=10)),
+                ('qty_issued', models.IntegerField()),
+                ('date_issued', models.DateField()),
+                ('status', models.CharField(default='Issued', max_length=20)),
+                ('remarks', models.CharField(blank=True, max_length=255, null=True)),
+                ('academic_year', models.CharField(blank=True, max_length=20, null=True)),
+                ('year', models.CharField(blank=True, max_length=10, null=True)),
+                ('student', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['academic_year', 'year'], name='core_archissue_cohort')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPendingReport',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('usn', models.CharField(max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('course', models.CharField(max_length=100)),
+                ('course_code', models.CharField(blank=True, max_length=10, null=True)),
+                ('academic_year', models.CharField(blank=True, max_length=20, null=True)),
+                ('year', models.CharField(blank=True, max_length=10, null=True)),
+                ('pn2', models.IntegerField(default=0)),
+                ('pr2', models.IntegerField(default=0)),
+                ('po2', models.IntegerField(default=0)),
+                ('pn1', models.IntegerField(default=0)),
+                ('pr1', models.IntegerField(default=0)),
+                ('po1', models.IntegerField(default=0)),
+                ('student', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['academic_year', 'year'], name='core_archreport_cohort')],
+            },
+        ),
+    ]
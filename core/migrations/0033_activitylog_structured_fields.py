@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 06:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='object_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='object_type',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedactivitylog',
+            name='object_id',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedactivitylog',
+            name='object_type',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        # auto_now_add -> default only changes what Python fills in; the column is the same.
+        # State only: on SQLite a real AlterField rebuilds the table and drops the search triggers (0027).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='activitylog',
+                    name='timestamp',
+                    field=models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['object_type', 'object_id'], name='core_activitylog_object'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+# PostgreSQL: index action and user next to description, like the SQLite FTS5 table of 0027.
+# The expression must match core/search.py:_text_search exactly.
+POSTGRES_FORWARD = [
+    "DROP INDEX IF EXISTS core_activitylog_description_fts",
+    "CREATE INDEX IF NOT EXISTS core_activitylog_text_fts ON core_activitylog "
+    "USING gin (to_tsvector('simple', "
+    "coalesce(\"description\", '') || ' ' || coalesce(\"action\", '') || ' ' || coalesce(\"user\", '')))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_activitylog_text_fts",
+    "CREATE INDEX IF NOT EXISTS core_activitylog_description_fts ON core_activitylog "
+    "USING gin (to_tsvector('simple', coalesce(description, '')))",
+]
+
+
+def _run(statements_by_vendor):
+    def runner(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return runner
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('core', '0033_activitylog_structured_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD}),
+            _run({'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -1,5 +1,6 @@
 # core/models.py
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 
 
@@ -144,6 +145,33 @@ class Enrollment(models.Model):
     def __str__(self):
         return f"Enrollment: {self.student.usn} - {self.department.course_code}/{self.department.course} ({self.academic_year} Y{self.year})"
 
+class PendingItem(models.Model):
+    """Outstanding quantity of one item for one student in one cohort (maintained by core/pending.py).
+
+    One narrow row per (student, academic year, year, item), so new items need
+    no schema change. ``required_qty`` comes from the department's requirement
+    vector, ``issued_qty`` from IssueRecord sums for that academic year and year.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='pending_items')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='pending_items')
+    academic_year = models.CharField(max_length=20)
+    year = models.CharField(max_length=10)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='pending_items')
+    required_qty = models.PositiveIntegerField(default=0)
+    issued_qty = models.PositiveIntegerField(default=0)
+    pending_qty = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'academic_year', 'year', 'item')
+        indexes = [
+            models.Index(fields=['department', 'academic_year', 'year'], name='core_pendingitem_cohort'),
+            models.Index(fields=['item', 'pending_qty'], name='core_pendingitem_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} {self.academic_year}/{self.year} {self.item_id}: {self.pending_qty}"
+
 class ActivityLog(models.Model):
     ACTION_CHOICES = [
         ('department_added', 'Department Added'),
@@ -160,11 +188,15 @@ class ActivityLog(models.Model):
     
     action = models.CharField(max_length=50, choices=ACTION_CHOICES)
     description = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
-    user = models.CharField(max_length=100, blank=True, null=True)
-    
+    # Set when the entry is logged, not when the buffered writer flushes it (core/activity.py)
+    timestamp = models.DateTimeField(default=timezone.now)
+    user = models.CharField(max_length=100, blank=True, null=True)  # actor
+    object_type = models.CharField(max_length=50, blank=True, null=True)
+    object_id = models.CharField(max_length=64, blank=True, null=True)
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['object_type', 'object_id'], name='core_activitylog_object')]
     
     def __str__(self):
         return f"{self.action} - {self.timestamp}"
@@ -283,4 +315,143 @@ class StockLogEntry(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"Stock change {self.change} for {self.item.item_code}"
\ No newline at end of file
+        return f"Stock change {self.change} for {self.item.item_code}"
+
+
+class TableVersion(models.Model):
+    """Monotonic change counter per reference table, used to build ETags (see core/versioning.py)."""
+    table = models.CharField(max_length=64, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+
+class ChangeLogEntry(models.Model):
+    """Latest change per synced row, written by database triggers (migration 0029).
+
+    The auto-increment id doubles as the sync version: clients ask for changes
+    with id greater than the last version they saw. Triggers keep one entry per
+    (table_name, row_id); op 'D' is a tombstone.
+    """
+    class Op(models.TextChoices):
+        UPSERT = 'U', 'Upsert'
+        DELETE = 'D', 'Delete'
+
+    table_name = models.CharField(max_length=64)
+    row_id = models.BigIntegerField()
+    op = models.CharField(max_length=1, choices=Op.choices)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['table_name', 'id'], name='core_changelog_table_id'),
+            models.Index(fields=['table_name', 'row_id'], name='core_changelog_table_row'),
+        ]
+
+    def __str__(self):
+        return f"{self.table_name}#{self.row_id} {self.op} (v{self.id})"
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a POST sent with an ``Idempotency-Key`` (see core/idempotency.py).
+
+    A retry with the same key and payload gets the stored response back instead
+    of running the request again; the fingerprint catches a key reused for a
+    different payload.
+    """
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=100)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response_body = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('scope', 'key')
+        indexes = [models.Index(fields=['created_at'], name='core_idempotency_created')]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} -> {self.status_code}"
+
+
+class ArchiveManifest(models.Model):
+    """One row per (academic year, hot table) moved into the archive tables by core/archive.py."""
+    academic_year = models.CharField(max_length=20)
+    table = models.CharField(max_length=64)
+    rows = models.PositiveIntegerField(default=0)
+    first_id = models.BigIntegerField(blank=True, null=True)
+    last_id = models.BigIntegerField(blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('academic_year', 'table')
+
+    def __str__(self):
+        return f"{self.academic_year} {self.table}: {self.rows} rows"
+
+
+# Archive tables: same columns and ids as the hot tables, filled by core/archive.py.
+# Foreign keys carry no database constraint, so purging students leaves history intact.
+
+class ArchivedIssueRecord(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    item_code = models.CharField(max_length=10)
+    qty_issued = models.IntegerField()
+    date_issued = models.DateField()
+    status = models.CharField(max_length=20, default='Issued')
+    remarks = models.CharField(max_length=255, blank=True, null=True)
+    academic_year = models.CharField(max_length=20, blank=True, null=True)
+    year = models.CharField(max_length=10, blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['academic_year', 'year'], name='core_archissue_cohort')]
+
+
+class ArchivedEnrollment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    department = models.ForeignKey(Department, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    academic_year = models.CharField(max_length=20)
+    year = models.CharField(max_length=10)
+
+    class Meta:
+        indexes = [models.Index(fields=['academic_year', 'year'], name='core_archenroll_cohort')]
+
+
+class ArchivedPendingReport(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    usn = models.CharField(max_length=20)
+    name = models.CharField(max_length=100)
+    course = models.CharField(max_length=100)
+    course_code = models.CharField(max_length=10, blank=True, null=True)
+    academic_year = models.CharField(max_length=20, blank=True, null=True)
+    year = models.CharField(max_length=10, blank=True, null=True)
+    pn2 = models.IntegerField(default=0)
+    pr2 = models.IntegerField(default=0)
+    po2 = models.IntegerField(default=0)
+    pn1 = models.IntegerField(default=0)
+    pr1 = models.IntegerField(default=0)
+    po1 = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['academic_year', 'year'], name='core_archreport_cohort')]
+
+
+class ArchivedActivityLog(models.Model):
+    """ActivityLog has no cohort; rows are archived by the academic year their timestamp falls in."""
+    id = models.BigIntegerField(primary_key=True)
+    action = models.CharField(max_length=50)
+    description = models.TextField()
+    timestamp = models.DateTimeField()
+    user = models.CharField(max_length=100, blank=True, null=True)
+    object_type = models.CharField(max_length=50, blank=True, null=True)
+    object_id = models.CharField(max_length=64, blank=True, null=True)
+    academic_year = models.CharField(max_length=20)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [models.Index(fields=['academic_year'], name='core_archlog_year')]
@@ -0,0 +1,179 @@
+# core/pending.py
+"""Pending quantities for any number of items, per student and cohort.
+
+A cohort is (department, academic year, year) as recorded on Enrollment.
+Required quantities come from the department's DepartmentItemRequirement
+rows; departments that have none yet fall back to the six legacy allotment
+columns on Department. Issued quantities are IssueRecord sums for the same
+academic year and year. pending = max(required - issued, 0).
+
+``refresh`` materialises the result into PendingItem with a fixed number of
+queries whatever the number of cohorts or items (enrollments, requirements,
+one grouped IssueRecord sum, existing rows, then bulk writes). Issue paths
+keep the rows current in between with ``apply_issue``; edits and deletes of
+issues, enrollments and requirements refresh the cohorts they touch.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .caching import department_requirements, item_catalog
+from .models import Department, DepartmentItemRequirement, Enrollment, IssueRecord, PendingItem
+
+# Legacy item code -> Department allotment column, used only when a department has no requirement rows
+LEGACY_DEPARTMENT_FIELDS = {
+    '2PN': 'two_hundred_notebook',
+    '2PR': 'two_hundred_record',
+    '2PO': 'two_hundred_observation',
+    '1PN': 'one_hundred_notebook',
+    '1PR': 'one_hundred_record',
+    '1PO': 'one_hundred_observation',
+}
+
+BATCH_SIZE = 1000
+
+
+def _norm(value):
+    return (value or '').strip().lower()
+
+
+def requirement_vectors(department_ids):
+    """``{department_id: {item_id: required_qty}}`` for the given departments (two queries at most)."""
+    department_ids = set(department_ids)
+    vectors = defaultdict(dict)
+    for dept_id, item_id, qty in DepartmentItemRequirement.objects.filter(
+        department_id__in=department_ids
+    ).values_list('department_id', 'item_id', 'required_qty'):
+        vectors[dept_id][item_id] = qty or 0
+
+    legacy = department_ids - set(vectors)
+    if legacy:
+        catalog = item_catalog()
+        legacy_items = {
+            catalog[code.lower()]['id']: field
+            for code, field in LEGACY_DEPARTMENT_FIELDS.items() if code.lower() in catalog
+        }
+        for row in Department.objects.filter(id__in=legacy).values('id', *LEGACY_DEPARTMENT_FIELDS.values()):
+            vectors[row['id']] = {item_id: row[field] or 0 for item_id, field in legacy_items.items()}
+    return vectors
+
+
+def pending_for_department(department, issued_by_code):
+    """``{item_code: pending}`` for one student, given their issued totals keyed by item code.
+
+    Uses the cached requirement rows, so it adds no query once the cache is warm.
+    """
+    issued = defaultdict(int)
+    for code, qty in issued_by_code.items():
+        issued[(code or '').upper()] += qty or 0
+    rows = department_requirements(department.id)
+    if rows:
+        vector = {row['item_code']: row['required_qty'] or 0 for row in rows}
+    else:
+        vector = {code: getattr(department, field, 0) or 0 for code, field in LEGACY_DEPARTMENT_FIELDS.items()}
+    return {code: max(0, required - issued.get(code.upper(), 0)) for code, required in sorted(vector.items())}
+
+
+def _scoped(queryset, department_id=None, academic_year=None, year=None, department_ids=None, student_ids=None):
+    if department_id is not None:
+        queryset = queryset.filter(department_id=department_id)
+    if department_ids is not None:
+        queryset = queryset.filter(department_id__in=list(department_ids))
+    if student_ids is not None:
+        queryset = queryset.filter(student_id__in=list(student_ids))
+    if academic_year:
+        queryset = queryset.filter(academic_year__iexact=academic_year)
+    if year:
+        queryset = queryset.filter(year=str(year))
+    return queryset
+
+
+def compute(department_id=None, academic_year=None, year=None, department_ids=None, student_ids=None):
+    """``{(student_id, academic_year, year, item_id): (department_id, required, issued, pending)}``.
+
+    All cohorts by default; pass a department (or several), students and/or academic year and year to narrow it.
+    """
+    enrollments = _scoped(Enrollment.objects.all(), department_id, academic_year, year, department_ids, student_ids)
+    cohorts = list(enrollments.values_list('student_id', 'department_id', 'academic_year', 'year').distinct())
+    vectors = requirement_vectors({dept_id for _, dept_id, _, _ in cohorts})
+    item_ids = {code: entry['id'] for code, entry in item_catalog().items()}
+
+    issued_qs = IssueRecord.objects.all()
+    if department_id is not None or department_ids is not None or student_ids is not None or academic_year or year:
+        issued_qs = issued_qs.filter(student_id__in=enrollments.values('student_id'))
+        if academic_year:
+            issued_qs = issued_qs.filter(academic_year__iexact=academic_year)
+        if year:
+            issued_qs = issued_qs.filter(year=str(year))
+    issued = defaultdict(int)
+    for student_id, ay, yr, code, total in issued_qs.values('student_id', 'academic_year', 'year', 'item_code').annotate(
+        total=Sum('qty_issued')
+    ).values_list('student_id', 'academic_year', 'year', 'item_code', 'total'):
+        item_id = item_ids.get(_norm(code))
+        if item_id is not None:
+            issued[(student_id, _norm(ay), str(yr or '').strip(), item_id)] += total or 0
+
+    result = {}
+    for student_id, dept_id, ay, yr in cohorts:
+        for item_id, required in vectors.get(dept_id, {}).items():
+            done = issued.get((student_id, _norm(ay), str(yr).strip(), item_id), 0)
+            result[(student_id, ay, yr, item_id)] = (dept_id, required, done, max(0, required - done))
+    return result
+
+
+def refresh(department_id=None, academic_year=None, year=None, batch_size=BATCH_SIZE, department_ids=None,
+            student_ids=None):
+    """Bring PendingItem in line with requirements and issues; returns created/updated/deleted counts."""
+    computed = compute(department_id, academic_year, year, department_ids, student_ids)
+    existing_qs = _scoped(PendingItem.objects.all(), department_id, academic_year, year, department_ids, student_ids)
+    existing = {
+        (student_id, ay, yr, item_id): (row_id, (dept_id, required, done, pending))
+        for row_id, student_id, ay, yr, item_id, dept_id, required, done, pending in existing_qs.values_list(
+            'id', 'student_id', 'academic_year', 'year', 'item_id',
+            'department_id', 'required_qty', 'issued_qty', 'pending_qty',
+        )
+    }
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for key, values in computed.items():
+        current = existing.pop(key, None)
+        if current is not None and current[1] == values:
+            continue
+        student_id, ay, yr, item_id = key
+        dept_id, required, done, pending = values
+        row = PendingItem(
+            id=current[0] if current else None,
+            student_id=student_id, department_id=dept_id, academic_year=ay, year=yr, item_id=item_id,
+            required_qty=required, issued_qty=done, pending_qty=pending, updated_at=now,
+        )
+        (to_update if current else to_create).append(row)
+    stale = [row_id for row_id, _ in existing.values()]
+
+    with transaction.atomic():
+        PendingItem.objects.bulk_create(to_create, batch_size=batch_size)
+        PendingItem.objects.bulk_update(
+            to_update, ['department', 'required_qty', 'issued_qty', 'pending_qty', 'updated_at'], batch_size=batch_size,
+        )
+        for start in range(0, len(stale), batch_size):
+            PendingItem.objects.filter(id__in=stale[start:start + batch_size]).delete()
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(stale)}
+
+
+def apply_issue(student_id, academic_year, year, quantities):
+    """Count newly issued quantities (``{item_id: qty}``) against a student's PendingItem rows.
+
+    One UPDATE per item; rows that were never generated are left for the next refresh.
+    """
+    now = timezone.now()
+    for item_id, qty in quantities.items():
+        PendingItem.objects.filter(
+            student_id=student_id, item_id=item_id, academic_year__iexact=academic_year or '', year=str(year or ''),
+        ).update(
+            issued_qty=F('issued_qty') + qty,
+            pending_qty=Greatest(F('required_qty') - F('issued_qty') - qty, Value(0)),
+            updated_at=now,
+        )
@@ -0,0 +1,158 @@
+# core/pending_matrix.py
+"""Students x items pending matrix for a whole academic year, computed with NumPy.
+
+Three queries load the data: the enrolled students, their departments'
+requirement vectors (``pending.requirement_vectors``), and the academic
+year's IssueRecord (student, year, item code, quantity) rows. An archived
+year is read from the archive tables instead (core/archive.py). The
+requirement vectors form a departments x items matrix; indexing it with each
+student's department row gives ``required``. Issue quantities are summed
+into ``issued`` with ``np.add.at``. ``pending = max(required - issued, 0)``
+is then one vectorized pass over the whole matrix, with no per-student
+Python loop.
+"""
+import numpy as np
+
+from .archive import models_for
+from .caching import item_catalog
+from .models import Enrollment, IssueRecord
+from .pending import requirement_vectors
+
+DTYPE = np.int64
+
+
+class PendingMatrix:
+    """Row ``i`` is the enrollment ``usns[i]``; column ``j`` is the item ``item_codes[j]``."""
+
+    def __init__(self, academic_year, item_codes, student_ids, usns, names, course_codes, years,
+                 required, issued):
+        self.academic_year = academic_year
+        self.item_codes = item_codes
+        self.student_ids = student_ids
+        self.usns = usns
+        self.names = names
+        self.course_codes = course_codes
+        self.years = years
+        self.required = required
+        self.issued = issued
+        self.pending = np.maximum(required - issued, 0)
+
+    def __len__(self):
+        return len(self.usns)
+
+    def outstanding(self):
+        """The rows that still have something pending."""
+        return self.select(self.pending.any(axis=1))
+
+    def select(self, mask):
+        keep = np.flatnonzero(mask)
+
+        def pick(values):
+            return [values[i] for i in keep]
+
+        return PendingMatrix(
+            self.academic_year, self.item_codes, self.student_ids[keep], pick(self.usns), pick(self.names),
+            pick(self.course_codes), pick(self.years), self.required[keep], self.issued[keep],
+        )
+
+    def totals(self):
+        """``{item_code: total pending}`` across all rows."""
+        return dict(zip(self.item_codes, self.pending.sum(axis=0).tolist()))
+
+    def columns(self, include=('pending',)):
+        """Columnar dict for the API: one list per item for each matrix in ``include``."""
+        data = {
+            'academic_year': self.academic_year,
+            'items': list(self.item_codes),
+            'students': {
+                'usn': list(self.usns), 'name': list(self.names),
+                'course_code': list(self.course_codes), 'year': list(self.years),
+            },
+            'totals': self.totals(),
+        }
+        for name in include:
+            matrix = getattr(self, name).T.tolist()
+            data[name] = dict(zip(self.item_codes, matrix))
+        return data
+
+    def export_headers(self):
+        return ['USN', 'Name', 'Course Code', 'Year', *self.item_codes, 'Total Pending']
+
+    def export_rows(self):
+        row_totals = self.pending.sum(axis=1).tolist()
+        for index, pending in enumerate(self.pending.tolist()):
+            yield [self.usns[index], self.names[index], self.course_codes[index], self.years[index],
+                   *pending, row_totals[index]]
+
+
+def _normalize(value):
+    return str(value or '').strip().upper()
+
+
+def _index(values, lookup, missing=-1):
+    """Map each value through ``lookup`` to an int array.
+
+    Only the distinct values are normalized (None -> '', stripped, upper-cased)
+    and looked up; NumPy spreads the result back over ``values``.
+    """
+    distinct = {}
+    positions = np.fromiter((distinct.setdefault(value, len(distinct)) for value in values), dtype=DTYPE, count=len(values))
+    table = np.array([lookup.get(_normalize(value), missing) for value in distinct] or [missing], dtype=DTYPE)
+    return table[positions]
+
+
+def build(academic_year, course_code=None, year=None):
+    """PendingMatrix for every student enrolled in ``academic_year`` (optionally one course code / year)."""
+    enrollment_model, issue_model = models_for(academic_year, Enrollment, IssueRecord)
+    enrollments = enrollment_model.objects.filter(academic_year__iexact=academic_year)
+    if course_code:
+        enrollments = enrollments.filter(department__course_code__iexact=course_code)
+    if year:
+        enrollments = enrollments.filter(year=str(year))
+    roster = list(enrollments.order_by('department__course_code', 'year', 'student__usn').values_list(
+        'student_id', 'student__usn', 'student__name', 'department_id', 'department__course_code', 'year',
+    ))
+    student_ids, usns, names, dept_ids, course_codes, years = (list(column) for column in zip(*roster)) if roster else ([],) * 6
+
+    # Requirement vectors -> departments x items matrix
+    vectors = requirement_vectors(set(dept_ids))
+    catalog = item_catalog()
+    code_by_id = {entry['id']: entry['item_code'] for entry in catalog.values()}
+    item_ids = sorted({item_id for vector in vectors.values() for item_id in vector if item_id in code_by_id},
+                      key=lambda item_id: code_by_id[item_id].upper())
+    column_of = {item_id: j for j, item_id in enumerate(item_ids)}
+    dept_list = sorted(vectors)
+    by_dept = np.zeros((len(dept_list) + 1, len(item_ids)), dtype=DTYPE)  # last row: departments with no vector
+    for row, dept_id in enumerate(dept_list):
+        for item_id, qty in vectors[dept_id].items():
+            if item_id in column_of:
+                by_dept[row, column_of[item_id]] = qty
+    dept_row = {str(dept_id): row for row, dept_id in enumerate(dept_list)}
+    required = by_dept[_index(dept_ids, dept_row, missing=len(dept_list))]
+
+    # Issued sums, scattered into the (enrollment, item) cells they belong to
+    issued = np.zeros_like(required)
+    issue_records = issue_model.objects.filter(academic_year__iexact=academic_year)
+    if course_code or year:
+        # Unscoped, records of students outside the roster simply find no row below
+        issue_records = issue_records.filter(student_id__in=enrollments.values('student_id'))
+    # Plain rows rather than a GROUP BY: np.add.at does the summing, and faster than SQLite's grouping
+    records = list(issue_records.values_list('student_id', 'year', 'item_code', 'qty_issued'))
+    if records and roster:
+        issue_students, issue_years, issue_codes, quantities = zip(*records)
+        year_number = {value: n for n, value in enumerate(sorted({_normalize(value) for value in set(years)}))}
+        roster_keys = np.array(student_ids, dtype=DTYPE) * len(year_number) + _index(years, year_number)
+        order = np.argsort(roster_keys, kind='stable')
+        issue_year = _index(issue_years, year_number)
+        issue_keys = np.array(issue_students, dtype=DTYPE) * len(year_number) + issue_year
+        position = np.minimum(np.searchsorted(roster_keys[order], issue_keys), len(order) - 1)
+        rows = order[position]
+        column_by_code = {code.upper(): column_of[entry['id']] for code, entry in catalog.items() if entry['id'] in column_of}
+        columns = _index(issue_codes, column_by_code)
+        matched = (issue_year >= 0) & (roster_keys[rows] == issue_keys) & (columns >= 0)
+        np.add.at(issued, (rows[matched], columns[matched]), np.array(quantities, dtype=DTYPE)[matched])
+
+    return PendingMatrix(
+        academic_year, [code_by_id[item_id] for item_id in item_ids], np.array(student_ids, dtype=DTYPE),
+        usns, names, course_codes, [str(value or '').strip() for value in years], required, issued,
+    )
@@ -0,0 +1,175 @@
+# core/promotion.py
+"""Year-end promotion: move every cohort of one academic year up a year.
+
+A cohort is the set of students whose current department is (course code,
+academic year, year N). Promoting it means:
+
+- the next-year department (same course code, target academic year, year
+  N+1) exists, created if needed. Its fields and DepartmentItemRequirement
+  rows are copied from the year N+1 department of the source academic year
+  when there is one (requirements differ by year), else from the cohort's
+  own department;
+- each student gets an Enrollment in that department;
+- ``Student.department`` and ``Student.year`` point at it.
+
+Students in the final year of their programme are counted as completed and
+left in place. The final year is the highest year any department of the
+course has, and at least ``PROGRAM_YEARS[program_type]``.
+
+Everything is set-based: departments, requirements and enrollments are
+bulk-created, and each cohort's students move with one UPDATE. A re-run
+finds nobody left in the source departments, so it does nothing. With
+``dry_run`` only the counts are computed.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from . import activity
+from .backfill import normalize_academic_year, normalize_year
+from .models import Department, DepartmentItemRequirement, Enrollment, Student
+from .pending import LEGACY_DEPARTMENT_FIELDS, refresh as refresh_pending
+from .versioning import bump_table_version
+
+BATCH_SIZE = 2000
+
+# Minimum programme length by Department.program_type
+PROGRAM_YEARS = {'PG': 2, 'UG': 3}
+
+COPIED_FIELDS = ('course', 'program_type', 'intake', 'existing', 'total', *LEGACY_DEPARTMENT_FIELDS.values())
+
+
+def _year_number(value):
+    year = normalize_year(str(value or ''))
+    return int(year) if year.isdigit() else None
+
+
+def _key(course_code, academic_year, year):
+    return ((course_code or '').strip().upper(), normalize_academic_year(academic_year), str(year))
+
+
+class PromotionError(Exception):
+    """The promotion request is incomplete (missing academic years)."""
+
+
+def promote(from_academic_year, to_academic_year, course_code=None, dry_run=False, batch_size=BATCH_SIZE):
+    """Promote the cohorts of ``from_academic_year`` into ``to_academic_year``; returns per-cohort counts.
+
+    The two may be equal when the academic year names a batch rather than a
+    session (e.g. '2024-2026' for every year of a two-year programme).
+    """
+    from_ay = normalize_academic_year(from_academic_year)
+    to_ay = normalize_academic_year(to_academic_year)
+    if not from_ay or not to_ay:
+        raise PromotionError('Provide from_academic_year and to_academic_year.')
+
+    courses = Department.objects.all()
+    if course_code:
+        courses = courses.filter(course_code__iexact=course_code.strip())
+    departments = list(courses.values('id', 'course_code', 'academic_year', 'year', *COPIED_FIELDS))
+    by_key = {_key(d['course_code'], d['academic_year'], _year_number(d['year'])): d for d in departments}
+    final_year = defaultdict(int)
+    for d in departments:
+        code = (d['course_code'] or '').strip().upper()
+        final_year[code] = max(final_year[code], _year_number(d['year']) or 0,
+                               PROGRAM_YEARS.get((d['program_type'] or '').strip().upper(), 0))
+
+    sources = [d for d in departments if normalize_academic_year(d['academic_year']) == from_ay and _year_number(d['year'])]
+    counts = dict(
+        Student.objects.filter(department_id__in=[d['id'] for d in sources])
+        .values('department_id').annotate(n=Count('id')).values_list('department_id', 'n')
+    )
+
+    cohorts, new_departments = [], {}
+    for source in sorted(sources, key=lambda d: (d['course_code'], _year_number(d['year']))):
+        students = counts.get(source['id'], 0)
+        if not students:
+            continue
+        code = (source['course_code'] or '').strip().upper()
+        year = _year_number(source['year'])
+        cohort = {
+            'course_code': source['course_code'], 'course': source['course'],
+            'from_academic_year': source['academic_year'], 'from_year': str(year), 'students': students,
+        }
+        if year >= final_year[code]:
+            cohorts.append({**cohort, 'status': 'completed', 'to_academic_year': None, 'to_year': None, 'department': None})
+            continue
+        target_key = _key(code, to_ay, year + 1)
+        target = by_key.get(target_key) or new_departments.get(target_key)
+        if target is None:
+            template = by_key.get(_key(code, from_ay, year + 1)) or source
+            target = {
+                **{field: template[field] for field in COPIED_FIELDS},
+                'id': None, 'course_code': source['course_code'], 'academic_year': to_ay, 'year': str(year + 1),
+                'template_id': template['id'],
+            }
+            new_departments[target_key] = target
+        cohorts.append({
+            **cohort, 'status': 'promoted', 'to_academic_year': target['academic_year'], 'to_year': str(year + 1),
+            'department': 'new' if target['id'] is None else 'existing',
+            '_source_id': source['id'], '_target': target,
+        })
+
+    promoted = [c for c in cohorts if c['status'] == 'promoted']
+    totals = {
+        'cohorts': len(cohorts),
+        'students_promoted': sum(c['students'] for c in promoted),
+        'students_completed': sum(c['students'] for c in cohorts if c['status'] == 'completed'),
+        'departments_created': len(new_departments),
+    }
+    if not dry_run and promoted:
+        with transaction.atomic():
+            totals.update(_apply(promoted, list(new_departments.values()), batch_size))
+        activity.log(
+            action='cohort_promotion',
+            description=(f"Promoted {totals['students_promoted']} students from {from_ay} to {to_ay}; "
+                         f"{totals['departments_created']} departments created"),
+        )
+    for cohort in cohorts:
+        cohort.pop('_source_id', None)
+        cohort.pop('_target', None)
+    return {'from_academic_year': from_ay, 'to_academic_year': to_ay, 'dry_run': dry_run, 'totals': totals, 'cohorts': cohorts}
+
+
+def _apply(promoted, new_departments, batch_size):
+    if new_departments:
+        created = Department.objects.bulk_create([
+            Department(**{field: target[field] for field in ('course_code', 'academic_year', 'year', *COPIED_FIELDS)})
+            for target in new_departments
+        ], batch_size=batch_size)
+        for target, department in zip(new_departments, created):
+            target['id'] = department.id
+        template_of = {target['template_id']: [] for target in new_departments}
+        for target in new_departments:
+            template_of[target['template_id']].append(target['id'])
+        DepartmentItemRequirement.objects.bulk_create([
+            DepartmentItemRequirement(department_id=target_id, item_id=item_id, required_qty=qty)
+            for template_id, item_id, qty in DepartmentItemRequirement.objects.filter(
+                department_id__in=list(template_of)
+            ).values_list('department_id', 'item_id', 'required_qty')
+            for target_id in template_of[template_id]
+        ], batch_size=batch_size, ignore_conflicts=True)
+        # Also drops the cached cohort lookups, which remember that these cohorts had no department
+        bump_table_version(Department, DepartmentItemRequirement)
+
+    cohort_of = {cohort['_source_id']: cohort for cohort in promoted}
+    enrollments = [
+        Enrollment(student_id=student_id, department_id=cohort_of[dept_id]['_target']['id'],
+                   academic_year=cohort_of[dept_id]['to_academic_year'], year=cohort_of[dept_id]['to_year'])
+        for student_id, dept_id in Student.objects.filter(department_id__in=list(cohort_of)).values_list('id', 'department_id')
+    ]
+    Enrollment.objects.bulk_create(enrollments, batch_size=batch_size, ignore_conflicts=True)
+    # Highest years first: when both academic years are the same batch, year N+1's department is
+    # itself a source and must be emptied before year N moves into it
+    for cohort in sorted(promoted, key=lambda c: -int(c['from_year'])):
+        Student.objects.filter(department_id=cohort['_source_id']).update(
+            department_id=cohort['_target']['id'], year=cohort['to_year'],
+        )
+
+    targets = defaultdict(set)
+    for cohort in promoted:
+        targets[cohort['to_academic_year']].add(cohort['_target']['id'])
+    for academic_year, department_ids in targets.items():
+        refresh_pending(academic_year=academic_year, department_ids=department_ids, batch_size=batch_size)
+    return {'enrollments': len(enrollments)}
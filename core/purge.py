@@ -0,0 +1,124 @@
+# core/purge.py
+"""Scoped purge of students and everything hanging off them, with raw deletes.
+
+The scope is a set of departments: all of them, those of one academic year,
+one course code, or explicit ids. Students whose current department is in
+scope are deleted together with their PendingItem, IssueRecord,
+PendingReport and Enrollment rows (archived rows included). Departments and
+items are kept.
+
+Deleting through ``QuerySet.delete()`` makes Django's collector load every
+related row into memory first. Here each chunk of student ids is removed with
+one ``DELETE ... WHERE student_id IN (...)`` per table, children before the
+student rows so foreign keys are never violated, and each chunk commits on its
+own transaction. The row counts come from the DELETE statements themselves.
+Database triggers (sync change log, search index) still see every row.
+
+``reclaim`` runs VACUUM and ANALYZE afterwards so the freed pages go back to
+the file system and the planner statistics match the smaller tables. It needs
+autocommit, so it is skipped inside an outer transaction.
+"""
+from django.db import connection, transaction
+
+from .backfill import normalize_academic_year
+from .models import (
+    ArchivedEnrollment, ArchivedIssueRecord, ArchivedPendingReport, Department, Enrollment, IssueRecord,
+    PendingItem, PendingReport, Student,
+)
+
+BATCH_SIZE = 2000
+
+# Deleted in this order for each chunk of students; Student goes last
+STUDENT_TABLES = (
+    PendingItem, IssueRecord, PendingReport, Enrollment,
+    ArchivedIssueRecord, ArchivedPendingReport, ArchivedEnrollment,
+)
+
+
+class PurgeError(Exception):
+    """The purge scope matches no department."""
+
+
+def _departments(academic_year=None, course_code=None, department_ids=None):
+    departments = Department.objects.all()
+    if department_ids:
+        departments = departments.filter(id__in=department_ids)
+    if course_code:
+        departments = departments.filter(course_code__iexact=course_code.strip())
+    rows = departments.values_list('id', 'academic_year')
+    if academic_year:
+        academic_year = normalize_academic_year(academic_year)
+        return [dept_id for dept_id, ay in rows if normalize_academic_year(ay or '') == academic_year]
+    return [dept_id for dept_id, _ in rows]
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _delete(cursor, model, column, ids):
+    marks = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)} WHERE {column} IN ({marks})", ids)
+    return cursor.rowcount
+
+
+def reclaim_space(models=(Student, *STUDENT_TABLES)):
+    """VACUUM / ANALYZE after a large delete; returns the statements run (none inside a transaction)."""
+    if connection.in_atomic_block:
+        return []
+    if connection.vendor == 'sqlite':
+        statements = ['VACUUM', 'ANALYZE']
+    elif connection.vendor == 'postgresql':
+        statements = [f"VACUUM ANALYZE {connection.ops.quote_name(model._meta.db_table)}" for model in models]
+    else:
+        return []
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    return statements
+
+
+def purge(academic_year=None, course_code=None, department_ids=None, dry_run=False, reclaim=False,
+          batch_size=BATCH_SIZE, progress=None):
+    """Delete the students of the scoped departments and their dependent rows; returns counts per table."""
+    say = progress or (lambda message: None)
+    scoped = bool(academic_year or course_code or department_ids)
+    students = Student.objects.all()
+    if scoped:
+        dept_ids = _departments(academic_year, course_code, department_ids)
+        if not dept_ids:
+            raise PurgeError('No department matches the purge scope.')
+        students = students.filter(department_id__in=dept_ids)
+    student_ids = list(students.order_by('id').values_list('id', flat=True))
+    say(f"{len(student_ids)} students in scope")
+
+    deleted = {model._meta.db_table: 0 for model in (*STUDENT_TABLES, Student)}
+    if dry_run:
+        for model in STUDENT_TABLES:
+            deleted[model._meta.db_table] = model.objects.filter(student_id__in=students.values('id')).count()
+        deleted[Student._meta.db_table] = len(student_ids)
+        return {'dry_run': True, 'students': len(student_ids), 'deleted': deleted, 'reclaimed': []}
+
+    if not scoped:
+        # Whole tables: an unqualified DELETE lets SQLite drop them page by page (truncate optimization)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in STUDENT_TABLES:
+                cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+                deleted[model._meta.db_table] = cursor.rowcount
+        say('dependent rows deleted')
+
+    size = max(1, min(batch_size, connection.features.max_query_params or batch_size))
+    done = 0
+    for chunk in _chunks(student_ids, size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in STUDENT_TABLES if scoped else ():
+                deleted[model._meta.db_table] += _delete(cursor, model, 'student_id', chunk)
+            deleted[Student._meta.db_table] += _delete(cursor, Student, 'id', chunk)
+        done += len(chunk)
+        say(f"students deleted: {done}/{len(student_ids)}")
+
+    reclaimed = reclaim_space() if reclaim and student_ids else []
+    if reclaimed:
+        say(f"reclaimed space: {', '.join(reclaimed)}")
+    return {'dry_run': False, 'students': len(student_ids), 'deleted': deleted, 'reclaimed': reclaimed}
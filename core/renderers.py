@@ -0,0 +1,65 @@
+# core/renderers.py
+"""Compact columnar JSON for bulk list responses.
+
+Lists of rows are sent as ``{"columns": [...], "rows": [[...], ...]}`` so key
+names are written once instead of once per row. Requested with
+``?format=columnar`` or ``Accept: application/vnd.aims.columnar+json``.
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.aims.columnar+json'
+COLUMNAR_CHUNK_ROWS = 1000
+
+_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def iter_columnar(columns, rows, chunk_rows=COLUMNAR_CHUNK_ROWS):
+    """Yield the columnar document as UTF-8 byte chunks of ``chunk_rows`` rows each.
+
+    ``rows`` may be any iterable of sequences (e.g. ``values_list().iterator()``),
+    so the full result set never has to be materialised.
+    """
+    yield ('{"columns":' + _encoder.encode(list(columns)) + ',"rows":[').encode('utf-8')
+    buffer = []
+    first = True
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) >= chunk_rows:
+            # One encode call per chunk; strip the outer brackets to splice into the rows array.
+            yield ((',' if not first else '') + _encoder.encode(buffer)[1:-1]).encode('utf-8')
+            buffer = []
+            first = False
+    if buffer:
+        yield ((',' if not first else '') + _encoder.encode(buffer)[1:-1]).encode('utf-8')
+    yield b']}'
+
+
+def columnar_from_dicts(data):
+    """Split a list of dicts into (columns, row iterator). Columns follow the first row's key order."""
+    if not data:
+        return [], iter(())
+    columns = list(data[0].keys())
+    return columns, ([row.get(column) for column in columns] for row in data)
+
+
+class ColumnarJSONRenderer(BaseRenderer):
+    media_type = COLUMNAR_MEDIA_TYPE
+    format = 'columnar'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+            columns, rows = columnar_from_dicts(data)
+            return b''.join(iter_columnar(columns, rows))
+        # Errors and detail responses are not tabular; keep them as plain JSON.
+        return JSONRenderer().render(data, accepted_media_type, renderer_context)
+
+
+def decode_columnar(payload):
+    """Inverse of the columnar encoding, mainly for tests and scripts."""
+    doc = json.loads(payload)
+    columns = doc['columns']
+    return [dict(zip(columns, row)) for row in doc['rows']]
@@ -0,0 +1,266 @@
+# core/search.py
+"""Indexed lookups: the USN / name type-ahead and help-center / activity-log search.
+
+SQLite builds keep FTS5 tables in sync with their source tables through
+triggers (migrations 0026 and 0027), so bulk_create and raw writes are
+indexed too. PostgreSQL uses pg_trgm similarity for students and GIN
+``to_tsvector`` indexes for message text (migrations 0027 and 0034). Other
+backends fall back to plain ``icontains`` lookups. Every backend searches the
+same columns: help-message content, and activity-log description, action and
+user.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Student, HelpMessage, ActivityLog
+
+STUDENT_SEARCH_TABLE = 'core_student_search'
+HELP_MESSAGE_SEARCH_TABLE = 'core_helpmessage_search'
+ACTIVITY_LOG_SEARCH_TABLE = 'core_activitylog_search'
+# Searched columns, in the order of the FTS5 tables and the PostgreSQL index expressions
+HELP_MESSAGE_SEARCH_COLUMNS = ('content',)
+ACTIVITY_LOG_SEARCH_COLUMNS = ('description', 'action', 'user')
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall((query or '').strip())
+
+
+def _fts_match_expression(tokens):
+    # Quote each token so FTS5 operators in user input are treated literally,
+    # and turn every token into a prefix query for type-ahead.
+    return ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def _sqlite_ranked_ids(tokens, limit):
+    sql = (
+        f"SELECT rowid FROM {STUDENT_SEARCH_TABLE} "
+        f"WHERE {STUDENT_SEARCH_TABLE} MATCH %s "
+        f"ORDER BY bm25({STUDENT_SEARCH_TABLE}, 10.0, 5.0, 1.0) LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_fts_match_expression(tokens), limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _postgres_ranked_ids(query, limit):
+    sql = (
+        "SELECT s.id FROM core_student s "
+        "WHERE s.usn %% %s OR s.name %% %s OR s.usn ILIKE %s "
+        "ORDER BY GREATEST(similarity(s.usn, %s), similarity(s.name, %s)) DESC, s.usn "
+        "LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, query, f"{query}%", query, query, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_ids(tokens, limit):
+    condition = Q()
+    for token in tokens:
+        condition &= (
+            Q(usn__icontains=token) | Q(name__icontains=token) |
+            Q(department__course_code__icontains=token) | Q(department__course__icontains=token)
+        )
+    qs = Student.objects.filter(condition).order_by('usn')
+    return list(qs.values_list('id', flat=True)[:limit])
+
+
+def search_students(query, limit=DEFAULT_SEARCH_LIMIT):
+    """Return up to ``limit`` students matching ``query`` as lightweight dicts, best match first."""
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    limit = max(1, min(int(limit or DEFAULT_SEARCH_LIMIT), MAX_SEARCH_LIMIT))
+
+    if connection.vendor == 'sqlite':
+        ids = _sqlite_ranked_ids(tokens, limit)
+    elif connection.vendor == 'postgresql':
+        ids = _postgres_ranked_ids(' '.join(tokens), limit)
+    else:
+        ids = []
+    if not ids:
+        # Substring scan only when the index has nothing, e.g. the middle of a USN was typed.
+        ids = _fallback_ids(tokens, limit)
+
+    rows = Student.objects.filter(id__in=ids).values(
+        'id', 'usn', 'name', 'year', 'department_id',
+        'department__course_code', 'department__course', 'department__academic_year',
+    )
+    by_id = {row['id']: row for row in rows}
+    results = []
+    for student_id in ids:
+        row = by_id.get(student_id)
+        if row is None:
+            continue
+        results.append({
+            'id': row['id'],
+            'usn': row['usn'],
+            'name': row['name'],
+            'year': row['year'],
+            'department_id': row['department_id'],
+            'course_code': row['department__course_code'],
+            'course': row['department__course'],
+            'academic_year': row['department__academic_year'],
+        })
+    return results
+
+
+def rebuild_student_index():
+    """Repopulate the student search index from scratch. Returns the number of indexed rows."""
+    if connection.vendor != 'sqlite':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {STUDENT_SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {STUDENT_SEARCH_TABLE}(rowid, usn, name, department) "
+            "SELECT s.id, s.usn, s.name, COALESCE(d.course_code, '') || ' ' || COALESCE(d.course, '') "
+            "FROM core_student s LEFT JOIN core_department d ON d.id = s.department_id"
+        )
+        return cursor.rowcount
+
+
+# --- Help-center messages and activity log -------------------------------
+
+SNIPPET_TOKENS = 12
+
+
+def _python_snippet(text, tokens, width=80):
+    """Snippet for backends without FTS5: a window around the first hit, hits wrapped in [ ]."""
+    text = text or ''
+    lowered = text.lower()
+    positions = [lowered.find(token.lower()) for token in tokens]
+    positions = [pos for pos in positions if pos >= 0]
+    start = max(0, min(positions) - width // 2) if positions else 0
+    window = text[start:start + width]
+    for token in tokens:
+        window = re.sub(f"({re.escape(token)})", r"[\1]", window, flags=re.IGNORECASE)
+    return ('...' if start else '') + window + ('...' if start + width < len(text) else '')
+
+
+def _text_search(queryset, table, columns, tokens):
+    """Restrict ``queryset`` to rows whose indexed ``columns`` match every token (as a prefix)."""
+    if connection.vendor == 'sqlite':
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [_fts_match_expression(tokens)]
+        ))
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f"{token}:*" for token in tokens)
+        db_table = queryset.model._meta.db_table
+        # Same expression as the GIN index, or the planner cannot use it
+        document = " || ' ' || ".join(f"coalesce({connection.ops.quote_name(column)}, '')" for column in columns)
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT id FROM {db_table} "
+            f"WHERE to_tsvector('simple', {document}) @@ to_tsquery('simple', %s)", [tsquery]
+        ))
+    condition = Q()
+    for token in tokens:
+        any_column = Q()
+        for column in columns:
+            any_column |= Q(**{f"{column}__icontains": token})
+        condition &= any_column
+    return queryset.filter(condition)
+
+
+def _snippets(table, tokens, ids, texts):
+    if not ids:
+        return {}
+    if connection.vendor != 'sqlite':
+        return {row_id: _python_snippet(texts.get(row_id), tokens) for row_id in ids}
+    placeholders = ', '.join(['%s'] * len(ids))
+    sql = (
+        f"SELECT rowid, snippet({table}, 0, '[', ']', '...', {SNIPPET_TOKENS}) FROM {table} "
+        f"WHERE {table} MATCH %s AND rowid IN ({placeholders})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_fts_match_expression(tokens), *ids])
+        return dict(cursor.fetchall())
+
+
+def _page(queryset, cursor, limit):
+    """Keyset paging on descending id; ``cursor`` is the last id of the previous page."""
+    if cursor:
+        queryset = queryset.filter(id__lt=cursor)
+    rows = list(queryset.order_by('-id')[:limit + 1])
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def search_help_messages(query, date_from=None, date_to=None, cursor=None, limit=DEFAULT_SEARCH_LIMIT):
+    """Search help-center message text (admin view, admin-deleted messages excluded)."""
+    tokens = _tokens(query)
+    if not tokens:
+        return [], None
+    limit = max(1, min(int(limit or DEFAULT_SEARCH_LIMIT), MAX_SEARCH_LIMIT))
+    qs = HelpMessage.objects.filter(is_admin_deleted=False).select_related('sender', 'thread__user')
+    if date_from:
+        qs = qs.filter(created_at__date__gte=date_from)
+    if date_to:
+        qs = qs.filter(created_at__date__lte=date_to)
+    qs = _text_search(qs, HELP_MESSAGE_SEARCH_TABLE, HELP_MESSAGE_SEARCH_COLUMNS, tokens)
+    messages, next_cursor = _page(qs, cursor, limit)
+    snippets = _snippets(
+        HELP_MESSAGE_SEARCH_TABLE, tokens, [m.id for m in messages], {m.id: m.content for m in messages}
+    )
+    results = [{
+        'id': message.id,
+        'thread_id': message.thread_id,
+        'thread_user_id': message.thread.user_id,
+        'thread_username': message.thread.user.username,
+        'sender_username': message.sender.username,
+        'created_at': message.created_at,
+        'snippet': snippets.get(message.id) or _python_snippet(message.content, tokens),
+    } for message in messages]
+    return results, next_cursor
+
+
+def search_activity_logs(query, date_from=None, date_to=None, cursor=None, limit=DEFAULT_SEARCH_LIMIT):
+    """Search activity-log descriptions, action codes and user names."""
+    tokens = _tokens(query)
+    if not tokens:
+        return [], None
+    limit = max(1, min(int(limit or DEFAULT_SEARCH_LIMIT), MAX_SEARCH_LIMIT))
+    qs = ActivityLog.objects.all()
+    if date_from:
+        qs = qs.filter(timestamp__date__gte=date_from)
+    if date_to:
+        qs = qs.filter(timestamp__date__lte=date_to)
+    qs = _text_search(qs, ACTIVITY_LOG_SEARCH_TABLE, ACTIVITY_LOG_SEARCH_COLUMNS, tokens)
+    logs, next_cursor = _page(qs, cursor, limit)
+    snippets = _snippets(
+        ACTIVITY_LOG_SEARCH_TABLE, tokens, [log.id for log in logs], {log.id: log.description for log in logs}
+    )
+    results = [{
+        'id': log.id,
+        'action': log.action,
+        'user': log.user,
+        'timestamp': log.timestamp,
+        'snippet': snippets.get(log.id) or _python_snippet(log.description, tokens),
+    } for log in logs]
+    return results, next_cursor
+
+
+def rebuild_message_indexes():
+    """Repopulate the help-message and activity-log indexes. Returns indexed row counts."""
+    if connection.vendor != 'sqlite':
+        return {'help_messages': 0, 'activity_logs': 0}
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {HELP_MESSAGE_SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {HELP_MESSAGE_SEARCH_TABLE}(rowid, content) "
+            "SELECT id, COALESCE(content, '') FROM core_helpmessage"
+        )
+        help_count = cursor.rowcount
+        cursor.execute(f"DELETE FROM {ACTIVITY_LOG_SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {ACTIVITY_LOG_SEARCH_TABLE}(rowid, description, action, user) "
+            "SELECT id, COALESCE(description, ''), COALESCE(action, ''), COALESCE(user, '') FROM core_activitylog"
+        )
+        return {'help_messages': help_count, 'activity_logs': cursor.rowcount}
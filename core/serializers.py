@@ -1,11 +1,36 @@
 # core/serializers.py (FINALIZED)
 from rest_framework import serializers
+from rest_framework.exceptions import ParseError
 from .models import (
     User, Department, Student, Item, IssueRecord, PendingReport, ActivityLog,
     Enrollment, DepartmentItemRequirement, HelpThread, HelpMessage, Notification,
-    InventoryOrder, InventoryReceipt, StockLogEntry
+    InventoryOrder, InventoryReceipt, StockLogEntry, PendingItem
 )
 
+def unknown_fields_error(unknown, valid):
+    """400 for ``?fields=`` names that are not part of the output (shared with the flat list path)."""
+    return ParseError({'error': f"Unknown fields: {', '.join(sorted(unknown))}. Valid fields: {', '.join(valid)}"})
+
+
+class SparseFieldsMixin:
+    """Trim output to ``?fields=a,b,c`` on GET requests; an unknown name is a 400."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        raw = request.query_params.get('fields') or ''
+        wanted = {name.strip() for name in raw.split(',') if name.strip()}
+        if not wanted:
+            return
+        unknown = wanted - set(self.fields)
+        if unknown:
+            raise unknown_fields_error(unknown, [name for name, field in self.fields.items() if not field.write_only])
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -37,7 +62,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
         
         return super().to_internal_value(data)
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer(read_only=True) 
     department_id = serializers.PrimaryKeyRelatedField(
         queryset=Department.objects.all(), source='department', write_only=True
@@ -52,7 +77,7 @@ class StudentBasicSerializer(serializers.ModelSerializer):
         model = Student
         fields = ('id', 'usn', 'name', 'email', 'phone')
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student = StudentBasicSerializer(read_only=True)
     student_id = serializers.PrimaryKeyRelatedField(queryset=Student.objects.all(), source='student', write_only=True)
     department = DepartmentSerializer(read_only=True)
@@ -227,7 +252,7 @@ class InventoryReceiptSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class InventoryOrderSerializer(serializers.ModelSerializer):
+class InventoryOrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     item_id = serializers.PrimaryKeyRelatedField(queryset=Item.objects.all(), source='item')
     item_code = serializers.CharField(source='item.item_code', read_only=True)
     item_name = serializers.CharField(source='item.name', read_only=True)
@@ -280,3 +305,15 @@ class StockLogEntrySerializer(serializers.ModelSerializer):
         read_only_fields = (
             'id', 'created_at', 'created_by', 'created_by_username', 'order_id', 'receipt_id'
         )
+
+
+class PendingItemSerializer(serializers.ModelSerializer):
+    usn = serializers.CharField(source='student.usn', read_only=True)
+    item_code = serializers.CharField(source='item.item_code', read_only=True)
+
+    class Meta:
+        model = PendingItem
+        fields = (
+            'id', 'student', 'usn', 'department', 'academic_year', 'year', 'item', 'item_code',
+            'required_qty', 'issued_qty', 'pending_qty', 'updated_at',
+        )
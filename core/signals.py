@@ -1,18 +1,16 @@
 # core/signals.py (NEW FILE - ADD THIS CODE)
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Student, PendingReport
+from .models import Student, PendingReport, Item, Department, DepartmentItemRequirement
+from .versioning import bump_table_version
+from .pending import LEGACY_DEPARTMENT_FIELDS
+
+# Reference tables served with ETags; every write bumps their version counter
+VERSIONED_MODELS = (Item, Department, DepartmentItemRequirement)
 
 # Map item codes (frontend/Dept model style) to the fields in the Department model
-DEPT_FIELD_MAP = {
-    '2PN': 'two_hundred_notebook',
-    '2PR': 'two_hundred_record',
-    '2PO': 'two_hundred_observation',
-    '1PN': 'one_hundred_notebook',
-    '1PR': 'one_hundred_record',
-    '1PO': 'one_hundred_observation',
-}
+DEPT_FIELD_MAP = LEGACY_DEPARTMENT_FIELDS
 
 @receiver(post_save, sender=Student)
 def create_initial_pending_report(sender, instance, created, **kwargs):
@@ -52,4 +50,22 @@ def create_initial_pending_report(sender, instance, created, **kwargs):
             PendingReport.objects.create(**report_data)
         except Exception as e:
             # Handle the case if the student already had a report (unlikely with 'created')
-            print(f"Error creating initial PendingReport for {instance.usn}: {e}")
\ No newline at end of file
+            print(f"Error creating initial PendingReport for {instance.usn}: {e}")
+
+
+# Item saves that only move stock leave the cached catalog (codes and names) valid
+STOCK_ONLY_FIELDS = frozenset({'quantity'})
+
+
+def bump_reference_table_version(sender, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    update_fields = kwargs.get('update_fields')
+    stock_only = sender is Item and bool(update_fields) and set(update_fields) <= STOCK_ONLY_FIELDS
+    bump_table_version(sender, reference=not stock_only)
+
+
+# Connected per model (not globally) so unrelated cascades keep Django's fast-delete path
+for _model in VERSIONED_MODELS:
+    post_save.connect(bump_reference_table_version, sender=_model, dispatch_uid=f'table_version_save_{_model.__name__}')
+    post_delete.connect(bump_reference_table_version, sender=_model, dispatch_uid=f'table_version_delete_{_model.__name__}')
@@ -15,7 +15,7 @@ const normalizeHeader = (header) => {
 
 // Helper function for making authenticated API requests (ADDED)
 async function authFetch(url, options = {}) {
-    const response = await fetch(url, options);
+    const response = await (window.conditionalFetch || fetch)(url, options);
     if (response.status === 401) {
         // If unauthorized, redirect to the login page
         window.location.href = '/login'; 
@@ -68,6 +68,7 @@ document.addEventListener("DOMContentLoaded", function () {
     // Corrected ID for the file input and button
     const fileInput = document.getElementById("excel-file");
     const importButton = document.getElementById("import-btn");
+    const previewButton = document.getElementById("preview-btn");
     const backToStudentsBtn = document.getElementById('backToStudentsBtn');
     const urlParams = new URLSearchParams(window.location.search);
     const fromDepartments = urlParams.get('source') === 'departments';
@@ -84,6 +85,13 @@ document.addEventListener("DOMContentLoaded", function () {
         });
     }
 
+    if (previewButton && fileInput) {
+        previewButton.addEventListener("click", (event) => {
+            event.preventDefault();
+            handleBulkUpload(fileInput.files[0], { preview: true });
+        });
+    }
+
     const openInstructions = () => {
         if (!instructionsModal) return;
         instructionsModal.removeAttribute('hidden');
@@ -145,7 +153,8 @@ document.addEventListener("DOMContentLoaded", function () {
     }
 });
 
-async function handleBulkUpload(file) {
+// With { preview: true } the parsed rows go to the dry-run endpoint and nothing is written
+async function handleBulkUpload(file, { preview = false } = {}) {
     if (!file) {
         showMessage("Please select an Excel or CSV file.", true);
         return;
@@ -298,8 +307,9 @@ async function handleBulkUpload(file) {
             // Preview
             renderImportedStudents(allStudents);
 
-            // Upload combined students
-            const response = await authFetch(`${API_BASE_URL}/students/bulk_upload/`, {
+            // Upload combined students (or ask what uploading them would change)
+            const endpoint = preview ? `${API_BASE_URL}/students/bulk_upload/preview/` : `${API_BASE_URL}/students/bulk_upload/`;
+            const response = await authFetch(endpoint, {
                 method: 'POST',
                 headers: { 
                     'Content-Type': 'application/json',
@@ -313,7 +323,11 @@ async function handleBulkUpload(file) {
             let result = null;
             try { result = rawText ? JSON.parse(rawText) : {}; } catch (_) { /* non-JSON */ }
 
-            if (response.ok) {
+            if (response.ok && preview) {
+                renderUploadPreview(result || {});
+                showMessage("Preview ready. Nothing has been saved yet.", false);
+            } else if (response.ok) {
+                renderUploadPreview(null);
                 const created = result?.created ?? null;
                 const updated = result?.updated ?? null;
                 const createdEnrollments = result?.created_enrollments ?? null;
@@ -337,6 +351,42 @@ async function handleBulkUpload(file) {
     reader.readAsArrayBuffer(file);
 }
 
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, ch => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[ch]));
+}
+
+// Summary of /students/bulk_upload/preview/: counts plus a few sample rows per category
+function renderUploadPreview(result) {
+    const panel = document.getElementById("upload-preview");
+    if (!panel) return;
+    if (!result) {
+        panel.innerHTML = '';
+        panel.hidden = true;
+        return;
+    }
+    const students = result.students || {};
+    const samples = result.samples || {};
+    const list = (title, rows, format) => {
+        if (!rows || !rows.length) return '';
+        return `<h4>${escapeHtml(title)}</h4><ul>${rows.map(row => `<li>${escapeHtml(format(row))}</li>`).join('')}</ul>`;
+    };
+    panel.innerHTML = `
+        <h3>Preview</h3>
+        <p>Rows: ${result.received ?? 0} (skipped ${result.skipped ?? 0}).
+           Students - Create: ${students.create ?? 0}, Update: ${students.update ?? 0}, Unchanged: ${students.unchanged ?? 0}.
+           Enrollments to create: ${result.enrollments_to_create ?? 0}.
+           Unknown departments: ${result.unknown_departments ?? 0}. Duplicate USNs: ${result.duplicate_usns ?? 0}.</p>
+        ${list('Updates', samples.updates, row => `${row.usn}: ` + Object.entries(row.changes || {})
+            .map(([field, [before, after]]) => `${field} ${before ?? ''} -> ${after ?? ''}`).join(', '))}
+        ${list('New students', samples.creates, row => `${row.usn} - ${row.name} (${row.course_code} ${row.academic_year} Y${row.year})`)}
+        ${list('Unknown departments (will be created)', samples.unknown_departments,
+            row => `${row.course_code} / ${row.course} / ${row.academic_year} / Y${row.year}: ${row.students} student(s)`)}
+        ${list('Duplicate USNs', samples.duplicate_usns, row => `${row.usn}: rows ${(row.rows || []).join(', ')}`)}
+        ${list('Skipped rows (missing USN, name, course code or course)', samples.skipped, row => `Row ${row.row}: ${row.usn || '-'} ${row.name || ''}`)}
+    `;
+    panel.hidden = false;
+}
+
 function renderImportedStudents(students) {
     const tableBody = document.getElementById("imported-students-body");
     if (!tableBody) return;
@@ -89,3 +89,76 @@
     }
   }
 })();
+
+// Columnar list responses (?format=columnar): {columns: [...], rows: [[...]]} -> array of row objects
+(function(){
+  window.decodeColumnar = function(payload) {
+    if (!payload || !Array.isArray(payload.columns) || !Array.isArray(payload.rows)) {
+      return Array.isArray(payload) ? payload : [];
+    }
+    const columns = payload.columns;
+    return payload.rows.map(row => {
+      const obj = {};
+      for (let i = 0; i < columns.length; i++) obj[columns[i]] = row[i];
+      return obj;
+    });
+  };
+})();
+
+// Conditional GET for API reads: remembers ETag + body per URL and sends If-None-Match,
+// so unchanged reference data (items, departments, requirements) comes back as a 304.
+(function(){
+  const STORE_PREFIX = 'etag-cache:';
+  const MAX_BODY_CHARS = 2 * 1024 * 1024;
+  const memory = new Map();
+
+  function readEntry(key) {
+    if (memory.has(key)) return memory.get(key);
+    try {
+      const raw = sessionStorage.getItem(STORE_PREFIX + key);
+      if (!raw) return null;
+      const entry = JSON.parse(raw);
+      memory.set(key, entry);
+      return entry;
+    } catch (_) {
+      return null;
+    }
+  }
+
+  function writeEntry(key, entry) {
+    memory.set(key, entry);
+    try {
+      sessionStorage.setItem(STORE_PREFIX + key, JSON.stringify(entry));
+    } catch (_) { /* quota exceeded: keep the in-memory copy only */ }
+  }
+
+  window.conditionalFetch = async function(url, options = {}) {
+    const method = String(options.method || 'GET').toUpperCase();
+    if (method !== 'GET') return fetch(url, options);
+
+    const key = String(url);
+    const cached = readEntry(key);
+    const headers = new Headers(options.headers || {});
+    if (cached && cached.etag && !headers.has('If-None-Match')) {
+      headers.set('If-None-Match', cached.etag);
+    }
+    const response = await fetch(url, { ...options, headers });
+
+    if (response.status === 304 && cached) {
+      return new Response(cached.body, {
+        status: 200,
+        headers: { 'Content-Type': cached.contentType || 'application/json', 'ETag': cached.etag }
+      });
+    }
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+      try {
+        const body = await response.clone().text();
+        if (body.length <= MAX_BODY_CHARS) {
+          writeEntry(key, { etag, body, contentType: response.headers.get('Content-Type') });
+        }
+      } catch (_) { /* body not readable; skip caching */ }
+    }
+    return response;
+  };
+})();
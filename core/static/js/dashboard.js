@@ -59,7 +59,7 @@ function getCookie(name) {
 }
 
 async function authFetch(url, options = {}) {
-    const response = await fetch(url, options);
+    const response = await (window.conditionalFetch || fetch)(url, options);
     if (response.status === 401) {
         window.location.href = '/login';
         throw new Error('Unauthorized');
@@ -375,7 +375,7 @@ async function authFetch(url, options = {}) {
         options.headers['X-CSRFToken'] = getCookie('csrftoken');
     }
 
-    const response = await fetch(url, options);
+    const response = await (window.conditionalFetch || fetch)(url, options);
 
     if (response.status === 401) {
         // Redirect to login page if unauthorized
@@ -0,0 +1,146 @@
+// core/static/js/distribution_session.js
+// In-memory state for one cohort during distribution at the issue counter.
+// /api/distribution-session/ returns the roster, requirements, issued totals and
+// stock in columns; they are unpacked once into a USN -> row Map and typed
+// arrays so that a scan resolves without a request. Issues are applied to the
+// local totals immediately and committed by issue.js in small batches.
+(function(){
+  const SESSION_URL = '/api/distribution-session/';
+
+  let state = null;
+
+  function upper(value) {
+    return String(value || '').trim().toUpperCase();
+  }
+
+  function normalizeDash(value) {
+    return String(value || '').replace(/[\u2010-\u2015\u2212]/g, '-').trim();
+  }
+
+  function cohortKey(cohort) {
+    return [cohort.course_code, cohort.course, normalizeDash(cohort.academic_year), cohort.year]
+      .map(part => upper(part)).join('|');
+  }
+
+  function build(data) {
+    const usns = data.students.usn || [];
+    const rowByUsn = new Map();
+    usns.forEach((usn, index) => rowByUsn.set(upper(usn), index));
+    const items = (data.items || []).map(item => ({ ...item, item_code: upper(item.item_code) }));
+    const columns = new Map(Object.entries(data.issued || {}).map(([code, column]) => [upper(code), column]));
+    const issued = new Map();
+    items.forEach(item => {
+      const column = columns.get(item.item_code) || [];
+      issued.set(item.item_code, Int32Array.from({ length: usns.length }, (_, i) => Number(column[i] || 0)));
+    });
+    const stock = new Map(Object.entries(data.stock || {}).map(([code, qty]) => [upper(code), Number(qty || 0)]));
+    return {
+      key: cohortKey(data),
+      cohort: {
+        course_code: data.course_code, course: data.course,
+        academic_year: data.academic_year, year: String(data.year),
+      },
+      departmentId: data.department_id,
+      rosterVersion: data.roster_version,
+      loadedAt: Date.now(),
+      usns,
+      names: data.students.name || [],
+      rowByUsn,
+      items,
+      required: new Map(items.map(item => [item.item_code, Number(item.required_qty || 0)])),
+      issued,
+      stock,
+    };
+  }
+
+  async function start(cohort) {
+    const params = new URLSearchParams({
+      course_code: cohort.course_code || '',
+      course: cohort.course || '',
+      academic_year: cohort.academic_year || '',
+      year: cohort.year || '',
+    });
+    const response = await fetch(`${SESSION_URL}?${params.toString()}`, { headers: { 'Accept': 'application/json' } });
+    if (!response.ok) {
+      let message = `HTTP ${response.status}`;
+      try { message = (await response.json()).error || message; } catch (_) {}
+      throw new Error(message);
+    }
+    state = build(await response.json());
+    return summary();
+  }
+
+  function reload() {
+    return state ? start(state.cohort) : Promise.resolve(null);
+  }
+
+  function stop() {
+    state = null;
+  }
+
+  function active() {
+    return !!state;
+  }
+
+  function covers(cohort) {
+    return !!state && cohortKey(cohort) === state.key;
+  }
+
+  function has(usn) {
+    return !!state && state.rowByUsn.has(upper(usn));
+  }
+
+  // Same shape as /api/student-records/<usn>/: one aggregated "issued" row per item plus pending per item
+  function records(usn) {
+    if (!has(usn)) return null;
+    const row = state.rowByUsn.get(upper(usn));
+    const issued = [];
+    const pending = {};
+    state.items.forEach(item => {
+      const qty = state.issued.get(item.item_code)[row];
+      if (qty > 0) {
+        issued.push({
+          item_code: item.item_code, qty_issued: qty, remarks: '', status: 'Issued',
+          academic_year: state.cohort.academic_year, year: state.cohort.year,
+        });
+      }
+      pending[item.item_code] = Math.max(0, state.required.get(item.item_code) - qty);
+    });
+    return { issued, pending };
+  }
+
+  function requirementMap() {
+    return state ? Object.fromEntries(state.required) : {};
+  }
+
+  function stockMap() {
+    return state ? new Map(state.stock) : new Map();
+  }
+
+  function student(usn) {
+    if (!has(usn)) return null;
+    const row = state.rowByUsn.get(upper(usn));
+    return { usn: state.usns[row], name: state.names[row] };
+  }
+
+  // Apply an issue locally (lines: [{item_code, quantity}]) ahead of the server commit
+  function recordIssue(usn, lines) {
+    if (!has(usn)) return;
+    const row = state.rowByUsn.get(upper(usn));
+    (lines || []).forEach(line => {
+      const code = upper(line.item_code);
+      const qty = Number(line.quantity || 0);
+      if (state.issued.has(code)) state.issued.get(code)[row] += qty;
+      if (state.stock.has(code)) state.stock.set(code, state.stock.get(code) - qty);
+    });
+  }
+
+  function summary() {
+    if (!state) return null;
+    return { cohort: { ...state.cohort }, students: state.usns.length, items: state.items.length, loadedAt: state.loadedAt };
+  }
+
+  window.DistributionSession = {
+    start, reload, stop, active, covers, has, records, requirementMap, stockMap, student, recordIssue, summary,
+  };
+})();
@@ -51,7 +51,7 @@ function getCookie(name) {
 }
 
 async function authFetch(url, options = {}) {
-    const response = await fetch(url, options);
+    const response = await (window.conditionalFetch || fetch)(url, options);
     return response;
 }
 
@@ -595,6 +595,10 @@ function renderIssueRows(items) {
 async function fetchStudentRecords(usn) {
     // This API endpoint MUST return a dictionary like: 
     // { issued: [<IssueRecordSerializer objects>], pending: <PendingReportSerializer object> }
+    if (sessionCovers(currentCohort(usn)) && window.DistributionSession.has(usn)) {
+        studentIssueRecords[usn] = window.DistributionSession.records(usn);
+        return;
+    }
     try {
         // Build cohort-aware query params. If Year is blank but AY is selected,
         // infer student's year from enrollments for this (Code, Course, AY).
@@ -729,7 +733,10 @@ async function updateIssueTableData(usn) {
 
     // Fetch cohort requirements for non-legacy items only when EVERYTHING incl. USN is selected
     const canFetchRequirements = hasFullSelection;
-    if (canFetchRequirements) {
+    const sessionCohort = { course_code: codeSel, course: courseSel, academic_year: aySel, year: yearSel };
+    if (canFetchRequirements && sessionCovers(sessionCohort)) {
+        reqMap = window.DistributionSession.requirementMap();
+    } else if (canFetchRequirements) {
         try {
             const qs = new URLSearchParams({
                 course_code: codeSel,
@@ -859,6 +866,164 @@ function updateTotals() {
     setTotal('totalNew', totalNew);
 }
 
+// ===========================================
+// OFFLINE ISSUE QUEUE
+// ===========================================
+// Every submission carries an Idempotency-Key, so re-sending it after a lost
+// response replays the first result instead of issuing twice. Submissions
+// that cannot reach the server are kept in localStorage and flushed through
+// /api/issue-sync/ once the network is back.
+const ISSUE_QUEUE_KEY = 'issueQueue_v1';
+const ISSUE_QUEUE_FLUSH_MS = 30000;
+const ISSUE_SYNC_BATCH = 200; // server limit per sync request
+const QUEUEABLE_STATUSES = [502, 503, 504];
+// During a distribution session issues are committed in small batches this often
+const SESSION_FLUSH_MS = 3000;
+let issueQueueFlushing = false;
+let sessionFlushTimer = null;
+
+function newIdempotencyKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+function readIssueQueue() {
+    try { return JSON.parse(localStorage.getItem(ISSUE_QUEUE_KEY) || '[]'); } catch (_) { return []; }
+}
+
+function writeIssueQueue(queue) {
+    try { localStorage.setItem(ISSUE_QUEUE_KEY, JSON.stringify(queue)); } catch (_) {}
+}
+
+function queueIssue(idempotencyKey, payload) {
+    const queue = readIssueQueue();
+    if (!queue.some(entry => entry.idempotency_key === idempotencyKey)) {
+        queue.push({ idempotency_key: idempotencyKey, queued_at: new Date().toISOString(), payload });
+        writeIssueQueue(queue);
+    }
+    return queue.length;
+}
+
+async function flushIssueQueue() {
+    if (issueQueueFlushing || !navigator.onLine) return;
+    const batch = readIssueQueue().slice(0, ISSUE_SYNC_BATCH);
+    if (batch.length === 0) return;
+
+    issueQueueFlushing = true;
+    try {
+        const response = await authFetch(`${API_BASE_URL}/issue-sync/`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            // Entries must match the original submission exactly (key + payload) to be recognised on replay
+            body: JSON.stringify({ issues: batch.map(entry => ({ idempotency_key: entry.idempotency_key, ...entry.payload })) })
+        });
+        if (!response.ok) return; // server busy: keep everything for the next attempt
+
+        const result = await response.json();
+        const outcomes = result.results || [];
+        const settled = new Set(outcomes.map(r => r.idempotency_key));
+        writeIssueQueue(readIssueQueue().filter(entry => !settled.has(entry.idempotency_key)));
+
+        const usnByKey = new Map(batch.map(entry => [entry.idempotency_key, entry.payload.student_usn]));
+        const rejected = outcomes.filter(r => r.status === 'rejected');
+        const inSession = !!window.DistributionSession?.active();
+        if (rejected.length > 0) {
+            const details = rejected.map(r => `${usnByKey.get(r.idempotency_key) || '?'}: ${r.error}`).join('; ');
+            showMessage(`${rejected.length} queued issue(s) could not be applied – ${details}`, true);
+            // Local session totals already counted the rejected issues; start again from the server's numbers
+            if (inSession) await window.DistributionSession.reload();
+        } else if (!inSession) {
+            showMessage(`Synced ${outcomes.length} queued issue(s).`, false);
+        }
+        updateSessionStatus();
+
+        const currentUsn = document.getElementById('usn')?.value;
+        // A session already shows what was just committed unless something was rejected
+        if (currentUsn && (!inSession || rejected.length > 0)) {
+            await refreshInventoryCache();
+            await fetchStudentRecords(currentUsn);
+            await updateIssueTableData(currentUsn);
+        }
+    } catch (error) {
+        console.warn('Queued issue sync failed; will retry:', error);
+    } finally {
+        issueQueueFlushing = false;
+    }
+}
+
+// ===========================================
+// DISTRIBUTION SESSION
+// ===========================================
+function currentCohort(usn = null) {
+    const cohort = {
+        course_code: document.getElementById('course-code')?.value || '',
+        course: document.getElementById('course')?.value || '',
+        academic_year: normalizeDash(document.getElementById('academic-year')?.value || ''),
+        year: document.getElementById('year')?.value || '',
+    };
+    if (!cohort.year && usn && (cohort.course_code || cohort.course || cohort.academic_year)) {
+        const enr = findStudentEnrollment(usn, cohort.course_code, cohort.course, cohort.academic_year);
+        if (enr && enr.year != null) cohort.year = String(enr.year);
+    }
+    return cohort;
+}
+
+function sessionCovers(cohort) {
+    return !!window.DistributionSession?.covers(cohort);
+}
+
+function updateSessionStatus() {
+    const statusEl = document.getElementById('sessionStatus');
+    const button = document.getElementById('sessionBtn');
+    const summary = window.DistributionSession?.summary();
+    if (button) button.textContent = summary ? 'End Distribution Session' : 'Start Distribution Session';
+    if (!statusEl) return;
+    if (!summary) {
+        statusEl.textContent = '';
+        return;
+    }
+    const c = summary.cohort;
+    statusEl.textContent = `Session: ${c.course_code} ${c.course} ${c.academic_year} Year ${c.year} – `
+        + `${summary.students} students loaded, ${readIssueQueue().length} issue(s) waiting to commit`;
+}
+
+async function toggleDistributionSession() {
+    const session = window.DistributionSession;
+    if (!session) return;
+    if (session.active()) {
+        clearInterval(sessionFlushTimer);
+        sessionFlushTimer = null;
+        await flushIssueQueue();
+        session.stop();
+        updateSessionStatus();
+        showMessage('Distribution session ended.', false);
+        return;
+    }
+    const cohort = currentCohort();
+    if (!(cohort.course_code && cohort.course && cohort.academic_year && cohort.year)) {
+        showMessage('Select Course Code, Course, Academic Year and Year to start a session.', true);
+        return;
+    }
+    try {
+        const summary = await session.start(cohort);
+        sessionFlushTimer = setInterval(flushIssueQueue, SESSION_FLUSH_MS);
+        updateSessionStatus();
+        showMessage(`Session started: ${summary.students} students loaded.`, false);
+        const usn = document.getElementById('usn')?.value;
+        if (usn) {
+            await fetchStudentRecords(usn);
+            await updateIssueTableData(usn);
+        }
+    } catch (error) {
+        showMessage(`Could not start session: ${error.message}`, true);
+    }
+}
+
 async function handleIssue() {
     const usn = document.getElementById('usn').value;
     if (!usn) {
@@ -870,8 +1035,13 @@ async function handleIssue() {
     const issueData = [];
     const lowStockWarnings = [];
     const tableRows = document.querySelectorAll('#issueTableBody tr');
+    const inSession = sessionCovers(currentCohort(usn)) && window.DistributionSession.has(usn);
 
-    await refreshInventoryCache();
+    if (inSession) {
+        window.DistributionSession.stockMap().forEach((qty, code) => ITEM_STOCK_MAP.set(code, qty));
+    } else {
+        await refreshInventoryCache();
+    }
 
     tableRows.forEach(row => {
         const input = row.querySelector('.new-issue-input');
@@ -907,6 +1077,8 @@ async function handleIssue() {
         return;
     }
     
+    const idempotencyKey = newIdempotencyKey();
+    let submissionPayload = null;
     try {
         // Build cohort info from current filters; infer year when not selected
         const code = document.getElementById('course-code')?.value || '';
@@ -917,7 +1089,7 @@ async function handleIssue() {
             const enr = findStudentEnrollment(usn, code, course, aySel);
             if (enr && enr.year != null) yearSel = String(enr.year);
         }
-        const submissionPayload = {
+        submissionPayload = {
             student_usn: usn,
             issues: issueData,
             course_code: code,
@@ -928,15 +1100,40 @@ async function handleIssue() {
             overall_remarks: overallRemarks 
         };
 
+        if (inSession) {
+            // Counted locally now, committed with the next batch (see flushIssueQueue)
+            queueIssue(idempotencyKey, submissionPayload);
+            window.DistributionSession.recordIssue(usn, issueData);
+            await fetchStudentRecords(usn);
+            await updateIssueTableData(usn);
+            document.getElementById('overallRemarks').value = '';
+            updateSessionStatus();
+            showMessage(`Issued to ${usn}; it will be saved with the next batch.`, false);
+            return;
+        }
+
+        if (!navigator.onLine) {
+            const queued = queueIssue(idempotencyKey, submissionPayload);
+            showMessage(`Offline: issue saved on this device and will sync when the network is back (${queued} waiting).`, true);
+            return;
+        }
+
         const response = await authFetch(`${API_BASE_URL}/issue-bulk-create/`, { 
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'X-CSRFToken': getCookie('csrftoken')
+                'X-CSRFToken': getCookie('csrftoken'),
+                'Idempotency-Key': idempotencyKey
             },
             body: JSON.stringify(submissionPayload)
         });
 
+        if (QUEUEABLE_STATUSES.includes(response.status)) {
+            const queued = queueIssue(idempotencyKey, submissionPayload);
+            showMessage(`Server unavailable: issue saved on this device and will be retried (${queued} waiting).`, true);
+            return;
+        }
+
         if (!response.ok) {
             let message = `HTTP ${response.status}`;
             try {
@@ -977,6 +1174,12 @@ async function handleIssue() {
         if (error.message === 'Insufficient inventory') {
             return;
         }
+        if (error instanceof TypeError && submissionPayload) {
+            // fetch() rejects with TypeError when the request or its response was lost in transit
+            const queued = queueIssue(idempotencyKey, submissionPayload);
+            showMessage(`Network error: issue saved on this device and will be retried (${queued} waiting).`, true);
+            return;
+        }
         if (error.message !== 'Unauthorized') {
             showMessage("An unexpected network error occurred during issue submission. Check console.", true);
         }
@@ -988,6 +1191,11 @@ async function handleIssue() {
 document.addEventListener("DOMContentLoaded", async function() {
     await fetchInitialData();
 
+    // Send anything queued while offline, now and whenever the connection returns
+    flushIssueQueue();
+    window.addEventListener('online', flushIssueQueue);
+    setInterval(flushIssueQueue, ISSUE_QUEUE_FLUSH_MS);
+
     // Change event listeners - these trigger the sync logic
     document.getElementById('course-code')?.addEventListener('change', function(e) {
         console.log('Course Code changed to:', this.value);
@@ -1032,6 +1240,11 @@ document.addEventListener("DOMContentLoaded", async function() {
         event.preventDefault(); 
         handleIssue();
     });
+
+    document.getElementById('sessionBtn')?.addEventListener('click', (event) => {
+        event.preventDefault();
+        toggleDistributionSession();
+    });
     
     document.getElementById('generate-report-btn')?.addEventListener('click', async (event) => {
         event.preventDefault(); // Prevents default form submission if button is type="submit"
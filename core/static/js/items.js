@@ -12,7 +12,7 @@ Chart.register(ChartDataLabels);
 
 async function authFetch(url, options = {}) {
     try {
-        const response = await fetch(url, options);
+        const response = await (window.conditionalFetch || fetch)(url, options);
         return response;
     } catch (e) {
         console.error("Fetch error:", e);
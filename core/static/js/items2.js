@@ -79,7 +79,7 @@ async function authFetch(url, options = {}) {
   if (opts.method !== 'GET' && !opts.headers['X-CSRFToken']) {
     opts.headers['X-CSRFToken'] = getCookie('csrftoken');
   }
-  const response = await fetch(url, opts);
+  const response = await (window.conditionalFetch || fetch)(url, opts);
   return response;
 }
 
@@ -887,41 +887,13 @@ function renderStockLog() {
 }
 
 function exportStockLogXLSX() {
-  const logs = Array.isArray(stockLogCache) ? [...stockLogCache] : [];
+  // Generated and streamed by the server so large logs never have to be held in the browser
   const year = document.getElementById('stock-log-year')?.value;
   const month = document.getElementById('stock-log-month')?.value;
-  let counter = 1;
-  const monthLabel = month ? new Date(2000, Number(month) - 1, 1).toLocaleString(undefined, { month: 'long' }) : 'All Months';
-  const titleRow = ['Stock Change Log'];
-  const filterRow = [
-    'Filters',
-    `Year: ${year || 'All Years'}`,
-    `Month: ${month ? monthLabel : 'All Months'}`
-  ];
-  const rows = [titleRow, filterRow, [], ['#','Item','Change','Reason','Date']];
-  logs.forEach((log) => {
-    const dt = log?.created_at ? new Date(log.created_at) : null;
-    if (!dt || Number.isNaN(dt.getTime())) return;
-    const logYear = String(dt.getFullYear());
-    const logMonth = String(dt.getMonth() + 1).padStart(2, '0');
-    if (year && logYear !== year) return;
-    if (month && logMonth !== month) return;
-    rows.push([
-      counter++,
-      String(log.item_name || log.item_code || ''),
-      log.change,
-      String(log.reason || ''),
-      dt.toLocaleString()
-    ]);
-  });
-  const wb = XLSX.utils.book_new();
-  const ws = XLSX.utils.aoa_to_sheet(rows);
-  ws['!merges'] = [{ s: { r: 0, c: 0 }, e: { r: 0, c: 4 } }];
-  ws['!autofilter'] = { ref: `A4:E${Math.max(4, rows.length)}` };
-  ws['!cols'] = [ {wch:4}, {wch:36}, {wch:10}, {wch:28}, {wch:24} ];
-  XLSX.utils.book_append_sheet(wb, ws, 'Stock Log');
-  const filename = `stock_change_log_${new Date().toISOString().slice(0,19).replace(/[:T]/g,'-')}.xlsx`;
-  XLSX.writeFile(wb, filename);
+  const params = new URLSearchParams({ file_type: 'xlsx' });
+  if (year) params.set('year', year);
+  if (month) params.set('month', String(Number(month)));
+  window.location.href = `${API_BASE_URL}/stock-logs/export/?${params.toString()}`;
 }
 
 function renderOrdersTable() {
@@ -21,7 +21,7 @@ const showMessage = (message, isError = false) => {
 };
 
 async function authFetch(url, options = {}) {
-  const resp = await fetch(url, options);
+  const resp = await (window.conditionalFetch || fetch)(url, options);
   return resp;
 }
 
@@ -189,7 +189,7 @@ const showMessage = (message, isError = false) => {
 };
 
 async function authFetch(url, options = {}) {
-  const resp = await fetch(url, options);
+  const resp = await (window.conditionalFetch || fetch)(url, options);
   return resp;
 }
 
@@ -427,14 +427,26 @@ async function initializePendingPage() {
   try {
     setSummaryLoading();
     setTableLoading(true);
-    const [studentsResponse, deptResponse, itemsResp] = await Promise.all([
-      authFetch(`${API_BASE_URL}/students/`),
-      authFetch(`${API_BASE_URL}/departments/`),
-      authFetch(`${API_BASE_URL}/items/`)
-    ]);
-
-    const students = await studentsResponse.json();
-    allDepartments = (await deptResponse.json()) || [];
+    let students;
+    let itemsResp;
+    if (window.SyncCache) {
+      // Students and departments come from the shared IndexedDB cache (deltas only)
+      [students, allDepartments, itemsResp] = await Promise.all([
+        window.SyncCache.getTable('students'),
+        window.SyncCache.getTable('departments'),
+        authFetch(`${API_BASE_URL}/items/`)
+      ]);
+    } else {
+      const [studentsResponse, deptResponse, itemsResponse] = await Promise.all([
+        authFetch(`${API_BASE_URL}/students/`),
+        authFetch(`${API_BASE_URL}/departments/`),
+        authFetch(`${API_BASE_URL}/items/`)
+      ]);
+      students = await studentsResponse.json();
+      allDepartments = await deptResponse.json();
+      itemsResp = itemsResponse;
+    }
+    allDepartments = allDepartments || [];
     allDepartments = allDepartments.map(dept => ({
       ...dept,
       academic_year: normalizeDash(dept.academic_year)
@@ -497,8 +509,9 @@ async function initializePendingPage() {
 async function fetchPendingReports() {
   if (allStudentsMap.size === 0) return;
   try {
-    const resp = await authFetch(`${API_BASE_URL}/pending-reports/`);
-    const data = await resp.json();
+    // Flat rows in the columnar encoding; the page keys reports by `student`
+    const resp = await authFetch(`${API_BASE_URL}/pending-reports/?flat=1&format=columnar`);
+    const data = decodeColumnar(await resp.json()).map(row => ({ ...row, student: row.student_id }));
     console.log('API Response Data:', JSON.stringify(data, null, 2));
     
     // Log the first report to see its structure
@@ -1128,49 +1141,30 @@ async function generateReport() {
 }
 
 async function generateExcel() {
-  // Temporarily hide UI
-  const filterSection = document.querySelector('.filter-section');
-  const pdfBtnContainer = document.querySelector('.pdf-btn-container');
-  const messageArea = document.querySelector('.message-area');
-  if (filterSection) filterSection.style.display = 'none';
-  if (pdfBtnContainer) pdfBtnContainer.style.display = 'none';
-  if (messageArea) messageArea.style.display = 'none';
-
-  const table = document.getElementById('pendingTable');
-  const wb = XLSX.utils.book_new();
-
+  // Generated and streamed by the server so large cohorts never have to be held in the browser
   const selectedCode = document.getElementById('courseCode').value;
   const selectedCourse = document.getElementById('courseName').value;
   const selectedYear = document.getElementById('year').value;
   const selectedAcademicYear = document.getElementById('academicYear')?.value || '';
 
-  // Build header from the live table header (includes dynamic codes)
-  const header = Array.from(table.querySelectorAll('thead th')).map(th => th.textContent.trim());
-
-  const ws = XLSX.utils.aoa_to_sheet([
-    ['AIMS INSTITUTES'],
-    ['INVENTORY MANAGEMENT'],
-    ['PENDING BOOKS STATISTICAL REPORT - PROGRAM WISE'],
-    [''],
-    ['Course Code:', selectedCode || 'All'],
-    ['Course Name:', selectedCourse || 'All'],
-    ['Academic Year:', selectedAcademicYear || 'All'],
-    ['Year:', selectedYear || 'All'],
-    [''],
-    header,
-    ...Array.from(table.querySelectorAll('tbody tr')).map(row => {
-      const cells = row.querySelectorAll('td');
-      return Array.from(cells).map(cell => cell.textContent.trim());
-    }),
-    [''], // Empty row before total
-  ]);
-
-  XLSX.utils.book_append_sheet(wb, ws, 'Pending Reports');
-  XLSX.writeFile(wb, 'Pending_Reports_Program_Wise.xlsx');
-  
+  const params = new URLSearchParams({ file_type: 'xlsx' });
+  if (selectedCode) params.set('course_code', selectedCode);
+  if (selectedYear) params.set('year', selectedYear);
+  let url;
+  if (selectedAcademicYear) {
+    // One column per item, like the table on screen
+    params.set('academic_year', selectedAcademicYear);
+    params.set('outstanding', '1');
+    url = `${API_BASE_URL}/pending-matrix/export/?${params.toString()}`;
+  } else {
+    if (selectedCourse) params.set('course', selectedCourse);
+    url = `${API_BASE_URL}/pending-reports/export/?${params.toString()}`;
+  }
+  window.location.href = url;
+
   // Log the activity
   try {
-    const rowCount = table.querySelectorAll('tbody tr').length;
+    const rowCount = document.querySelectorAll('#pendingTable tbody tr').length;
     await authFetch(`${API_BASE_URL}/activity-logs/`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -1183,11 +1177,5 @@ async function generateExcel() {
     console.warn('Failed to log activity:', err);
   }
 
-  setTimeout(() => {
-    if (filterSection) filterSection.style.display = '';
-    if (pdfBtnContainer) pdfBtnContainer.style.display = '';
-    if (messageArea) messageArea.style.display = '';
-  }, 100);
-
-  showMessage('Excel file generated successfully!', false);
+  showMessage('Excel download started.', false);
 }
@@ -24,7 +24,7 @@ function fmtCell(value) {
 }
 
 async function authFetch(url, options = {}) {
-    const response = await fetch(url, options);
+    const response = await (window.conditionalFetch || fetch)(url, options);
     return response;
 }
 
@@ -119,11 +119,11 @@ async function loadReceiptData() {
     // Look up student by USN first to get the PK
     let studentId = null;
     try {
-        // Fallback: fetch all students and find by USN (works without search backend)
-        const studentsResp = await authFetch(`${API_BASE_URL}/students/`);
-        const studentsList = await studentsResp.json();
-        console.log('All students:', studentsList);
-        const match = Array.isArray(studentsList) ? studentsList.find(s => s.usn === studentUsn) : null;
+        // Indexed lookup instead of downloading every student
+        const searchResp = await authFetch(`${API_BASE_URL}/students/search/?q=${encodeURIComponent(studentUsn)}&limit=5`);
+        const searchData = await searchResp.json();
+        const studentsList = Array.isArray(searchData && searchData.results) ? searchData.results : [];
+        const match = studentsList.find(s => s.usn === studentUsn) || null;
         console.log('Found student match:', match);
         studentId = match ? match.id : null;
     } catch (e) {
@@ -13,7 +13,7 @@ let editingStudentUsn = null;
 
 // Helper function for making authenticated API requests
 async function authFetch(url, options = {}) {
-    const response = await fetch(url, options);
+    const response = await (window.conditionalFetch || fetch)(url, options);
     if (response.status === 401) {
         // If unauthorized, redirect to the login page
         window.location.href = '/login'; 
@@ -84,8 +84,12 @@ function getCookie(name) {
 // Function to fetch departments from the API
 async function fetchDepartments() {
     try {
-        const response = await authFetch(`${API_BASE_URL}/departments/`);
-        departmentsData = await response.json(); 
+        if (window.SyncCache) {
+            departmentsData = await window.SyncCache.getTable('departments');
+        } else {
+            const response = await authFetch(`${API_BASE_URL}/departments/`);
+            departmentsData = await response.json();
+        }
         window.departmentsData = departmentsData; // expose for filters script
         
         // Populate and sync the ADD STUDENT FORM dropdowns
@@ -115,14 +119,20 @@ async function fetchDepartments() {
 async function fetchStudents() {
     try {
         console.log("Fetching enrollments...");
-        const response = await authFetch(`${API_BASE_URL}/enrollments/`);
-        if (!response.ok) {
-            const errorText = await response.text();
-            console.error("Error response:", response.status, errorText);
-            showMessage(`Error fetching enrollments. Server responded: ${response.status} - ${errorText.substring(0, 80)}...`, true);
-            return;
+        let enrollments;
+        if (window.SyncCache) {
+            // Local IndexedDB copy, only deltas come over the network
+            enrollments = await window.SyncCache.enrollmentsExpanded();
+        } else {
+            const response = await authFetch(`${API_BASE_URL}/enrollments/`);
+            if (!response.ok) {
+                const errorText = await response.text();
+                console.error("Error response:", response.status, errorText);
+                showMessage(`Error fetching enrollments. Server responded: ${response.status} - ${errorText.substring(0, 80)}...`, true);
+                return;
+            }
+            enrollments = await response.json();
         }
-        const enrollments = await response.json();
         // Map enrollments to the table shape and include enrollment academic_year
         const dashNormalize = (s) => String(s ?? '').replace(/[\u2010-\u2015\u2212]/g, '-');
         const norm = (v) => dashNormalize(String(v ?? '').trim());
@@ -0,0 +1,140 @@
+// core/static/js/sync_cache.js
+// Shared IndexedDB cache for students, departments and enrollments.
+// The first load pulls a full snapshot from /api/sync/<table>/; later loads only
+// pull rows changed since the stored version (see core/sync.py).
+(function(){
+  const DB_NAME = 'aims-sync-cache';
+  const DB_VERSION = 1;
+  const TABLES = ['students', 'departments', 'enrollments'];
+  const META_STORE = 'meta';
+  const SYNC_URL = '/api/sync';
+
+  let dbPromise = null;
+  const inflight = new Map();
+
+  function openDb() {
+    if (dbPromise) return dbPromise;
+    dbPromise = new Promise((resolve, reject) => {
+      if (!('indexedDB' in window)) {
+        reject(new Error('IndexedDB unavailable'));
+        return;
+      }
+      const request = indexedDB.open(DB_NAME, DB_VERSION);
+      request.onupgradeneeded = () => {
+        const db = request.result;
+        TABLES.forEach(name => {
+          if (!db.objectStoreNames.contains(name)) db.createObjectStore(name, { keyPath: 'id' });
+        });
+        if (!db.objectStoreNames.contains(META_STORE)) db.createObjectStore(META_STORE, { keyPath: 'table' });
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+    return dbPromise;
+  }
+
+  function promisify(request) {
+    return new Promise((resolve, reject) => {
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+  }
+
+  async function readMeta(db, table) {
+    const tx = db.transaction(META_STORE, 'readonly');
+    const meta = await promisify(tx.objectStore(META_STORE).get(table));
+    return meta ? Number(meta.version) || 0 : 0;
+  }
+
+  function applyPage(db, table, page) {
+    return new Promise((resolve, reject) => {
+      const tx = db.transaction([table, META_STORE], 'readwrite');
+      const store = tx.objectStore(table);
+      if (page.full) store.clear();
+      (page.rows || []).forEach(row => store.put(row));
+      (page.deleted || []).forEach(id => store.delete(id));
+      tx.objectStore(META_STORE).put({ table, version: page.version });
+      tx.oncomplete = () => resolve();
+      tx.onerror = () => reject(tx.error);
+      tx.onabort = () => reject(tx.error);
+    });
+  }
+
+  async function fetchPage(table, since) {
+    const response = await fetch(`${SYNC_URL}/${table}/?since=${encodeURIComponent(since)}`);
+    if (!response.ok) throw new Error(`Sync failed for ${table}: ${response.status}`);
+    return response.json();
+  }
+
+  async function syncTable(db, table) {
+    let since = await readMeta(db, table);
+    for (;;) {
+      const page = await fetchPage(table, since);
+      await applyPage(db, table, page);
+      since = page.version;
+      if (!page.has_more) break;
+    }
+  }
+
+  async function readAll(db, table) {
+    const tx = db.transaction(table, 'readonly');
+    return promisify(tx.objectStore(table).getAll());
+  }
+
+  // Rows of one table (flat, FK ids), brought up to date first.
+  function getTable(table) {
+    if (!TABLES.includes(table)) return Promise.reject(new Error(`Unknown sync table: ${table}`));
+    // Concurrent callers for the same table share one sync
+    if (!inflight.has(table)) {
+      inflight.set(table, loadTable(table).finally(() => inflight.delete(table)));
+    }
+    return inflight.get(table);
+  }
+
+  async function loadTable(table) {
+    try {
+      const db = await openDb();
+      await syncTable(db, table);
+      return await readAll(db, table);
+    } catch (err) {
+      // No IndexedDB (private mode, old browser) or a broken store: use a one-off snapshot
+      console.warn('SyncCache falling back to snapshot for', table, err);
+      const page = await fetchPage(table, 0);
+      return page.rows || [];
+    }
+  }
+
+  // Same shape as /api/students/ (nested department object).
+  async function studentsWithDepartments() {
+    const [students, departments] = await Promise.all([getTable('students'), getTable('departments')]);
+    const deptById = new Map(departments.map(d => [d.id, d]));
+    return students.map(s => ({ ...s, department: deptById.get(s.department_id) || null }));
+  }
+
+  // Same shape as /api/enrollments/ (nested student and department objects).
+  async function enrollmentsExpanded() {
+    const [enrollments, students, departments] = await Promise.all([
+      getTable('enrollments'), getTable('students'), getTable('departments')
+    ]);
+    const deptById = new Map(departments.map(d => [d.id, d]));
+    const studentById = new Map(students.map(s => [s.id, s]));
+    return enrollments.map(e => {
+      const s = studentById.get(e.student_id);
+      return {
+        ...e,
+        student: s ? { id: s.id, usn: s.usn, name: s.name, email: s.email, phone: s.phone } : null,
+        department: deptById.get(e.department_id) || null
+      };
+    });
+  }
+
+  async function clear() {
+    const db = await openDb();
+    await Promise.all([...TABLES, META_STORE].map(name => {
+      const tx = db.transaction(name, 'readwrite');
+      return promisify(tx.objectStore(name).clear());
+    }));
+  }
+
+  window.SyncCache = { getTable, studentsWithDepartments, enrollmentsExpanded, clear };
+})();
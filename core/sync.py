@@ -0,0 +1,79 @@
+# core/sync.py
+"""Delta sync for client-side caches of students, departments and enrollments.
+
+Every write to a synced table leaves one ChangeLogEntry per row (database
+triggers, so bulk_create and cascade deletes are included). The entry id is
+the sync version: a client sends the last version it holds and receives the
+current rows for everything changed after it plus the ids deleted since.
+
+Ids are handed out when a row is written, not when its transaction commits,
+so on PostgreSQL an entry can become visible after a higher id was already
+served. The version given back therefore never moves past entries younger
+than ``SYNC_WINDOW_SECONDS``: a client re-reads that trailing window on its
+next pull (upserts and deletes are idempotent) and picks up late commits.
+"""
+from datetime import timedelta
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import ChangeLogEntry, Department, Enrollment, Student
+
+SYNC_PAGE_SIZE = 5000
+# Longest a writing transaction is expected to stay open
+SYNC_WINDOW_SECONDS = 60
+
+# sync table name -> (model, flat row fields)
+SYNC_TABLES = {
+    'students': (Student, ('id', 'usn', 'name', 'department_id', 'year', 'email', 'phone')),
+    'departments': (Department, (
+        'id', 'course_code', 'course', 'academic_year', 'program_type', 'year',
+        'intake', 'existing',
+        'two_hundred_notebook', 'two_hundred_record', 'two_hundred_observation',
+        'one_hundred_notebook', 'one_hundred_record', 'one_hundred_observation',
+        'total',
+    )),
+    'enrollments': (Enrollment, ('id', 'student_id', 'department_id', 'academic_year', 'year')),
+}
+
+
+def _settled_before():
+    return timezone.now() - timedelta(seconds=SYNC_WINDOW_SECONDS)
+
+
+def current_version(table):
+    """Highest version older than the trailing window."""
+    entries = ChangeLogEntry.objects.filter(table_name=table, changed_at__lt=_settled_before())
+    return entries.aggregate(v=Max('id'))['v'] or 0
+
+
+def snapshot(table):
+    """Every current row plus the version it corresponds to."""
+    model, fields = SYNC_TABLES[table]
+    # Read the version first: anything written meanwhile or inside the window is re-sent by the next delta.
+    version = current_version(table)
+    rows = list(model.objects.order_by('id').values(*fields))
+    return {'table': table, 'version': version, 'full': True, 'rows': rows, 'deleted': [], 'has_more': False}
+
+
+def changes_since(table, since, limit=SYNC_PAGE_SIZE):
+    """Rows changed and ids deleted after version ``since``, at most ``limit`` log entries per page."""
+    model, fields = SYNC_TABLES[table]
+    entries = list(
+        ChangeLogEntry.objects.filter(table_name=table, id__gt=since)
+        .order_by('id').values_list('id', 'row_id', 'op', 'changed_at')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    settled_before = _settled_before()
+    version = since
+    for entry_id, _, _, changed_at in entries:
+        if changed_at >= settled_before:
+            # Everything from here on is re-sent next time; stop paging until it settles
+            has_more = False
+            break
+        version = entry_id
+    upsert_ids = [row_id for _, row_id, op, _ in entries if op == ChangeLogEntry.Op.UPSERT]
+    deleted = [row_id for _, row_id, op, _ in entries if op == ChangeLogEntry.Op.DELETE]
+    rows = list(model.objects.filter(id__in=upsert_ids).order_by('id').values(*fields)) if upsert_ids else []
+    return {'table': table, 'version': version, 'full': False, 'rows': rows, 'deleted': deleted, 'has_more': has_more}
@@ -0,0 +1,231 @@
+# core/synthetic.py
+"""Synthetic datasets for benchmarks and query-budget tests.
+
+``generate_dataset`` fills every table the hot endpoints read: departments per
+academic year and year of study (with item requirements), students and their
+enrollments, pending reports, issue records, inventory orders / receipts /
+stock log, activity log and help-center threads. Rows are written with
+bulk_create in batches. Generated USNs and usernames start with ``prefix``
+and department course names end with it, so a dataset can be removed again
+with ``purge_dataset``; the standard item codes are reused, not duplicated.
+"""
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import (
+    User, Department, Student, Item, DepartmentItemRequirement, Enrollment, PendingReport,
+    IssueRecord, ActivityLog, HelpThread, HelpMessage, InventoryOrder, InventoryReceipt, StockLogEntry,
+)
+from .pending import refresh as refresh_pending
+from .versioning import bump_table_version
+
+BATCH_SIZE = 2000
+
+# (course_code, course, program_type, years of study)
+PROGRAMS = (
+    ('MCA', 'MASTER OF COMPUTER APPLICATIONS', 'PG', 2),
+    ('MBA', 'MASTER OF BUSINESS ADMINISTRATION', 'PG', 2),
+    ('BCA', 'BACHELOR OF COMPUTER APPLICATIONS', 'UG', 3),
+    ('BCOM', 'BACHELOR OF COMMERCE', 'UG', 3),
+    ('BBA', 'BACHELOR OF BUSINESS ADMINISTRATION', 'UG', 3),
+    ('BSC', 'BACHELOR OF SCIENCE', 'UG', 3),
+)
+
+# Standard item codes -> (name, Department allotment field)
+ITEMS = (
+    ('2PN', '200 Pages Notebook', 'two_hundred_notebook'),
+    ('2PR', '200 Pages Record', 'two_hundred_record'),
+    ('2PO', '200 Pages Observation', 'two_hundred_observation'),
+    ('1PN', '100 Pages Notebook', 'one_hundred_notebook'),
+    ('1PR', '100 Pages Record', 'one_hundred_record'),
+    ('1PO', '100 Pages Observation', 'one_hundred_observation'),
+)
+
+FIRST_NAMES = ('Aarav', 'Diya', 'Ishaan', 'Ananya', 'Rohan', 'Meera', 'Kiran', 'Sneha', 'Arjun', 'Pooja', 'Vikram', 'Nisha')
+LAST_NAMES = ('Sharma', 'Rao', 'Gowda', 'Iyer', 'Patel', 'Reddy', 'Nair', 'Kulkarni', 'Hegde', 'Shetty')
+HELP_PHRASES = (
+    'Stock for {item} is running low, please reorder.',
+    'Student {usn} did not receive the {item} allotment.',
+    'Pending report for {usn} shows the wrong quantity.',
+    'Can we issue an extra {item} to {usn}?',
+    'Bulk upload failed for the new cohort, please check.',
+)
+
+
+def _academic_years(count, start=None):
+    start = start or timezone.now().year - count + 1
+    return [f"{year}-{year + 1}" for year in range(start, start + count)]
+
+
+def _chunks(rows, size=BATCH_SIZE):
+    for index in range(0, len(rows), size):
+        yield rows[index:index + size]
+
+
+def _bulk(model, rows):
+    created = []
+    for chunk in _chunks(rows):
+        created.extend(model.objects.bulk_create(chunk))
+    return created
+
+
+def generate_dataset(students=1000, academic_years=2, issues_per_student=2, orders_per_item=5,
+                     help_threads=20, messages_per_thread=5, prefix='SYN', seed=42, first_year=None, progress=None):
+    """Create a dataset of roughly ``students`` students; returns row counts per table.
+
+    Departments cover ``academic_years`` academic years starting at ``first_year``
+    (default: ending with the current one); datasets that should coexist need
+    non-overlapping years. ``progress`` is an optional callable taking a short
+    status message.
+    """
+    rng = random.Random(seed)
+    say = progress or (lambda message: None)
+    counts = {}
+
+    # Standard item codes are shared with real data; only missing ones are created (with ample stock)
+    items = []
+    counts['items'] = 0
+    for code, name, _ in ITEMS:
+        item, created = Item.objects.get_or_create(item_code=code, defaults={'name': name, 'quantity': 1_000_000})
+        items.append(item)
+        counts['items'] += int(created)
+
+    departments = []
+    for ay in _academic_years(academic_years, first_year):
+        for code, course, program_type, years in PROGRAMS:
+            for year in range(1, years + 1):
+                allotment = {field: rng.randint(0, 4) for _, _, field in ITEMS}
+                departments.append(Department(
+                    course_code=code, course=f"{course} {prefix}", academic_year=ay, program_type=program_type,
+                    year=str(year), intake=60, existing=0, total=sum(allotment.values()), **allotment,
+                ))
+    departments = _bulk(Department, departments)
+    counts['departments'] = len(departments)
+    say(f"{len(departments)} departments")
+
+    _bulk(DepartmentItemRequirement, [
+        DepartmentItemRequirement(department=dept, item=item, required_qty=getattr(dept, field) or 0)
+        for dept in departments
+        for item, (_, _, field) in zip(items, ITEMS)
+    ])
+    counts['requirements'] = len(departments) * len(items)
+    # bulk_create sends no signals: move the ETags and reference-cache generations by hand
+    bump_table_version(Department, DepartmentItemRequirement, Item)
+
+    student_rows = []
+    for index in range(students):
+        dept = departments[index % len(departments)]
+        student_rows.append(Student(
+            usn=f"{prefix}{dept.academic_year[2:4]}{dept.course_code}{index:07d}",
+            name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            department=dept,
+            year=dept.year,
+            email=f"{prefix.lower()}{index}@example.edu",
+            phone=f"9{rng.randint(100000000, 999999999)}",
+        ))
+    student_rows = _bulk(Student, student_rows)
+    counts['students'] = len(student_rows)
+    say(f"{len(student_rows)} students")
+
+    _bulk(Enrollment, [
+        Enrollment(student=s, department=s.department, academic_year=s.department.academic_year, year=s.year)
+        for s in student_rows
+    ])
+    counts['enrollments'] = len(student_rows)
+
+    _bulk(PendingReport, [
+        PendingReport(
+            student=s, usn=s.usn, name=s.name, course=s.department.course, course_code=s.department.course_code,
+            academic_year=s.department.academic_year, year=s.year,
+            pn2=s.department.two_hundred_notebook, pr2=s.department.two_hundred_record,
+            po2=s.department.two_hundred_observation, pn1=s.department.one_hundred_notebook,
+            pr1=s.department.one_hundred_record, po1=s.department.one_hundred_observation,
+        )
+        for s in student_rows
+    ])
+    counts['pending_reports'] = len(student_rows)
+
+    issue_rows = []
+    for s in student_rows:
+        for _ in range(issues_per_student):
+            code = rng.choice(ITEMS)[0]
+            issue_rows.append(IssueRecord(
+                student=s, item_code=code, qty_issued=rng.randint(1, 2), status='Issued',
+                academic_year=s.department.academic_year, year=s.year,
+            ))
+    _bulk(IssueRecord, issue_rows)
+    counts['issue_records'] = len(issue_rows)
+    say(f"{len(issue_rows)} issue records")
+
+    counts['pending_items'] = refresh_pending(department_ids=[dept.id for dept in departments])['created']
+    say(f"{counts['pending_items']} pending items")
+
+    staff = _bulk(User, [
+        User(username=f"{prefix.lower()}_staff{index}", email=f"{prefix.lower()}_staff{index}@example.edu",
+             password='!', role=User.Role.STATIONERY, approval_status=User.ApprovalStatus.APPROVED)
+        for index in range(max(1, help_threads))
+    ])
+    admin = User.objects.filter(role=User.Role.ADMIN).order_by('id').first() or staff[0]
+
+    orders = _bulk(InventoryOrder, [
+        InventoryOrder(item=item, ordered_qty=500, received_qty=0, reference=f"{prefix}-PO-{item.id}-{n}", ordered_by=admin)
+        for item in items
+        for n in range(orders_per_item)
+    ])
+    receipts = []
+    for order in orders:
+        received = rng.choice((0, 250, 500))
+        if received:
+            order.received_qty = received
+            order.refresh_status()
+            receipts.append(InventoryReceipt(order=order, item=order.item, quantity=received, received_by=admin))
+    InventoryOrder.objects.bulk_update(orders, ['received_qty', 'status'], batch_size=BATCH_SIZE)
+    receipts = _bulk(InventoryReceipt, receipts)
+    _bulk(StockLogEntry, [
+        StockLogEntry(item=r.item, change=r.quantity, reason='Synthetic receipt', previous_quantity=0,
+                      new_quantity=r.quantity, created_by=admin, order=r.order, receipt=r)
+        for r in receipts
+    ])
+    counts['inventory_orders'] = len(orders)
+    counts['inventory_receipts'] = len(receipts)
+
+    threads = _bulk(HelpThread, [HelpThread(user=user) for user in staff[:help_threads]])
+    now = timezone.now()
+    messages = []
+    for thread in threads:
+        for n in range(messages_per_thread):
+            s = rng.choice(student_rows) if student_rows else None
+            text = rng.choice(HELP_PHRASES).format(item=rng.choice(ITEMS)[1], usn=s.usn if s else '-')
+            from_user = n % 2 == 0
+            messages.append(HelpMessage(
+                thread=thread, sender=thread.user if from_user else admin, content=text,
+                is_admin_read=not from_user or rng.random() < 0.5, is_user_read=from_user,
+            ))
+    messages = _bulk(HelpMessage, messages)
+    # created_at is auto_now_add; spread it out so "latest message" ordering is meaningful
+    for offset, message in enumerate(messages):
+        message.created_at = now - timedelta(minutes=len(messages) - offset)
+    HelpMessage.objects.bulk_update(messages, ['created_at'], batch_size=BATCH_SIZE)
+    counts['help_threads'] = len(threads)
+    counts['help_messages'] = len(messages)
+
+    _bulk(ActivityLog, [
+        ActivityLog(action=rng.choice(ActivityLog.ACTION_CHOICES)[0], description=f"{prefix} synthetic event {n}", user=admin.username)
+        for n in range(max(10, students // 100))
+    ])
+    say('done')
+    return counts
+
+
+def purge_dataset(prefix='SYN'):
+    """Delete everything ``generate_dataset`` created with ``prefix``. Returns deleted row counts."""
+    deleted = {}
+    for label, qs in (
+        ('departments', Department.objects.filter(course__endswith=f" {prefix}")),
+        ('users', User.objects.filter(username__startswith=f"{prefix.lower()}_staff")),
+        ('activity_logs', ActivityLog.objects.filter(description__startswith=f"{prefix} synthetic event")),
+    ):
+        deleted[label] = qs.delete()[0]
+    return deleted
@@ -1,3 +1,1427 @@
-from django.test import TestCase
+import io
+import json
+import re
+import shutil
+import tempfile
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from openpyxl import load_workbook
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver
+from django.utils import timezone
+
+from . import activity, archive as archive_module, search as search_module, sync as sync_module, urls as core_urls
+from .models import (
+    User, Department, Student, Item, IssueRecord, PendingReport, Enrollment, ActivityLog,
+    HelpThread, HelpMessage, Notification, InventoryOrder, StockLogEntry, PendingItem, DepartmentItemRequirement,
+    InventoryReceipt, ArchiveManifest, ArchivedIssueRecord, TableVersion, ChangeLogEntry,
+)
+from .pending import compute as compute_pending, refresh as refresh_pending
+from .backfill import (
+    backfill_enrollments as run_backfill_enrollments, backfill_requirements as run_backfill_requirements,
+    normalize_academic_year, normalize_year,
+)
+from .exports import export_response
+from .metrics import registry as metrics_registry
+from .middleware import RequestProfilingMiddleware
+from .caching import department_requirements, resolve_department_id, resolve_item
+from .archive import ArchiveError, archive as archive_years
+from .pending_matrix import build as build_pending_matrix
+from .promotion import promote
+from .purge import PurgeError, purge as run_purge
+from .synthetic import PROGRAMS as SYNTHETIC_PROGRAMS, generate_dataset
+from .renderers import decode_columnar
+from .upload_preview import normalize_academic_years, normalize_years
+from .versioning import bump_table_version
+
+
+# --- Query budgets -----------------------------------------------------------
+#
+# One representative request per URL name in core/urls.py. ``budget`` is the
+# most queries the request may run against the larger dataset; separately, the
+# count must not grow between the small and the large dataset (an N+1 shows
+# up as growth long before it breaks the budget). Paths and payloads are
+# formatted with the ids in QueryBudgetTests._context(); a callable payload is
+# built from the current dataset instead, so it grows with it. Every case must
+# succeed (2xx); ``anonymous`` cases run without the admin session.
+
+Case = namedtuple('Case', 'method path data budget anonymous', defaults=(False,))
+
+QUERY_BUDGETS = {
+    # Auth and users
+    'api-login': Case('post', '/api/login/', {'username': 'qb_admin', 'password': 'qb-pass', 'role': 'admin'}, 7),
+    'api-logout': Case('post', '/api/logout/', {}, 4),
+    'api-register': Case('post', '/api/register/', {'username': 'qb_new', 'password': 'qb-pass', 'email': 'qb_new@example.edu'}, 8),
+    'api-users-pending': Case('get', '/api/users/pending/', None, 3),
+    'api-user-approve': Case('post', '/api/users/{staff_id}/approve/', {'action': 'approve'}, 10),
+    'user-list': Case('get', '/api/users/', None, 3),
+    'user-detail': Case('get', '/api/users/{staff_id}/', None, 3),
+    # Notifications
+    'api-notifications': Case('get', '/api/notifications/', None, 4),
+    'api-notification-read': Case('post', '/api/notifications/{notification_id}/read/', {}, 4),
+    'api-notification-delete': Case('delete', '/api/notifications/{notification_id}/', None, 4),
+    'api-help-notifications-purge': Case('post', '/api/help-notifications/purge/', {}, 6),
+    # Help center
+    'help-attachment-preview': Case('get', '/media/help-attachments/{message_id}/', None, 3),
+    'api-help-threads': Case('get', '/api/help-threads/', None, 3),
+    'api-help-search': Case('get', '/api/help-search/?q=stock', None, 4),
+    'api-help-thread': Case('get', '/api/help-thread/?user_id={staff_id}', None, 11),
+    'api-help-thread-mark-read': Case('post', '/api/help-thread/mark-read/', {'user_id': '{staff_id}'}, 7),
+    'api-help-thread-clear': Case('post', '/api/help-thread/clear/', {'user_id': '{staff_id}'}, 6),
+    'api-help-message': Case('post', '/api/help-thread/messages/', {'user_id': '{staff_id}', 'content': 'Restocked.'}, 8),
+    'api-help-message-delete': Case('delete', '/api/help-thread/messages/{message_id}/', None, 4),
+    # Issue, pending and reports
+    'api-issue-bulk-create': Case('post', '/api/issue-bulk-create/', {
+        'student_usn': '{usn}', 'issues': [{'item_code': '2PN', 'quantity': 1}, {'item_code': '1PN', 'quantity': 1}],
+    }, 21),
+    'api-issue-cohort': Case('post', '/api/issue-cohort/', {
+        'course_code': '{course_code}', 'course': '{course}', 'academic_year': '{academic_year}', 'year': '{year}',
+    }, 25),
+    'api-issue-sync': Case('post', '/api/issue-sync/', {'issues': [{
+        'idempotency_key': 'qb-sync-1', 'student_usn': '{usn}', 'issues': [{'item_code': '2PN', 'quantity': 1}],
+    }]}, 23),
+    'api-distribution-session': Case('get', '/api/distribution-session/?course_code={course_code}&course={course}&academic_year={academic_year}&year={year}', None, 9),
+    'api-pending-matrix': Case('get', '/api/pending-matrix/?academic_year={academic_year}&values=required,issued', None, 8),
+    'api-pending-matrix-export': Case('get', '/api/pending-matrix/export/?academic_year={academic_year}', None, 8),
+    'api-student-records': Case('get', '/api/student-records/{usn}/', None, 7),
+    'api-dashboard-summary': Case('get', '/api/dashboard-summary/', None, 6),
+    'api-generate-pending-reports': Case('post', '/api/generate-pending-reports/', {}, 15),
+    'api-backfill-enrollments': Case('post', '/api/backfill-enrollments/', {}, 7),
+    'api-purge-students': Case('post', '/api/purge-students/', {}, 16),
+    'api-backfill-requirements': Case('post', '/api/backfill-requirements/', {}, 7),
+    'api-promote-cohorts': Case('post', '/api/promote-cohorts/', {
+        'from_academic_year': '{academic_year}', 'to_academic_year': '2099-2100', 'course_code': '{course_code}',
+    }, 29),
+    'api-archive-academic-years': Case('post', '/api/archive-academic-years/', {
+        'academic_years': ['{academic_year}'], 'dry_run': True, 'force': True,
+    }, 14),
+    'api-get-requirements': Case('get', '/api/requirements/?course_code={course_code}&course={course}&academic_year={academic_year}&year={year}', None, 6),
+    'api-update-requirements': Case('put', '/api/requirements/update/', {
+        'department_id': '{department_id}', 'requirements': [{'item_code': '2PN', 'required_qty': 2}],
+    }, 20),
+    'api-sync-table': Case('get', '/api/sync/students/?since=0', None, 4),
+    'api-cache-stats': Case('get', '/api/cache-stats/', None, 2),
+    'api-metrics': Case('get', '/api/metrics', None, 2),
+    'api-bulk-upload': Case('post', '/api/students/bulk_upload/', lambda context: _bulk_upload_rows(), 14),
+    'api-bulk-upload-preview': Case('post', '/api/students/bulk_upload/preview/', lambda context: _bulk_upload_rows(), 5),
+    # Router: reference data
+    'api-root': Case('get', '/api/', None, 2),
+    'department-list': Case('get', '/api/departments/', None, 4),
+    'department-detail': Case('get', '/api/departments/{department_id}/', None, 4),
+    'item-list': Case('get', '/api/items/', None, 4),
+    'item-detail': Case('get', '/api/items/{item_id}/', None, 4),
+    # Router: students and enrollments
+    'student-list': Case('get', '/api/students/', None, 3),
+    'student-search': Case('get', '/api/students/search/?q=QBA', None, 4),
+    'student-detail': Case('get', '/api/students/{usn}/', None, 3),
+    'enrollment-list': Case('get', '/api/enrollments/', None, 3),
+    'enrollment-detail': Case('get', '/api/enrollments/{enrollment_id}/', None, 3),
+    # Router: issue records and pending reports
+    'issuerecord-list': Case('get', '/api/issue-records/', None, 3),
+    'issuerecord-export': Case('get', '/api/issue-records/export/', None, 3),
+    'issuerecord-detail': Case('get', '/api/issue-records/{issue_id}/', None, 3),
+    'pendingreport-list': Case('get', '/api/pending-reports/', None, 3),
+    'pendingreport-export': Case('get', '/api/pending-reports/export/', None, 3),
+    'pendingreport-detail': Case('get', '/api/pending-reports/{report_id}/', None, 3),
+    'pending-item-list': Case('get', '/api/pending-items/?flat=1', None, 3),
+    'pending-item-detail': Case('get', '/api/pending-items/{pending_item_id}/', None, 3),
+    'pending-item-export': Case('get', '/api/pending-items/export/', None, 3),
+    'activity-log-list': Case('get', '/api/activity-logs/', None, 3),
+    'activity-log-detail': Case('get', '/api/activity-logs/{activity_id}/', None, 3),
+    # Router: inventory
+    'inventory-order-list': Case('get', '/api/inventory-orders/', None, 4),
+    'inventory-order-detail': Case('get', '/api/inventory-orders/{order_id}/', None, 4),
+    'inventory-order-receive': Case('post', '/api/inventory-orders/{order_id}/receive/', {'quantity': 1}, 21),
+    'inventory-order-receive-batch': Case('post', '/api/inventory-orders/receive-batch/', {
+        'deliveries': [{'order_id': '{order_id}', 'quantity': 1}],
+    }, 13),
+    'inventory-receipt-list': Case('get', '/api/inventory-receipts/', None, 3),
+    'inventory-receipt-consume': Case('post', '/api/inventory-receipts/consume/', {'item_id': '{item_id}', 'quantity': 1}, 7),
+    'inventory-receipt-restore': Case('post', '/api/inventory-receipts/restore/', {'item_id': '{item_id}', 'quantity': 1}, 7),
+    'stock-log-list': Case('get', '/api/stock-logs/', None, 3),
+    'stock-log-detail': Case('get', '/api/stock-logs/{stock_log_id}/', None, 3),
+    'stock-log-export': Case('get', '/api/stock-logs/export/', None, 3),
+    'stock-log-clear': Case('delete', '/api/stock-logs/clear/', None, 5),
+    'stock-log-stock-take': Case('post', '/api/stock-logs/stock-take/', {
+        'counts': [{'item_code': '2PN', 'counted_qty': 10}], 'reason': 'Budget check',
+    }, 8),
+    # HTML pages
+    'home': Case('get', '/', None, 2),
+    'login': Case('get', '/login/', None, 2, anonymous=True),
+    'register': Case('get', '/register/', None, 2),
+    'dashboard': Case('get', '/dashboard/', None, 2),
+    'manage-users': Case('get', '/manage-users/', None, 2),
+    'students': Case('get', '/students/', None, 2),
+    'departments': Case('get', '/departments/', None, 2),
+    'items': Case('get', '/items/', None, 2),
+    'issue': Case('get', '/issue/', None, 2),
+    'pending': Case('get', '/pending/', None, 2),
+    'bulk-upload': Case('get', '/bulk-upload/', None, 2),
+    'report': Case('get', '/report/', None, 2),
+}
+
+# Endpoints whose work is inherently proportional to the table size; they are
+# held to their budget at the large size but not to the no-growth rule.
+KNOWN_LINEAR = set()
+
+_SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def _url_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name and 'format' not in str(pattern.pattern):
+            yield pattern.name
+
+
+def _bulk_upload_rows():
+    """Every seeded student uploaded again plus one new student per cohort row."""
+    rows = []
+    for n, student in enumerate(Student.objects.select_related('department').filter(usn__startswith='QB').order_by('id')):
+        dept = student.department
+        cohort = {'course_code': dept.course_code, 'course': dept.course, 'academic_year': dept.academic_year, 'year': dept.year}
+        rows.append({'usn': student.usn, 'name': 'Updated Name', **cohort})
+        rows.append({'usn': f'QBNEW{n:04d}', 'name': 'New Student', **cohort})
+    return rows
+
+
+def _fill(value, context):
+    if callable(value):
+        return value(context)
+    if isinstance(value, str):
+        return value.format(**context)
+    if isinstance(value, list):
+        return [_fill(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, context) for key, item in value.items()}
+    return value
+
+
+def _repeated_sql(queries, limit=5):
+    """The most repeated statements with literals masked, for failure messages."""
+    shapes = Counter(_SQL_LITERALS.sub('?', query['sql']) for query in queries)
+    lines = [f"  {count:4d} x {sql[:300]}" for sql, count in shapes.most_common(limit) if count > 1]
+    return '\n'.join(lines) or '  (no repeated statements)'
+
+
+class QueryBudgetTests(TestCase):
+    SMALL = {'students': 12, 'help_threads': 3, 'messages_per_thread': 3, 'orders_per_item': 1}
+    LARGE_EXTRA = {'students': 36, 'help_threads': 9, 'messages_per_thread': 3, 'orders_per_item': 3, 'first_year': 2001}
+
+    @classmethod
+    def setUpClass(cls):
+        # help-attachment-preview serves a real file; keep it out of the project's media folder
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='qb_admin', password='qb-pass', email='qb_admin@example.edu',
+            role=User.Role.ADMIN, approval_status=User.ApprovalStatus.APPROVED,
+        )
+        # Steady state: every version counter (reference-cache generations included) already has its row
+        bump_table_version(Item, Department, DepartmentItemRequirement)
+
+    def _grow(self, prefix, sizes):
+        generate_dataset(prefix=prefix, **sizes)
+        staff = list(User.objects.filter(username__startswith=f"{prefix.lower()}_staff"))
+        Notification.objects.bulk_create([
+            Notification(recipient=self.admin, message=f"Help message from {user.username}",
+                         link=f"/dashboard/?chat_user={user.id}", notification_type='help_message')
+            for user in staff
+        ])
+
+    def _seed(self):
+        """Rows some cases act on: an attachment to preview, a read notification to dismiss, stock to restore."""
+        staff = User.objects.filter(username__startswith='qba_staff').order_by('id').first()
+        message = HelpMessage.objects.filter(thread__user=staff).order_by('id').first()
+        message.attachment.save('stock-note.txt', ContentFile(b'Restocked the notebooks.'))
+        Notification.objects.create(recipient=self.admin, message='Stock updated', is_read=True)
+        receipt = InventoryReceipt.objects.filter(item__item_code='2PN').order_by('id').first()
+        InventoryReceipt.objects.filter(pk=receipt.pk).update(consumed_qty=1)
+
+    def _context(self):
+        student = Student.objects.select_related('department').filter(usn__startswith='QBA').order_by('id').first()
+        dept = student.department
+        staff = User.objects.filter(username__startswith='qba_staff').order_by('id').first()
+        return {
+            'usn': student.usn,
+            'student_id': student.id,
+            'department_id': dept.id,
+            'course_code': dept.course_code,
+            'course': dept.course,
+            'academic_year': dept.academic_year,
+            'year': dept.year,
+            'staff_id': staff.id,
+            'item_id': Item.objects.get(item_code='2PN').id,
+            'enrollment_id': Enrollment.objects.filter(student=student).first().id,
+            'issue_id': IssueRecord.objects.filter(student=student).first().id,
+            'report_id': PendingReport.objects.filter(student=student).first().id,
+            'pending_item_id': PendingItem.objects.filter(student=student).first().id,
+            'activity_id': ActivityLog.objects.order_by('id').first().id,
+            'order_id': InventoryOrder.objects.filter(reference__startswith='QBA').order_by('id').first().id,
+            'stock_log_id': StockLogEntry.objects.order_by('id').first().id,
+            'message_id': HelpMessage.objects.filter(thread__user=staff).order_by('id').first().id,
+            'notification_id': Notification.objects.filter(recipient=self.admin, is_read=True).order_by('id').first().id,
+        }
+
+    def _measure(self, case, context):
+        """Run one request inside a savepoint (rolled back afterwards) and return (response, queries)."""
+        caches[getattr(settings, 'REFERENCE_CACHE_ALIAS', 'default')].clear()
+        client = Client(SERVER_NAME='localhost')
+        if not case.anonymous:
+            client.force_login(self.admin)
+        path = _fill(case.path, context)
+        kwargs = {}
+        if case.data is not None:
+            kwargs = {'data': json.dumps(_fill(case.data, context)), 'content_type': 'application/json'}
+        savepoint = transaction.savepoint()
+        try:
+            with CaptureQueriesContext(connection) as captured:
+                response = getattr(client, case.method)(path, **kwargs)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                    response.close()
+        finally:
+            transaction.savepoint_rollback(savepoint)
+        return response, captured.captured_queries
+
+    def test_every_url_has_a_budget(self):
+        missing = sorted(set(_url_names(core_urls.urlpatterns)) - set(QUERY_BUDGETS))
+        self.assertEqual(missing, [], f"Declare a query budget in core/tests.py for: {', '.join(missing)}")
+
+    @override_settings(METRICS_ENABLED=True)
+    def test_query_counts_stay_flat_and_within_budget(self):
+        self._grow('QBA', self.SMALL)
+        self._seed()
+        context = self._context()
+        small = {name: self._measure(case, context) for name, case in QUERY_BUDGETS.items()}
+
+        self._grow('QBB', self.LARGE_EXTRA)
+        for name, case in QUERY_BUDGETS.items():
+            with self.subTest(url=name):
+                response, queries = self._measure(case, context)
+                small_response, small_queries = small[name]
+                self.assertTrue(200 <= response.status_code < 300, f"{name} returned {response.status_code}")
+                self.assertTrue(200 <= small_response.status_code < 300, f"{name} returned {small_response.status_code} on the small dataset")
+                if name not in KNOWN_LINEAR:
+                    self.assertLessEqual(
+                        len(queries), len(small_queries),
+                        f"{name}: {len(small_queries)} queries with the small dataset, {len(queries)} with the "
+                        f"large one. Most repeated:\n{_repeated_sql(queries)}"
+                    )
+                self.assertLessEqual(
+                    len(queries), case.budget,
+                    f"{name}: {len(queries)} queries, budget {case.budget}. Most repeated:\n{_repeated_sql(queries)}"
+                )
+
+
+class CohortIssueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=30, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0, prefix='CI')
+
+    def _post(self, payload):
+        return Client(SERVER_NAME='localhost').post('/api/issue-cohort/', data=json.dumps(payload), content_type='application/json')
+
+    def test_issues_outstanding_quantities_and_skips_met_students(self):
+        enrollment = Enrollment.objects.select_related('department').filter(
+            department=Enrollment.objects.values('department').annotate(n=Count('id')).order_by('-n').values('department')[:1]
+        ).first()
+        dept = enrollment.department
+        cohort = {'course_code': dept.course_code, 'course': dept.course, 'academic_year': enrollment.academic_year, 'year': enrollment.year}
+        usns = list(Enrollment.objects.filter(department=dept, academic_year=enrollment.academic_year, year=enrollment.year)
+                    .values_list('student__usn', flat=True))
+        self.assertGreater(len(usns), 1)
+        IssueRecord.objects.create(student=Student.objects.get(usn=usns[0]), item_code='2PN', qty_issued=3,
+                                   academic_year=enrollment.academic_year, year=enrollment.year)
+        stock_before = Item.objects.get(item_code='2PN').quantity
+
+        response = self._post({**cohort, 'items': [{'item_code': '2pn', 'quantity': 3}]})
+
+        self.assertEqual(response.status_code, 201, response.content)
+        body = response.json()
+        self.assertEqual(body['skipped'], [usns[0]])
+        self.assertEqual(body['items'], {'2PN': 3 * (len(usns) - 1)})
+        self.assertEqual(Item.objects.get(item_code='2PN').quantity, stock_before - 3 * (len(usns) - 1))
+        self.assertEqual(self._post({**cohort, 'items': [{'item_code': '2PN', 'quantity': 3}]}).json()['students_issued'], 0)
+
+    def test_second_issue_of_the_same_cohort_creates_nothing(self):
+        enrollment = Enrollment.objects.select_related('department').filter(student__usn__startswith='CI').first()
+        dept = enrollment.department
+        cohort = {'course_code': dept.course_code, 'course': dept.course, 'academic_year': enrollment.academic_year,
+                  'year': enrollment.year, 'items': [{'item_code': '2PN', 'quantity': 2}]}
+        stock_before = Item.objects.get(item_code='2PN').quantity
+        competing = []
+
+        def issue_while_waiting_for_the_lock(execute, sql, params, many, context):
+            # The other counter's issue commits while this one waits for the item rows
+            if not competing and sql.startswith('SELECT "core_item"."id" AS "id", "core_item"."quantity"'):
+                competing.append(None)  # the competing issue runs through here too
+                competing[0] = self._post(cohort)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(issue_while_waiting_for_the_lock):
+            response = self._post(cohort)
+
+        self.assertEqual(competing[0].status_code, 201, competing[0].content)
+        issued = competing[0].json()['records_created']
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['students_issued'], 0)
+        self.assertEqual(IssueRecord.objects.filter(student__department=dept).count(), issued)
+        self.assertEqual(Item.objects.get(item_code='2PN').quantity, stock_before - 2 * issued)
+
+        again = self._post(cohort)
+        self.assertEqual((again.status_code, again.json()['students_issued']), (200, 0))
+        self.assertEqual(IssueRecord.objects.filter(student__department=dept).count(), issued)
+
+    def test_distribution_session_reports_issued_totals_per_student(self):
+        enrollment = Enrollment.objects.select_related('department', 'student').filter(student__usn__startswith='CI').first()
+        dept = enrollment.department
+        IssueRecord.objects.create(student=enrollment.student, item_code='2pn', qty_issued=2,
+                                   academic_year=enrollment.academic_year, year=enrollment.year)
+
+        response = Client(SERVER_NAME='localhost').get('/api/distribution-session/', {
+            'course_code': dept.course_code, 'course': dept.course,
+            'academic_year': enrollment.academic_year, 'year': enrollment.year,
+        })
+
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        index = body['students']['usn'].index(enrollment.student.usn)
+        self.assertEqual(body['issued']['2PN'][index], 2)
+        self.assertEqual(sum(body['issued']['1PN']), 0)
+
+    def test_insufficient_stock_issues_nothing(self):
+        enrollment = Enrollment.objects.select_related('department').filter(student__usn__startswith='CI').first()
+        dept = enrollment.department
+        Item.objects.filter(item_code='1PO').update(quantity=1)
+        records_before = IssueRecord.objects.count()
+
+        response = self._post({
+            'course_code': dept.course_code, 'course': dept.course, 'academic_year': enrollment.academic_year,
+            'year': enrollment.year, 'usns': ['NOSUCHUSN', enrollment.student.usn],
+            'items': [{'item_code': '2PN', 'quantity': 1}, {'item_code': '1PO', 'quantity': 2}],
+        })
+
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(response.json()['details'][0]['item_code'], '1PO')
+        self.assertEqual(IssueRecord.objects.count(), records_before)
+        self.assertEqual(Item.objects.get(item_code='1PO').quantity, 1)
+
+
+class IssueIdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=4, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0, prefix='II')
+
+    def setUp(self):
+        self.client = Client(SERVER_NAME='localhost')
+        self.usn = Student.objects.filter(usn__startswith='II').order_by('id').first().usn
+        self.payload = {'student_usn': self.usn, 'issues': [{'item_code': '2PN', 'quantity': 2}]}
+
+    def _issue(self, payload, key):
+        return self.client.post('/api/issue-bulk-create/', data=json.dumps(payload), content_type='application/json',
+                                headers={'Idempotency-Key': key})
+
+    def _issued(self):
+        return IssueRecord.objects.filter(student__usn=self.usn).count()
+
+    def test_retry_with_same_key_replays_instead_of_issuing_again(self):
+        stock_before = Item.objects.get(item_code='2PN').quantity
+        first = self._issue(self.payload, 'counter-1-0001')
+        retry = self._issue(self.payload, 'counter-1-0001')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(self._issued(), 1)
+        self.assertEqual(Item.objects.get(item_code='2PN').quantity, stock_before - 2)
+        self.assertEqual(self._issue({**self.payload, 'issues': [{'item_code': '2PN', 'quantity': 1}]}, 'counter-1-0001').status_code, 422)
+
+    def test_sync_applies_queue_and_replays_keys_that_already_reached_the_server(self):
+        self._issue(self.payload, 'counter-1-0002')
+        queue = [
+            {'idempotency_key': 'counter-1-0002', **self.payload},
+            {'idempotency_key': 'counter-1-0003', 'student_usn': self.usn, 'issues': [{'item_code': '1PN', 'quantity': 1}]},
+            {'idempotency_key': 'counter-1-0004', 'student_usn': 'NOSUCHUSN', 'issues': [{'item_code': '1PN', 'quantity': 1}]},
+        ]
+
+        response = self.client.post('/api/issue-sync/', data=json.dumps({'issues': queue}), content_type='application/json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['replayed', 'applied', 'rejected'])
+        self.assertEqual(self._issued(), 2)
+
+
+class StockTakeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='st_admin', password='st-pass', role=User.Role.ADMIN, approval_status=User.ApprovalStatus.APPROVED,
+        )
+        cls.ink = Item.objects.create(item_code='ink-b', name='Blue ink', quantity=5)
+        cls.pen = Item.objects.create(item_code='PEN', name='Pen', quantity=3)
+
+    def _post(self, payload):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(self.admin)
+        return client.post('/api/stock-logs/stock-take/', data=json.dumps(payload), content_type='application/json')
+
+    def test_codes_match_whatever_their_case(self):
+        counts = [{'item_code': 'INK-B', 'counted_qty': 7}, {'item_code': 'pen', 'counted_qty': 3}]
+
+        preview = self._post({'counts': counts, 'preview': True})
+        self.assertEqual(preview.status_code, 200, preview.content)
+        self.assertEqual([(row['item_code'], row['variance']) for row in preview.json()['variance']], [('PEN', 0), ('ink-b', 2)])
+        self.ink.refresh_from_db()
+        self.assertEqual(self.ink.quantity, 5)
+
+        response = self._post({'counts': counts, 'reason': 'Term count'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['adjusted'], response.json()['net_change']), (1, 2))
+        self.ink.refresh_from_db()
+        self.assertEqual(self.ink.quantity, 7)
+        self.assertEqual(list(StockLogEntry.objects.values_list('item_id', 'change', 'reason')), [(self.ink.id, 2, 'Term count')])
+
+    def test_unknown_codes_change_nothing(self):
+        response = self._post({'counts': [{'item_code': 'pen', 'counted_qty': 9}, {'item_code': 'nope', 'counted_qty': 1}]})
+
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(response.json()['unknown'], ['NOPE'])
+        self.pen.refresh_from_db()
+        self.assertEqual(self.pen.quantity, 3)
+
+
+class ReceiveBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='rb_admin', password='rb-pass', role=User.Role.ADMIN, approval_status=User.ApprovalStatus.APPROVED,
+        )
+        cls.paper = Item.objects.create(item_code='RB-PAPER', name='Paper', quantity=4)
+        cls.ink = Item.objects.create(item_code='RB-INK', name='Ink', quantity=0)
+        cls.paper_a = InventoryOrder.objects.create(item=cls.paper, ordered_qty=10)
+        cls.paper_b = InventoryOrder.objects.create(item=cls.paper, ordered_qty=5, received_qty=2,
+                                                    status=InventoryOrder.Status.PARTIAL)
+        cls.ink_a = InventoryOrder.objects.create(item=cls.ink, ordered_qty=3)
+
+    def _post(self, deliveries):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(self.admin)
+        return client.post('/api/inventory-orders/receive-batch/', data=json.dumps({'deliveries': deliveries}),
+                           content_type='application/json')
+
+    def _state(self):
+        return (
+            list(InventoryOrder.objects.order_by('id').values_list('received_qty', 'status')),
+            list(Item.objects.filter(item_code__startswith='RB-').order_by('id').values_list('quantity', flat=True)),
+            InventoryReceipt.objects.count(), StockLogEntry.objects.count(),
+        )
+
+    def test_receives_every_line_and_shares_item_stock(self):
+        response = self._post([
+            {'order_id': self.paper_a.id, 'quantity': 4, 'note': 'Note 17'},
+            {'order_id': self.paper_a.id, 'quantity': 6},
+            {'order_id': self.paper_b.id, 'quantity': 1},
+            {'order_id': self.ink_a.id, 'quantity': 3},
+        ])
+
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.json()['receipts']), 4)
+        self.assertEqual(self._state(), ([(10, 'received'), (3, 'partial'), (3, 'received')], [15, 3], 4, 4))
+        self.assertEqual(
+            list(StockLogEntry.objects.filter(item=self.paper).order_by('id').values_list(
+                'change', 'previous_quantity', 'new_quantity', 'pending_delta')),
+            [(4, 4, 8, -4), (6, 8, 14, -6), (1, 14, 15, -1)],
+        )
+
+    def test_rejected_batches_write_nothing(self):
+        before = self._state()
+
+        over = self._post([{'order_id': self.paper_b.id, 'quantity': 2}, {'order_id': self.paper_b.id, 'quantity': 2}])
+        missing = self._post([{'order_id': self.ink_a.id, 'quantity': 1}, {'order_id': 999999, 'quantity': 1}])
+        invalid = self._post([{'order_id': self.ink_a.id, 'quantity': 0}, 'x'])
+
+        self.assertEqual((over.status_code, missing.status_code, invalid.status_code), (400, 404, 400))
+        self.assertEqual(over.json()['details'], [{'order_id': self.paper_b.id, 'requested': 4, 'pending': 3}])
+        self.assertEqual(missing.json()['missing'], [999999])
+        self.assertEqual([row['index'] for row in invalid.json()['details']], [0, 1])
+        self.assertEqual(self._state(), before)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='fts_admin', password='fts-pass', role=User.Role.ADMIN, approval_status=User.ApprovalStatus.APPROVED,
+        )
+        cls.department = Department.objects.create(course_code='FTS', course='Search Studies', academic_year='2024-2025', year='1')
+
+    def _client(self):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(self.admin)
+        return client
+
+    def _students(self, query):
+        response = self._client().get('/api/students/search/', {'q': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['usn'] for row in response.json()['results']]
+
+    def _logs(self, query, **params):
+        response = self._client().get('/api/help-search/', {'q': query, 'scope': 'activity', **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_student_index_follows_bulk_and_raw_writes(self):
+        Student.objects.bulk_create([
+            Student(usn='1FT24CS001', name='Ada Lovelace', department=self.department),
+            Student(usn='1FT24CS002', name='Alan Turing', department=self.department),
+        ])
+        self.assertEqual(self._students('lovel'), ['1FT24CS001'])
+        self.assertEqual(sorted(self._students('1FT24')), ['1FT24CS001', '1FT24CS002'])
+
+        Student.objects.filter(usn='1FT24CS002').update(name='Grace Hopper')
+        self.assertEqual(self._students('hopper'), ['1FT24CS002'])
+        self.assertEqual(self._students('turing'), [])
+
+        Student.objects.filter(usn='1FT24CS001').delete()
+        self.assertEqual(self._students('lovelace'), [])
+
+    def test_activity_search_matches_prefixes_filters_dates_and_pages(self):
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action='item_added', description=f'Restocked notebooks batch {n}', user='fts_admin',
+                        timestamp=datetime(2024, 3, n, tzinfo=dt_timezone.utc))
+            for n in range(1, 6)
+        ] + [ActivityLog(action='item_added', description='Added pens', timestamp=datetime(2024, 3, 1, tzinfo=dt_timezone.utc))])
+
+        first = self._logs('restock note', limit=3)
+        self.assertEqual(len(first['results']), 3)
+        self.assertIn('[Restocked]', first['results'][0]['snippet'])
+        rest = self._logs('restock note', limit=3, cursor=first['next_cursor'])
+        self.assertIsNone(rest['next_cursor'])
+        self.assertEqual(len({row['id'] for row in first['results'] + rest['results']}), 5)
+        self.assertEqual(len(self._logs('restocked', date_from='2024-03-04')['results']), 2)
+
+        ActivityLog.objects.filter(description='Added pens').update(description='Added fountain pens')
+        self.assertEqual(len(self._logs('fountain')['results']), 1)
+
+    def test_activity_search_covers_action_and_user_on_every_backend_path(self):
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action='stock_take', description='Counted the shelves', user='ravi_clerk'),
+            ActivityLog(action='item_added', description='Added pens', user='meena_clerk'),
+        ])
+        for vendor in ('sqlite', 'other'):
+            with self.subTest(vendor=vendor), mock.patch.object(search_module.connection, 'vendor', vendor):
+                self.assertEqual([row['action'] for row in self._logs('stock_take')['results']], ['stock_take'])
+                self.assertEqual([row['user'] for row in self._logs('meena')['results']], ['meena_clerk'])
+                self.assertEqual([row['user'] for row in self._logs('ravi counted')['results']], ['ravi_clerk'])
+
+    def test_help_messages_are_searchable(self):
+        thread = HelpThread.objects.create(user=self.admin)
+        HelpMessage.objects.create(thread=thread, sender=self.admin, content='The printer toner is empty')
+        HelpMessage.objects.create(thread=thread, sender=self.admin, content='Toner replaced', is_admin_deleted=True)
+
+        response = self._client().get('/api/help-search/', {'q': 'toner', 'scope': 'help'})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row['snippet'] for row in response.json()['results']], ['The printer [toner] is empty'])
+
+    def test_invalid_dates_are_rejected(self):
+        for value in ('2024-13-45', '2024-02-30', 'soon'):
+            with self.subTest(date=value):
+                response = self._client().get('/api/help-search/', {'q': 'x', 'scope': 'activity', 'date_from': value})
+                self.assertEqual(response.status_code, 400, response.content)
+
+
+class ListFilterAndExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=8, academic_years=1, issues_per_student=2, help_threads=0, orders_per_item=1, prefix='LF')
+        cls.admin = User.objects.create_user(
+            username='lf_admin', password='lf-pass', role=User.Role.ADMIN, approval_status=User.ApprovalStatus.APPROVED,
+        )
+
+    def _client(self):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(self.admin)
+        return client
+
+    def test_badly_typed_filters_are_rejected(self):
+        client = self._client()
+        for path in ('/api/issue-records/?student=abc', '/api/issue-records/?date_from=garbage',
+                     '/api/stock-logs/?year=abc', '/api/issue-records/export/?date_to=2024-02-30'):
+            with self.subTest(path=path):
+                response = client.get(path)
+                self.assertEqual(response.status_code, 400, response.content)
+                self.assertIn('error', response.json())
+
+    def test_pending_page_list_comes_back_flat_and_columnar(self):
+        response = self._client().get('/api/pending-reports/?flat=1&format=columnar')
+
+        self.assertEqual(response.status_code, 200)
+        rows = decode_columnar(b''.join(response.streaming_content) if response.streaming else response.content)
+        report = PendingReport.objects.order_by('id').first()
+        self.assertEqual(len(rows), PendingReport.objects.count())
+        self.assertEqual(
+            {key: rows[0][key] for key in ('id', 'student_id', 'usn', 'qty_2PN', 'qty_1PO')},
+            {'id': report.id, 'student_id': report.student_id, 'usn': report.usn, 'qty_2PN': report.pn2, 'qty_1PO': report.po1},
+        )
+
+    def test_detail_routes_ignore_list_filters(self):
+        issue = IssueRecord.objects.order_by('id').first()
+        other = Student.objects.exclude(id=issue.student_id).values_list('id', flat=True).first()
+
+        response = self._client().get(f'/api/issue-records/{issue.id}/?student={other}')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['id'], issue.id)
+
+    def test_xlsx_export_streams_filtered_rows(self):
+        student = IssueRecord.objects.order_by('id').first().student
+
+        response = self._client().get('/api/issue-records/export/', {'file_type': 'xlsx', 'usn': student.usn})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(rows[0][:3], ('USN', 'Name', 'Item Code'))
+        self.assertEqual(
+            sorted(row[2] for row in rows[1:]),
+            sorted(IssueRecord.objects.filter(student=student).values_list('item_code', flat=True)),
+        )
+        self.assertEqual({row[0] for row in rows[1:]}, {student.usn})
+
+    def test_xlsx_export_keeps_types_and_drops_control_characters(self):
+        issued_at = datetime(2024, 3, 1, 9, 30, tzinfo=dt_timezone.utc)
+        response = export_response('xlsx', 'check', ['Name', 'Qty', 'When'], iter([('Bell\x07 ring', 3, issued_at)]),
+                                   sheet_title='Issues: 2024/25')
+
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet.title, 'Issues  2024 25')
+        self.assertEqual(list(sheet.values)[1], ('Bell ring', 3, timezone.localtime(issued_at).replace(tzinfo=None)))
+
+
+class SyncTableTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=6, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0, prefix='SY')
+
+    def _settle(self):
+        """Age every change log entry past the trailing window."""
+        ChangeLogEntry.objects.update(changed_at=timezone.now() - timedelta(seconds=sync_module.SYNC_WINDOW_SECONDS + 1))
+
+    def _pull(self, since, **params):
+        query = '&'.join(f"{key}={value}" for key, value in {'since': since, **params}.items())
+        response = Client(SERVER_NAME='localhost').get(f'/api/sync/students/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_cursor_holds_back_until_changes_settle(self):
+        self._settle()
+        snapshot = self._pull(0)
+        self.assertTrue(snapshot['full'])
+        self.assertEqual(len(snapshot['rows']), Student.objects.count())
+        version = snapshot['version']
+        self.assertEqual(version, ChangeLogEntry.objects.filter(table_name='students').latest('id').id)
+
+        gone = Student.objects.order_by('id').first()
+        added = Student.objects.create(usn='SYNEW001', name='Late Joiner', department=gone.department)
+        gone_id = gone.id
+        gone.delete()
+
+        for _ in range(2):
+            # Inside the window the cursor stays put, so the same changes come back until they settle
+            delta = self._pull(version)
+            self.assertEqual((delta['full'], delta['version'], delta['has_more']), (False, version, False))
+            self.assertEqual([row['usn'] for row in delta['rows']], ['SYNEW001'])
+            self.assertEqual(delta['deleted'], [gone_id])
+
+        self._settle()
+        delta = self._pull(version)
+        self.assertGreater(delta['version'], version)
+        self.assertEqual([row['id'] for row in delta['rows']], [added.id])
+        self.assertEqual(self._pull(delta['version'])['rows'], [])
+
+    def test_pages_settled_changes(self):
+        self._settle()
+        version = self._pull(0)['version']
+        Student.objects.filter(usn__startswith='SY').update(phone='5550100')
+        self._settle()
+
+        seen, pages = [], 0
+        while True:
+            page = self._pull(version, limit=4)
+            seen += [row['id'] for row in page['rows']]
+            version, pages = page['version'], pages + 1
+            if not page['has_more']:
+                break
+        self.assertEqual(sorted(seen), list(Student.objects.filter(usn__startswith='SY').order_by('id').values_list('id', flat=True)))
+        self.assertEqual(pages, 2)
+
+    def test_rejects_unknown_table_and_bad_cursor(self):
+        client = Client(SERVER_NAME='localhost')
+        self.assertEqual(client.get('/api/sync/items/').status_code, 404)
+        self.assertEqual(client.get('/api/sync/students/?since=abc').status_code, 400)
+
+
+class SparseFieldsTests(TestCase):
+    LISTS = {
+        '/api/students/': ('id', 'usn'),
+        '/api/enrollments/': ('id', 'academic_year'),
+        '/api/inventory-orders/': ('id', 'ordered_qty'),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=5, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=1, prefix='SF')
+        cls.admin = User.objects.create_user(
+            username='sf_admin', password='sf-pass', role=User.Role.ADMIN, approval_status=User.ApprovalStatus.APPROVED,
+        )
+
+    def _get(self, path, **params):
+        client = Client(SERVER_NAME='localhost')
+        client.force_login(self.admin)
+        return client.get(path, params)
+
+    def test_fields_trim_nested_and_flat_lists_alike(self):
+        for path, fields in self.LISTS.items():
+            with self.subTest(path=path):
+                nested = self._get(path, fields=','.join(fields))
+                flat = self._get(path, flat=1, fields=','.join(fields))
+                self.assertEqual((nested.status_code, flat.status_code), (200, 200))
+                self.assertEqual({tuple(row) for row in nested.json()}, {fields})
+                self.assertEqual({tuple(row) for row in flat.json()}, {fields})
+                # Same rows in the same order, whichever path serves them
+                self.assertEqual(nested.json(), flat.json())
+                self.assertGreater(len(flat.json()), 1)
+
+    def test_unknown_fields_are_rejected_on_both_paths(self):
+        for path in self.LISTS:
+            for params in ({'fields': 'id,bogus'}, {'flat': 1, 'fields': 'id,bogus'}):
+                with self.subTest(path=path, **params):
+                    response = self._get(path, **params)
+                    self.assertEqual(response.status_code, 400, response.content)
+                    self.assertIn('Unknown fields: bogus', response.json()['error'])
+                    self.assertIn('id', response.json()['error'].split('Valid fields:')[1])
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=4, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0, prefix='CG')
+
+    def _get(self, path, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return Client(SERVER_NAME='localhost').get(path, **headers)
+
+    def test_repeat_get_is_304_until_a_write(self):
+        first = self._get('/api/items/')
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        with self.assertNumQueries(1):
+            repeat = self._get('/api/items/', etag)
+        self.assertEqual((repeat.status_code, repeat.content, repeat['ETag']), (304, b'', etag))
+
+        item = Item.objects.get(item_code='2PN')
+        item.name = 'Two hundred page notebook'
+        item.save()
+        changed = self._get('/api/items/', etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertIn('Two hundred page notebook', changed.content.decode())
+
+        # Stock-only writes keep the reference cache but still move the ETag
+        item.quantity += 5
+        item.save(update_fields=['quantity'])
+        self.assertEqual(self._get('/api/items/', changed['ETag']).status_code, 200)
+
+    def test_requirements_etag_follows_requirement_updates(self):
+        department = Department.objects.filter(dept_students__usn__startswith='CG').first()
+        path = (f'/api/requirements/?course_code={department.course_code}&course={department.course}'
+                f'&academic_year={department.academic_year}&year={department.year}')
+        etag = self._get(path)['ETag']
+        self.assertEqual(self._get(path, etag).status_code, 304)
+
+        response = Client(SERVER_NAME='localhost').put('/api/requirements/update/', data=json.dumps({
+            'department_id': department.id, 'requirements': [{'item_code': '2PN', 'required_qty': 42}],
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        fresh = self._get(path, etag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertIn({'item_code': '2PN', 'required_qty': 42},
+                      [{key: row[key] for key in ('item_code', 'required_qty')} for row in fresh.json()['requirements']])
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape-secret')
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='metrics-admin', password='pw', role=User.Role.ADMIN,
+            approval_status=User.ApprovalStatus.APPROVED,
+        )
+        cls.maintainer = User.objects.create_user(
+            username='metrics-maintainer', password='pw', role=User.Role.STATIONERY,
+            approval_status=User.ApprovalStatus.APPROVED,
+        )
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.addCleanup(metrics_registry.reset)
+
+    def test_requires_admin_or_scrape_token(self):
+        client = Client(SERVER_NAME='localhost')
+        self.assertEqual(client.get('/api/metrics').status_code, 401)
+        self.assertEqual(client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code, 200)
+        client.force_login(self.maintainer)
+        self.assertEqual(client.get('/api/metrics').status_code, 403)
+        client.force_login(self.admin)
+        self.assertEqual(client.get('/api/metrics').status_code, 200)
+
+    def test_recent_duration_summary_has_sum_and_count(self):
+        for duration_ms in (100, 300):
+            metrics_registry.record('GET', 'api/items/', 200, duration_ms, 1, 1.0, 10)
+        client = Client(SERVER_NAME='localhost')
+        body = client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').content.decode()
+        self.assertIn('aims_request_duration_recent_seconds_sum{method="GET",route="api/items/"} 0.4', body)
+        self.assertIn('aims_request_duration_recent_seconds_count{method="GET",route="api/items/"} 2', body)
+
+    @override_settings(REQUEST_PROFILING_ENABLED=True, REQUEST_PROFILING_SLOW_MS=0,
+                       REQUEST_PROFILING_SLOW_LOG='/proc/aims-metrics-test/slow.jsonl')
+    def test_unwritable_slow_log_is_logged_not_raised(self):
+        middleware = RequestProfilingMiddleware(lambda request: HttpResponse('ok'))
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/api/items/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Could not write slow request log', logs.output[0])
+
+
+class ReferenceCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=6, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0, prefix='RC')
+
+    def setUp(self):
+        caches[getattr(settings, 'REFERENCE_CACHE_ALIAS', 'default')].clear()
+
+    def test_generation_is_shared_through_the_database(self):
+        self.assertIsNone(resolve_item('RC-NEW'))
+        # Another worker adds an item: only the shared counter moves, this process's cache is untouched
+        Item.objects.bulk_create([Item(item_code='RC-NEW', name='New item', quantity=1)])
+        self.assertIsNone(resolve_item('RC-NEW'))
+        TableVersion.objects.filter(table='cache:items').update(version=F('version') + 1)
+        self.assertEqual(resolve_item('rc-new')['item_code'], 'RC-NEW')
+
+    def test_generated_dataset_replaces_cached_misses(self):
+        self.assertIsNone(resolve_department_id('MCA', 'MASTER OF COMPUTER APPLICATIONS RC2', '2001-2002', '1'))
+        etag = Client(SERVER_NAME='localhost').get('/api/departments/')['ETag']
+
+        generate_dataset(students=2, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0,
+                         prefix='RC2', first_year=2001)
+
+        self.assertIsNotNone(resolve_department_id('MCA', 'MASTER OF COMPUTER APPLICATIONS RC2', '2001-2002', '1'))
+        self.assertEqual(Client(SERVER_NAME='localhost').get('/api/departments/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_stock_only_writes_keep_the_catalog(self):
+        item = Item.objects.get(item_code='2PN')
+        resolve_item('2PN')
+        item.quantity += 1
+        item.save(update_fields=['quantity'])
+        with self.assertNumQueries(1):
+            resolve_item('2PN')
+
+    def test_requirement_for_an_uncached_item_is_rejected(self):
+        enrollment = Enrollment.objects.select_related('department').filter(student__usn__startswith='RC').first()
+        resolve_item('2PN')
+        item, = Item.objects.bulk_create([Item(item_code='RC-REQ', name='Requirement only', quantity=50)])
+        DepartmentItemRequirement.objects.create(department=enrollment.department, item=item, required_qty=1)
+        department = enrollment.department
+
+        response = Client(SERVER_NAME='localhost').post('/api/issue-cohort/', data=json.dumps({
+            'course_code': department.course_code, 'course': department.course,
+            'academic_year': enrollment.academic_year, 'year': enrollment.year,
+        }), content_type='application/json')
+
+        self.assertEqual(response.status_code, 404, response.content)
+
+
+class PendingItemTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=12, academic_years=1, issues_per_student=3, help_threads=0, orders_per_item=0, prefix='PI')
+
+    def test_rows_match_requirements_minus_issues_and_follow_new_issues(self):
+        enrollment = Enrollment.objects.select_related('student').filter(student__usn__startswith='PI').first()
+        student = enrollment.student
+        for requirement in DepartmentItemRequirement.objects.filter(department=enrollment.department).select_related('item'):
+            issued = IssueRecord.objects.filter(
+                student=student, item_code__iexact=requirement.item.item_code,
+                academic_year=enrollment.academic_year, year=enrollment.year,
+            ).aggregate(total=Sum('qty_issued'))['total'] or 0
+            row = PendingItem.objects.get(student=student, item=requirement.item)
+            self.assertEqual((row.required_qty, row.issued_qty, row.pending_qty),
+                             (requirement.required_qty, issued, max(0, requirement.required_qty - issued)))
+        self.assertEqual(refresh_pending(), {'created': 0, 'updated': 0, 'deleted': 0})
+
+        row = PendingItem.objects.select_related('item').filter(student=student, pending_qty__gt=0).first()
+        response = Client(SERVER_NAME='localhost').post('/api/issue-bulk-create/', data=json.dumps({
+            'student_usn': student.usn, 'issues': [{'item_code': row.item.item_code, 'quantity': 1}],
+        }), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201, response.content)
+        row.refresh_from_db()
+        self.assertEqual(row.pending_qty, row.required_qty - row.issued_qty)
+        self.assertEqual(refresh_pending(), {'created': 0, 'updated': 0, 'deleted': 0})
+
+    def test_edits_and_deletes_refresh_the_rows(self):
+        client = Client(SERVER_NAME='localhost')
+        issue = IssueRecord.objects.filter(student__usn__startswith='PI', qty_issued__gt=0).first()
+        enrollment = Enrollment.objects.get(student_id=issue.student_id, academic_year=issue.academic_year, year=issue.year)
+
+        def rows():
+            return {
+                (row.item.item_code, row.required_qty, row.issued_qty, row.pending_qty)
+                for row in PendingItem.objects.filter(student_id=issue.student_id).select_related('item')
+            }
+
+        codes = dict(Item.objects.values_list('id', 'item_code'))
+
+        def fresh():
+            return {
+                (codes[item_id], required, issued, pending)
+                for (_, _, _, item_id), (_, required, issued, pending) in compute_pending(student_ids=[issue.student_id]).items()
+            }
+
+        response = client.patch(f'/api/issue-records/{issue.id}/', data=json.dumps({'qty_issued': issue.qty_issued + 2}),
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(rows(), fresh())
+
+        self.assertEqual(client.delete(f'/api/issue-records/{issue.id}/').status_code, 204)
+        self.assertEqual(rows(), fresh())
+
+        response = client.put('/api/requirements/update/', data=json.dumps({
+            'department_id': enrollment.department_id, 'requirements': [{'item_code': issue.item_code, 'required_qty': 9}],
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIn(9, {required for code, required, _, _ in rows() if code.upper() == issue.item_code.upper()})
+        self.assertEqual(rows(), fresh())
+
+        self.assertEqual(client.delete(f'/api/enrollments/{enrollment.id}/').status_code, 204)
+        self.assertEqual(rows(), set())
+        response = client.post('/api/enrollments/', data=json.dumps({
+            'student_id': enrollment.student_id, 'department_id': enrollment.department_id,
+            'academic_year': enrollment.academic_year, 'year': enrollment.year,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(rows(), fresh())
+        self.assertTrue(rows())
+        self.assertEqual(refresh_pending(), {'created': 0, 'updated': 0, 'deleted': 0})
+
+    def test_matrix_matches_pending_items(self):
+        academic_year = Enrollment.objects.filter(student__usn__startswith='PI').values_list('academic_year', flat=True).first()
+        matrix = build_pending_matrix(academic_year)
+        cells = {
+            (usn, code): pending
+            for i, usn in enumerate(matrix.usns)
+            for code, pending in zip(matrix.item_codes, matrix.pending[i].tolist())
+        }
+        expected = {
+            (usn, code): pending
+            for usn, code, pending in PendingItem.objects.filter(academic_year=academic_year).values_list(
+                'student__usn', 'item__item_code', 'pending_qty')
+        }
+        self.assertEqual(cells, expected)
+
+        response = Client(SERVER_NAME='localhost').get('/api/pending-matrix/', {'academic_year': academic_year, 'outstanding': 1})
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual(body['totals'], matrix.totals())
+        self.assertEqual(len(body['students']['usn']), int(matrix.pending.any(axis=1).sum()))
+
+
+class BackfillTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=10, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0, prefix='BF')
+
+    def test_enrollments_are_recreated_once_and_dry_run_writes_nothing(self):
+        expected = Enrollment.objects.count()
+        Enrollment.objects.filter(student__usn__startswith='BF').delete()
+
+        self.assertEqual(run_backfill_enrollments(dry_run=True)['created'], 10)
+        self.assertEqual(Enrollment.objects.count(), expected - 10)
+        self.assertEqual(run_backfill_enrollments(batch_size=3)['created'], 10)
+        self.assertEqual(Enrollment.objects.count(), expected)
+        self.assertEqual(run_backfill_enrollments()['created'], 0)
+
+    def test_requirements_follow_legacy_columns(self):
+        requirement = DepartmentItemRequirement.objects.select_related('department', 'item').filter(item__item_code='2PN').first()
+        requirement.department.two_hundred_notebook = requirement.required_qty + 5
+        requirement.department.save()
+        requirement.delete()
+
+        counts = run_backfill_requirements(batch_size=4)
+
+        self.assertEqual(counts['requirements_created'], 1)
+        self.assertEqual(
+            DepartmentItemRequirement.objects.get(department=requirement.department, item__item_code='2PN').required_qty,
+            requirement.department.two_hundred_notebook,
+        )
+        self.assertEqual(run_backfill_requirements()['requirements_created'], 0)
+
+    def test_dry_run_counts_requirements_of_items_it_would_create(self):
+        Item.objects.filter(item_code='2PR').delete()
+
+        preview = run_backfill_requirements(dry_run=True)
+
+        self.assertFalse(Item.objects.filter(item_code='2PR').exists())
+        self.assertEqual((preview['items_created'], preview['requirements_created']), (1, Department.objects.count()))
+        self.assertEqual(run_backfill_requirements()['requirements_created'], preview['requirements_created'])
+
+    def test_cached_catalog_and_requirements_follow_the_backfill(self):
+        department = Department.objects.order_by('id').first()
+        Item.objects.filter(item_code='2PR').delete()
+        caches[getattr(settings, 'REFERENCE_CACHE_ALIAS', 'default')].clear()
+        self.assertIsNone(resolve_item('2PR'))
+        cached = {row['item_code']: row['required_qty'] for row in department_requirements(department.id)}
+        Department.objects.filter(id=department.id).update(two_hundred_notebook=cached['2PN'] + 6)
+
+        run_backfill_requirements()
+
+        self.assertIsNotNone(resolve_item('2PR'))
+        self.assertEqual(
+            {row['item_code']: row['required_qty'] for row in department_requirements(department.id)}['2PN'],
+            cached['2PN'] + 6,
+        )
+
+
+class BulkUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=4, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0, prefix='BU')
+
+    def _upload(self, rows):
+        response = Client(SERVER_NAME='localhost').post('/api/students/bulk_upload/', data=json.dumps(rows),
+                                                        content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_updates_creates_and_enrolls_once(self):
+        student = Student.objects.select_related('department').filter(usn__startswith='BU').order_by('id').first()
+        dept = student.department
+        cohort = {'course_code': dept.course_code, 'course': dept.course, 'academic_year': dept.academic_year, 'year': dept.year}
+        rows = [
+            {'usn': student.usn, 'name': 'Renamed Student', 'email': 'renamed@example.edu', **cohort},
+            {'usn': 'bunew0001', 'name': 'New Student', **cohort},
+            {'usn': 'BUNEW0001', 'name': 'Duplicate Row', **cohort},
+            {'usn': 'BUNEW0002', 'name': 'Fresh Cohort', 'course_code': 'ZZ', 'course': 'New Course',
+             'academic_year': '2090-91', 'year': '1'},
+        ]
+
+        body = self._upload(rows)
+
+        self.assertEqual((body['created'], body['updated'], body['received']), (2, 1, 4))
+        student.refresh_from_db()
+        self.assertEqual((student.name, student.email, student.department_id), ('Renamed Student', 'renamed@example.edu', dept.id))
+        fresh = Student.objects.select_related('department').get(usn='BUNEW0002')
+        self.assertEqual((fresh.department.course_code, fresh.department.academic_year), ('ZZ', '2090-2091'))
+        self.assertTrue(Enrollment.objects.filter(student=fresh, department=fresh.department, academic_year='2090-2091').exists())
+        enrollments = Enrollment.objects.count()
+
+        again = self._upload(rows)
+
+        self.assertEqual((again['created'], again['created_enrollments']), (0, 0))
+        self.assertEqual(Enrollment.objects.count(), enrollments)
+        self.assertEqual(Department.objects.filter(course_code='ZZ').count(), 1)
+
+
+class UploadPreviewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=6, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0, prefix='UP')
+
+    def test_vectorized_normalizers_match_the_scalar_ones(self):
+        years = ['2023-24', '2023/2024', ' 2023 \u2013 25 ', '2023-2024', '2023', '', None, 'abc-12', '2023-2X']
+        self.assertEqual(list(normalize_academic_years(pd.Series(years))), [normalize_academic_year(v) for v in years])
+        values = ['1', '01', ' 2 ', 'Year 3', 'II', '', None, '00']
+        self.assertEqual(list(normalize_years(pd.Series(values))), [normalize_year(v) for v in values])
+
+    def test_preview_reports_changes_without_writing(self):
+        student = Student.objects.select_related('department').filter(usn__startswith='UP').first()
+        dept = student.department
+        row = {'course_code': dept.course_code, 'course': dept.course, 'academic_year': dept.academic_year, 'year': dept.year}
+        rows = [
+            {**row, 'usn': student.usn, 'name': 'Renamed', 'email': student.email, 'phone': student.phone},
+            {**row, 'usn': 'UPNEW1', 'name': 'New One'},
+            {**row, 'usn': 'upnew1', 'name': 'New One Again'},
+            {**row, 'usn': 'UPNEW2', 'name': 'Elsewhere', 'course_code': 'NOPE'},
+            {**row, 'usn': '', 'name': 'No USN'},
+        ]
+        students_before, enrollments_before = Student.objects.count(), Enrollment.objects.count()
+
+        response = Client(SERVER_NAME='localhost').post('/api/students/bulk_upload/preview/', data=json.dumps(rows),
+                                                        content_type='application/json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual(body['students'], {'create': 2, 'update': 1, 'unchanged': 0})
+        self.assertEqual(body['samples']['updates'], [{'usn': student.usn, 'changes': {'name': [student.name, 'Renamed']}}])
+        self.assertEqual((body['enrollments_to_create'], body['unknown_departments'], body['duplicate_usns'], body['skipped']),
+                         (2, 1, 1, 1))
+        self.assertEqual(body['samples']['duplicate_usns'], [{'usn': 'UPNEW1', 'rows': [2, 3]}])
+        self.assertEqual((Student.objects.count(), Enrollment.objects.count()), (students_before, enrollments_before))
+
+    def test_first_upload_into_empty_tables(self):
+        Student.objects.all().delete()
+        Department.objects.all().delete()
+        rows = [
+            {'usn': 'FIRST1', 'name': 'First', 'course_code': 'BCA', 'course': 'BCA', 'academic_year': '2024/25', 'year': '1'},
+            {'usn': 'FIRST2', 'name': 'Second', 'course_code': 'BCA', 'course': 'BCA', 'academic_year': '', 'year': '1'},
+        ]
+
+        response = Client(SERVER_NAME='localhost').post('/api/students/bulk_upload/preview/', data=json.dumps(rows),
+                                                        content_type='application/json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual(body['students'], {'create': 2, 'update': 0, 'unchanged': 0})
+        self.assertEqual((body['enrollments_to_create'], body['unknown_departments']), (2, 2))
+        self.assertEqual(body['samples']['creates'][0]['academic_year'], '2024-2025')
+
+    def test_rows_must_be_objects(self):
+        response = Client(SERVER_NAME='localhost').post('/api/students/bulk_upload/preview/', data=json.dumps([1, 2]),
+                                                        content_type='application/json')
+        self.assertEqual(response.status_code, 400, response.content)
+
+
+class PromotionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=40, academic_years=1, issues_per_student=0, help_threads=0, orders_per_item=0,
+                         prefix='PR', first_year=2090)
+
+    def test_promotes_into_next_year_departments_and_completes_final_years(self):
+        final_year = {code: years for code, _, _, years in SYNTHETIC_PROGRAMS}
+        before = {
+            student_id: (code, int(year), dept_id)
+            for student_id, code, year, dept_id in Student.objects.filter(usn__startswith='PR').values_list(
+                'id', 'department__course_code', 'year', 'department_id')
+        }
+        expected_promoted = sum(1 for code, year, _ in before.values() if year < final_year[code])
+
+        preview = promote('2090-2091', '2091-2092', dry_run=True)
+        self.assertEqual(Department.objects.filter(academic_year='2091-2092').count(), 0)
+        self.assertEqual(preview['totals']['students_promoted'], expected_promoted)
+        self.assertEqual(preview['totals']['students_promoted'] + preview['totals']['students_completed'], len(before))
+
+        result = promote('2090-2091', '2091-2092')
+
+        self.assertEqual(result['totals'], {**preview['totals'], 'enrollments': expected_promoted})
+        for student in Student.objects.select_related('department').filter(id__in=before):
+            code, year, dept_id = before[student.id]
+            if year >= final_year[code]:
+                self.assertEqual(student.department_id, dept_id)
+                continue
+            self.assertEqual((student.department.academic_year, student.year), ('2091-2092', str(year + 1)))
+            self.assertTrue(Enrollment.objects.filter(student=student, department=student.department).exists())
+            template = Department.objects.get(course_code=code, academic_year='2090-2091', year=str(year + 1))
+            self.assertEqual(
+                set(DepartmentItemRequirement.objects.filter(department=student.department).values_list('item_id', 'required_qty')),
+                set(DepartmentItemRequirement.objects.filter(department=template).values_list('item_id', 'required_qty')),
+            )
+        self.assertEqual(promote('2090-2091', '2091-2092')['totals']['students_promoted'], 0)
+
+    def test_promoted_cohorts_are_visible_through_the_reference_cache(self):
+        student = Student.objects.select_related('department').filter(usn__startswith='PR', year='1').first()
+        department = student.department
+        cohort = (department.course_code, department.course, '2091-2092', '2')
+        caches[getattr(settings, 'REFERENCE_CACHE_ALIAS', 'default')].clear()
+        self.assertIsNone(resolve_department_id(*cohort))
+
+        promote('2090-2091', '2091-2092')
+
+        student.refresh_from_db()
+        self.assertEqual(resolve_department_id(*cohort), student.department_id)
+        self.assertEqual(
+            {row['item_code']: row['required_qty'] for row in department_requirements(student.department_id)},
+            dict(DepartmentItemRequirement.objects.filter(department_id=student.department_id).values_list(
+                'item__item_code', 'required_qty')),
+        )
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=16, academic_years=2, issues_per_student=3, help_threads=0, orders_per_item=0,
+                         prefix='AR', first_year=2080)
+
+    def test_archived_year_leaves_hot_tables_and_reads_stay_transparent(self):
+        client = Client(SERVER_NAME='localhost')
+        hot_issues = set(IssueRecord.objects.filter(academic_year='2080-2081').values_list('id', 'qty_issued'))
+        hot_enrollments = Enrollment.objects.filter(academic_year='2080-2081').count()
+        other_enrollments = Enrollment.objects.exclude(academic_year='2080-2081').count()
+        listed = client.get('/api/issue-records/?academic_year=2080-2081&flat=1').json()
+        matrix = build_pending_matrix('2080-2081')
+        enrollment = Enrollment.objects.select_related('student', 'department').filter(academic_year='2080-2081').first()
+        records_url = (f'/api/student-records/{enrollment.student.usn}/?course_code={enrollment.department.course_code}'
+                       f'&academic_year=2080-2081&year={enrollment.year}')
+        records = client.get(records_url).json()
+        self.assertTrue(hot_issues and hot_enrollments)
+
+        with self.assertRaises(ArchiveError):
+            archive_years(['2080-2081'])
+        preview = archive_years(['2080-2081'], dry_run=True, force=True)
+        self.assertEqual(preview['totals']['core_issuerecord'], len(hot_issues))
+        self.assertFalse(ArchiveManifest.objects.exists())
+
+        result = archive_years(['2080/81'], force=True, batch_size=7)
+
+        self.assertEqual(result['totals'], {**preview['totals'], 'core_pendingitem': result['totals']['core_pendingitem']})
+        self.assertFalse(IssueRecord.objects.filter(academic_year='2080-2081').exists())
+        self.assertFalse(Enrollment.objects.filter(academic_year='2080-2081').exists())
+        self.assertFalse(PendingItem.objects.filter(academic_year='2080-2081').exists())
+        self.assertEqual(Enrollment.objects.count(), other_enrollments)
+        self.assertEqual(set(ArchivedIssueRecord.objects.values_list('id', 'qty_issued')), hot_issues)
+        self.assertEqual(ArchiveManifest.objects.get(academic_year='2080-2081', table='core_enrollment').rows, hot_enrollments)
+
+        self.assertEqual(client.get('/api/issue-records/?academic_year=2080-2081&flat=1').json(), listed)
+        self.assertEqual(client.get(records_url).json(), records)
+        archived = build_pending_matrix('2080-2081')
+        self.assertEqual((archived.usns, archived.totals()), (matrix.usns, matrix.totals()))
+        self.assertEqual(archive_years(['2080-2081'], force=True)['totals']['core_issuerecord'], 0)
+
+    def test_archived_year_is_closed_to_issues_and_keeps_its_logs_readable(self):
+        client = Client(SERVER_NAME='localhost')
+        enrollment = Enrollment.objects.select_related('student', 'department').filter(academic_year='2080-2081').first()
+        log = ActivityLog.objects.create(action='books_issued', description='Issued in 2080',
+                                         timestamp=datetime(2080, 9, 1, tzinfo=dt_timezone.utc))
+        archive_years(['2080-2081'], force=True)
+        archived_issues = ArchivedIssueRecord.objects.count()
+
+        single = client.post('/api/issue-bulk-create/', data=json.dumps({
+            'student_usn': enrollment.student.usn, 'academic_year': '2080-2081', 'year': enrollment.year,
+            'issues': [{'item_code': '2PN', 'quantity': 1}],
+        }), content_type='application/json')
+        cohort = client.post('/api/issue-cohort/', data=json.dumps({
+            'course_code': enrollment.department.course_code, 'course': enrollment.department.course,
+            'academic_year': '2080-2081', 'year': enrollment.year,
+        }), content_type='application/json')
+
+        self.assertEqual((single.status_code, cohort.status_code), (409, 409))
+        self.assertFalse(IssueRecord.objects.filter(academic_year='2080-2081').exists())
+        self.assertEqual(len(client.get('/api/issue-records/?academic_year=2080-2081&flat=1').json()), archived_issues)
+        self.assertNotIn(log.id, [row['id'] for row in client.get('/api/activity-logs/').json()])
+        self.assertEqual([row['id'] for row in client.get('/api/activity-logs/?academic_year=2080/81').json()], [log.id])
+
+    def test_failed_year_leaves_nothing_behind(self):
+        hot_issues = IssueRecord.objects.filter(academic_year='2080-2081').count()
+        move = archive_module._move
+
+        def failing_move(model, *args):
+            if model is Enrollment:
+                raise DatabaseError('disk full')
+            return move(model, *args)
+
+        with mock.patch.object(archive_module, '_move', failing_move), self.assertRaises(DatabaseError):
+            archive_years(['2080-2081'], force=True)
+
+        self.assertFalse(ArchiveManifest.objects.exists())
+        self.assertFalse(ArchivedIssueRecord.objects.exists())
+        self.assertEqual(IssueRecord.objects.filter(academic_year='2080-2081').count(), hot_issues)
+
+
+class PurgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(students=20, academic_years=2, issues_per_student=2, help_threads=0, orders_per_item=0,
+                         prefix='PG', first_year=2070)
+
+    def test_scoped_purge_deletes_only_the_cohort_and_its_rows(self):
+        in_scope = set(Student.objects.filter(department__academic_year='2070-2071').values_list('id', flat=True))
+        others = Student.objects.exclude(id__in=in_scope).count()
+        self.assertTrue(in_scope and others)
+
+        preview = run_purge(academic_year='2070/71', dry_run=True, batch_size=3)
+        self.assertEqual(Student.objects.filter(id__in=in_scope).count(), len(in_scope))
+
+        result = run_purge(academic_year='2070/71', batch_size=3)
+
+        self.assertEqual(result['deleted'], preview['deleted'])
+        self.assertEqual(result['deleted']['core_student'], len(in_scope))
+        self.assertEqual(Student.objects.count(), others)
+        for model in (IssueRecord, PendingReport, Enrollment, PendingItem):
+            self.assertFalse(model.objects.filter(student_id__in=in_scope).exists(), model.__name__)
+        self.assertEqual(result['reclaimed'], [])  # VACUUM needs autocommit; tests run in a transaction
+        with self.assertRaises(PurgeError):
+            run_purge(course_code='NOPE')
+
+
+class ActivityLogWriterTests(TestCase):
+    @override_settings(ACTIVITY_LOG_BUFFERED=False)
+    def test_synchronous_fallback_writes_structured_fields(self):
+        item = Item.objects.create(item_code='ALW1', name='Writer test item', quantity=1)
+
+        activity.log('item_added', 'Added inventory item', actor='clerk', obj=item)
+
+        entry = ActivityLog.objects.get(object_type='item', object_id=str(item.id))
+        self.assertEqual((entry.action, entry.user), ('item_added', 'clerk'))
+
+    @override_settings(ACTIVITY_LOG_BUFFERED=True, ACTIVITY_LOG_BUFFER_SIZE=3, ACTIVITY_LOG_FLUSH_SECONDS=3600)
+    def test_buffered_entries_flush_in_bulk_at_size_and_skip_rollbacks(self):
+        self.addCleanup(activity.flush)
+        before = ActivityLog.objects.count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = activity.log('student_added', 'one', object_type='student', object_id=1)
+            activity.log('student_added', 'two', object_type='student', object_id=2)
+            with self.assertRaises(ValueError), transaction.atomic():
+                activity.log('student_added', 'rolled back')
+                raise ValueError
+        self.assertEqual((activity.pending(), ActivityLog.objects.count()), (2, before))
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            activity.log('student_added', 'three', object_type='student', object_id=3)
+
+        self.assertEqual(activity.pending(), 0)
+        self.assertEqual(sum('INSERT INTO "core_activitylog"' in q['sql'] for q in queries.captured_queries), 1)
+        self.assertEqual(
+            sorted(ActivityLog.objects.filter(action='student_added').values_list('object_id', flat=True)), ['1', '2', '3'],
+        )
+        self.assertEqual(ActivityLog.objects.get(description='one').timestamp, first.timestamp)
+
+    @override_settings(ACTIVITY_LOG_BUFFERED=True, ACTIVITY_LOG_BUFFER_SIZE=10, ACTIVITY_LOG_FLUSH_SECONDS=3600)
+    def test_failed_flush_keeps_entries_and_rearms_the_timer(self):
+        self.addCleanup(activity.flush)
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.log('student_added', 'kept', object_type='student', object_id=7)
+
+        with mock.patch.object(ActivityLog.objects, 'bulk_create', side_effect=DatabaseError('database is locked')), \
+                self.assertLogs('core.activity', 'ERROR'):
+            self.assertEqual(activity.flush(), 0)
+        self.assertEqual(activity.pending(), 1)
+        self.assertIsNotNone(activity._timer)
+
+        self.assertEqual(activity.flush(), 1)
+        self.assertTrue(ActivityLog.objects.filter(description='kept').exists())
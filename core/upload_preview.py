@@ -0,0 +1,202 @@
+# core/upload_preview.py
+"""Dry-run diff of a bulk student upload, computed with pandas.
+
+Takes the same row list the bulk upload endpoint receives and reports what
+committing it would do: students created, updated or unchanged, enrollments
+added, rows whose department does not exist yet, duplicate USNs, and rows
+skipped for missing fields. Each of those comes with a small sample.
+
+Academic years and years are normalized column-wise with the ``.str``
+accessor, using the same rules as ``backfill.normalize_academic_year`` and
+``normalize_year``. Departments, students and enrollments are read once
+each, and the sheet is matched against them with DataFrame merges. Nothing is
+written.
+"""
+import pandas as pd
+
+from .models import Department, Enrollment, Student
+
+SAMPLE_SIZE = 20
+
+SHEET_COLUMNS = ('usn', 'name', 'course_code', 'course', 'academic_year', 'year', 'email', 'phone')
+STUDENT_FIELDS = ('name', 'department_id', 'year', 'email', 'phone')
+DEPARTMENT_KEY = ['course_code', 'course', 'academic_year', 'year']
+
+
+def _text(series):
+    return series.fillna('').astype(str).str.strip()
+
+
+def _per_distinct(normalize, series):
+    """Run ``normalize`` over the distinct values only and spread the result back (years repeat a lot)."""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    normalized = normalize(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    return pd.Series(normalized[codes], index=series.index, dtype=object)
+
+
+def normalize_academic_years(series):
+    """Vectorized ``normalize_academic_year``: '2023/24' and '2023 - 24' -> '2023-2024'."""
+    return _per_distinct(_academic_years, series)
+
+
+def normalize_years(series):
+    """Vectorized ``normalize_year``: digits only without leading zeros, else the stripped value."""
+    return _per_distinct(_years, series)
+
+
+def _academic_years(series):
+    s = _text(series).str.upper().str.replace(r"[\u2010-\u2015\u2212]", '-', regex=True)
+    s = s.str.replace('/', '-', regex=False).str.replace(' ', '', regex=False)
+    # astype(str): on an empty series the split parts come back as float columns
+    parts = s.str.split('-', n=2, expand=True).reindex(columns=[0, 1]).fillna('').astype(str)
+    start = parts[0].str[:4]
+    expand = s.str.contains('-', regex=False) & start.str.fullmatch(r'\d+') & parts[1].str.fullmatch(r'\d{2}')
+    start = start.where(~expand, start.str.lstrip('0').replace('', '0'))
+    return s.mask(expand, start + '-' + start.str[:2] + parts[1])
+
+
+def _years(series):
+    s = _text(series)
+    digits = s.str.replace(r'\D+', '', regex=True)
+    has_digits = digits != ''
+    return s.mask(has_digits, digits.str.lstrip('0').replace('', '0'))
+
+
+def _records(frame, columns, size):
+    return frame.head(size)[list(columns)].fillna('').to_dict('records')
+
+
+def _sheet(rows):
+    sheet = pd.DataFrame.from_records(rows).reindex(columns=SHEET_COLUMNS)
+    for column in ('name', 'email', 'phone'):
+        sheet[column] = _text(sheet[column])
+    for column in ('usn', 'course_code', 'course'):
+        sheet[column] = _text(sheet[column]).str.upper()
+    sheet['academic_year'] = normalize_academic_years(sheet['academic_year'])
+    sheet['year'] = normalize_years(sheet['year'])
+    sheet['row'] = range(1, len(sheet) + 1)
+    return sheet
+
+
+def _departments():
+    frame = pd.DataFrame.from_records(
+        Department.objects.values_list('id', *DEPARTMENT_KEY), columns=['department_id', *DEPARTMENT_KEY],
+    )
+    for column in ('course_code', 'course'):
+        frame[column] = _text(frame[column]).str.upper()
+    frame['academic_year'] = normalize_academic_years(frame['academic_year'])
+    frame['year'] = normalize_years(frame['year'])
+    # The upload takes the first department by id for a key; rows without an academic year use the latest one
+    frame = frame.sort_values('department_id')
+    exact = frame.drop_duplicates(DEPARTMENT_KEY)
+    frame['ay_start'] = pd.to_numeric(frame['academic_year'].str.extract(r'^(\d+)', expand=False), errors='coerce').fillna(0)
+    latest = frame.sort_values('ay_start', ascending=False, kind='stable').drop_duplicates(['course_code', 'course', 'year'])
+    return exact, latest[['department_id', 'course_code', 'course', 'year', 'academic_year']]
+
+
+def preview(rows, sample=SAMPLE_SIZE):
+    """Counts and samples describing what uploading ``rows`` would change."""
+    sheet = _sheet(rows)
+    valid = (sheet['usn'] != '') & (sheet['name'] != '') & (sheet['course_code'] != '') & (sheet['course'] != '')
+    skipped = sheet[~valid]
+    sheet = sheet[valid]
+
+    duplicated = sheet['usn'].duplicated(keep=False)
+    duplicates = sheet[duplicated].groupby('usn', sort=False)['row'].agg(list).reset_index(name='rows')
+    # New students are created from the first row with a USN; evaluate that row
+    sheet = sheet.drop_duplicates('usn', keep='first')
+
+    exact, latest = _departments()
+    sheet = sheet.merge(exact, on=DEPARTMENT_KEY, how='left')
+    no_ay = sheet['department_id'].isna() & (sheet['academic_year'] == '')
+    if no_ay.any():
+        fallback = sheet.loc[no_ay, ['usn', 'course_code', 'course', 'year']].merge(
+            latest, on=['course_code', 'course', 'year'], how='left',
+        ).set_index('usn')
+        sheet = sheet.set_index('usn')
+        sheet.loc[fallback.index, 'department_id'] = fallback['department_id']
+        sheet.loc[fallback.index, 'department_ay'] = fallback['academic_year']
+        sheet = sheet.reset_index()
+    sheet['department_id'] = sheet['department_id'].astype('Int64')
+    unknown = sheet[sheet['department_id'].isna()]
+    unknown_departments = unknown.groupby(DEPARTMENT_KEY, sort=False).size().reset_index(name='students')
+
+    existing = pd.DataFrame.from_records(
+        Student.objects.values_list('id', 'usn', *STUDENT_FIELDS), columns=['student_id', 'usn', *STUDENT_FIELDS],
+    )
+    existing['usn'] = _text(existing['usn']).str.upper()
+    existing['department_id'] = existing['department_id'].astype('Int64')
+    existing = existing.drop_duplicates('usn')
+    merged = sheet.merge(existing, on='usn', how='left', suffixes=('', '_current'))
+    is_new = merged['student_id'].isna()
+
+    current = merged[~is_new]
+    changed = pd.DataFrame(index=current.index)
+    for field in STUDENT_FIELDS:
+        if field == 'department_id':
+            changed[field] = current[field].fillna(-1) != current[f'{field}_current'].fillna(-1)
+        else:
+            changed[field] = _text(current[field]) != _text(current[f'{field}_current'])
+    updates = current[changed.any(axis=1)]
+
+    # Enrollments: one per (student, department, academic year, year) that does not exist yet
+    wanted = merged[merged['department_id'].notna()].copy()
+    wanted['academic_year'] = wanted['academic_year'].mask(
+        wanted['academic_year'] == '', wanted.get('department_ay', pd.Series(index=wanted.index, dtype=object)),
+    ).fillna('')
+    enrollments = pd.DataFrame.from_records(
+        Enrollment.objects.values_list('student__usn', 'department_id', 'academic_year', 'year'),
+        columns=['usn', 'department_id', 'academic_year', 'year'],
+    )
+    enrollments['usn'] = _text(enrollments['usn']).str.upper()
+    enrollments['academic_year'] = normalize_academic_years(enrollments['academic_year'])
+    enrollments['year'] = normalize_years(enrollments['year'])
+    enrollments['enrolled'] = True
+    wanted['department_id'] = wanted['department_id'].astype('int64')
+    wanted = wanted.merge(
+        enrollments.drop_duplicates(['usn', 'department_id', 'academic_year', 'year']),
+        on=['usn', 'department_id', 'academic_year', 'year'], how='left',
+    )
+    new_enrollments = int(wanted['enrolled'].isna().sum()) + int(merged['department_id'].isna().sum())
+
+    update_samples = []
+    for index, row in updates.head(sample).iterrows():
+        update_samples.append({
+            'usn': row['usn'],
+            'changes': {
+                field: [row[f'{field}_current'], row[field]]
+                for field in STUDENT_FIELDS if changed.at[index, field]
+            },
+        })
+
+    return _clean({
+        'received': len(rows),
+        'valid': int(valid.sum()),
+        'skipped': len(skipped),
+        'students': {
+            'create': int(is_new.sum()),
+            'update': len(updates),
+            'unchanged': int((~is_new).sum()) - len(updates),
+        },
+        'enrollments_to_create': new_enrollments,
+        'unknown_departments': len(unknown_departments),
+        'duplicate_usns': len(duplicates),
+        'samples': {
+            'creates': _records(merged[is_new], ('usn', 'name', 'course_code', 'course', 'academic_year', 'year'), sample),
+            'updates': update_samples,
+            'unknown_departments': _records(unknown_departments, (*DEPARTMENT_KEY, 'students'), sample),
+            'duplicate_usns': _records(duplicates, ('usn', 'rows'), sample),
+            'skipped': _records(skipped, ('row', 'usn', 'name', 'course_code', 'course'), sample),
+        },
+    })
+
+
+def _clean(value):
+    """NaN / NA -> None and NumPy scalars -> Python, for JSON."""
+    if isinstance(value, dict):
+        return {key: _clean(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clean(item) for item in value]
+    if not isinstance(value, str) and pd.isna(value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
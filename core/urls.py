@@ -11,6 +11,7 @@ router.register(r'students', views.StudentViewSet, basename='student')
 router.register(r'items', views.ItemViewSet) # <-- This creates /api/items/ and /api/items/<pk>/
 router.register(r'issue-records', views.IssueRecordViewSet)
 router.register(r'pending-reports', views.PendingReportViewSet)
+router.register(r'pending-items', views.PendingItemViewSet, basename='pending-item')
 router.register(r'users', views.UserViewSet)
 router.register(r'activity-logs', views.ActivityLogViewSet, basename='activity-log')
 router.register(r'enrollments', views.EnrollmentViewSet, basename='enrollment')
@@ -34,12 +35,18 @@ urlpatterns = [
     path('api/help-notifications/purge/', views.purge_orphan_help_notifications, name='api-help-notifications-purge'),
     path('media/help-attachments/<int:message_id>/', views.help_attachment_preview, name='help-attachment-preview'),
     path('api/help-threads/', views.list_help_threads, name='api-help-threads'),
+    path('api/help-search/', views.search_messages_and_logs, name='api-help-search'),
     path('api/help-thread/', views.get_help_thread, name='api-help-thread'),
     path('api/help-thread/mark-read/', views.mark_help_thread_read, name='api-help-thread-mark-read'),
     path('api/help-thread/clear/', views.clear_help_thread, name='api-help-thread-clear'),
     path('api/help-thread/messages/', views.post_help_message, name='api-help-message'),
     path('api/help-thread/messages/<int:message_id>/', views.delete_help_message, name='api-help-message-delete'),
     path('api/issue-bulk-create/', views.IssueRecordViewSet.as_view({'post': 'create'}), name='api-issue-bulk-create'),
+    path('api/issue-cohort/', views.issue_cohort, name='api-issue-cohort'),
+    path('api/issue-sync/', views.sync_issue_queue, name='api-issue-sync'),
+    path('api/distribution-session/', views.distribution_session, name='api-distribution-session'),
+    path('api/pending-matrix/', views.pending_matrix, name='api-pending-matrix'),
+    path('api/pending-matrix/export/', views.pending_matrix_export, name='api-pending-matrix-export'),
     path('api/student-records/<str:usn>/', views.get_student_records, name='api-student-records'),
     path('api/dashboard-summary/', views.get_dashboard_data, name='api-dashboard-summary'),
     path('api/generate-pending-reports/', views.generate_pending_reports_view, name='api-generate-pending-reports'),
@@ -47,10 +54,16 @@ urlpatterns = [
     path('api/purge-students/', views.purge_student_data, name='api-purge-students'),
     # Dynamic requirements endpoints
     path('api/backfill-requirements/', views.backfill_requirements, name='api-backfill-requirements'),
+    path('api/promote-cohorts/', views.promote_cohorts, name='api-promote-cohorts'),
+    path('api/archive-academic-years/', views.archive_academic_years, name='api-archive-academic-years'),
     path('api/requirements/', views.get_requirements, name='api-get-requirements'),
+    path('api/sync/<str:table>/', views.sync_table, name='api-sync-table'),
+    path('api/cache-stats/', views.reference_cache_stats, name='api-cache-stats'),
+    path('api/metrics', views.metrics_view, name='api-metrics'),
     path('api/requirements/update/', views.update_requirements, name='api-update-requirements'),
     # Auth endpoints removed for no-auth mode
     path('api/students/bulk_upload/', views.bulk_upload_api_view, name='api-bulk-upload'), 
+    path('api/students/bulk_upload/preview/', views.bulk_upload_preview, name='api-bulk-upload-preview'),
     
     # REST Framework ViewSet URLs (General CRUD paths)
     path('api/', include(router.urls)),
@@ -0,0 +1,131 @@
+# core/versioning.py
+"""Per-table version counters and ETag / conditional GET helpers.
+
+Counters live in ``TableVersion`` and are bumped by signals in core/signals.py
+on every save/delete of a versioned model. Code paths that bypass signals
+(bulk_create, bulk_update, queryset.update/delete) must call
+``bump_table_version`` themselves. A conditional request only reads the small
+version table, so a 304 never touches the main tables.
+"""
+import hashlib
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import TableVersion
+
+
+def _table(model):
+    return model._meta.db_table
+
+
+def bump_versions(*tables):
+    """Bump the ``TableVersion`` counters named ``tables`` (created at 1 on first use)."""
+    tables = list(dict.fromkeys(tables))
+    now = timezone.now()
+    updated = TableVersion.objects.filter(table__in=tables).update(version=F('version') + 1, updated_at=now)
+    if updated == len(tables):
+        return
+    existing = set(TableVersion.objects.filter(table__in=tables).values_list('table', flat=True))
+    for table in tables:
+        if table in existing:
+            continue
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(table=table, version=1)
+        except IntegrityError:
+            TableVersion.objects.filter(table=table).update(version=F('version') + 1, updated_at=now)
+
+
+def bump_table_version(*models, reference=True):
+    """Bump the version of each model's table.
+
+    With ``reference`` (the default) the reference-cache namespaces built from
+    ``models`` are dropped too (core/caching.py), so bulk writes cannot leave
+    the cache behind; stock-only writes pass False to keep the catalog warm.
+    """
+    bump_versions(*(_table(model) for model in models))
+    if reference:
+        from . import caching  # caching imports this module
+        caching.invalidate(*models)
+
+
+def table_versions(*models):
+    tables = [_table(model) for model in models]
+    versions = dict(TableVersion.objects.filter(table__in=tables).values_list('table', 'version'))
+    return {table: versions.get(table, 0) for table in tables}
+
+
+def version_stamps(*tables):
+    """``{table: 'version.updated_at'}`` for counters named ``tables``; '0' when never bumped.
+
+    The timestamp keeps a stamp unique even when a bump is rolled back and the
+    same version number is reached again later.
+    """
+    rows = TableVersion.objects.filter(table__in=tables).values_list('table', 'version', 'updated_at')
+    stamps = {table: f"{version}.{int(updated_at.timestamp() * 1000000)}" for table, version, updated_at in rows}
+    return {table: stamps.get(table, '0') for table in tables}
+
+
+def compute_etag(request, models):
+    versions = table_versions(*models)
+    query = '&'.join(sorted(f"{key}={value}" for key, value in request.GET.items()))
+    accept = request.META.get('HTTP_ACCEPT', '')
+    raw = '|'.join([request.path, query, accept] + [f"{table}:{version}" for table, version in versions.items()])
+    return 'W/"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if not header:
+        return False
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def _conditional(request, models, produce):
+    etag = compute_etag(request, models)
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = produce()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def conditional_on(*models):
+    """Decorator for GET api_view functions whose output depends only on ``models``."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+            return _conditional(request, models, lambda: view_func(request, *args, **kwargs))
+        return _wrapped
+    return decorator
+
+
+class ConditionalGetMixin:
+    """ETag / If-None-Match for viewset list and retrieve, keyed on ``etag_models`` versions."""
+    etag_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return _conditional(request, self.etag_models, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return _conditional(request, self.etag_models, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
@@ -1,48 +1,74 @@
 # core/views.py - FINALIZED and CORRECTED (Verified)
 
 from functools import wraps
+import hmac
 import json
 from urllib.parse import urlparse, parse_qs
 from rest_framework import viewsets, status, mixins
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.settings import api_settings
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponseNotFound, FileResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotFound, FileResponse, StreamingHttpResponse
 import mimetypes
 from django.urls import reverse
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction, models
-from django.db.utils import OperationalError
-from django.db.models import Sum, Q, Count, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.db.utils import IntegrityError, OperationalError
+from django.db.models import Sum, Q, Count, OuterRef, Subquery, Prefetch
+from django.db.models.functions import Upper
 from .models import (
     User, Department, Student, Item, IssueRecord, PendingReport, ActivityLog,
     Enrollment, DepartmentItemRequirement, HelpThread, HelpMessage, Notification,
-    InventoryOrder, InventoryReceipt, StockLogEntry
+    InventoryOrder, InventoryReceipt, StockLogEntry, PendingItem, ArchivedActivityLog
 )
 from .serializers import (
     UserSerializer, DepartmentSerializer, StudentSerializer,
     ItemSerializer, IssueRecordSerializer, PendingReportSerializer, ActivityLogSerializer,
-    EnrollmentSerializer, DepartmentItemRequirementSerializer, HelpThreadSerializer,
+    EnrollmentSerializer, HelpThreadSerializer,
     HelpMessageSerializer, NotificationSerializer, InventoryOrderSerializer,
-    InventoryReceiptSerializer, StockLogEntrySerializer
+    InventoryReceiptSerializer, StockLogEntrySerializer, PendingItemSerializer, unknown_fields_error,
 )
+from .renderers import ColumnarJSONRenderer, COLUMNAR_MEDIA_TYPE, columnar_from_dicts, iter_columnar
+from .exports import EXPORT_CHUNK_SIZE, EXPORT_FILE_TYPES, export_response
+from .versioning import ConditionalGetMixin, bump_table_version, conditional_on
+from . import activity, idempotency
+from .caching import cache_stats, cohort_roster, department_requirements, resolve_department_id, resolve_item
+from .metrics import reference_cache_lines, render_prometheus
+from .pending import LEGACY_DEPARTMENT_FIELDS, apply_issue, pending_for_department, refresh as refresh_pending
+from .pending_matrix import build as build_pending_matrix
+from .upload_preview import SAMPLE_SIZE as UPLOAD_PREVIEW_SAMPLE, preview as preview_upload
+from .promotion import PromotionError, promote
+from .purge import PurgeError, purge as run_purge
+from .archive import (
+    ArchiveError, archive as archive_years, is_archived as is_archived_year, manifest as archive_manifest,
+    model_for as archive_model_for, models_for as archive_models_for,
+)
+from .backfill import (
+    backfill_enrollments as run_backfill_enrollments, backfill_requirements as run_backfill_requirements,
+    normalize_academic_year,
+)
+from .sync import SYNC_PAGE_SIZE, SYNC_TABLES, changes_since, snapshot
+from .search import DEFAULT_SEARCH_LIMIT, search_students, search_help_messages, search_activity_logs
 
-# --- NEW: Helper mapping (Must match your Item model codes and Department model fields) ---
-ITEM_FIELD_MAP = {
-    '2PN': 'two_hundred_notebook',
-    '2PR': 'two_hundred_record',
-    '2PO': 'two_hundred_observation',
-    '1PN': 'one_hundred_notebook',
-    '1PR': 'one_hundred_record',
-    '1PO': 'one_hundred_observation',
-}
+# --- Legacy item codes -> Department allotment columns (single definition in core/pending.py) ---
+ITEM_FIELD_MAP = LEGACY_DEPARTMENT_FIELDS
 # -----------------------------------------------------------------------------------------
 from time import sleep
 
 from .constants import DEFAULT_SUPER_ADMIN_USERNAME
 DB_LOCK_MAX_RETRIES = 3
 DB_LOCK_RETRY_DELAY = 0.15
+# Rows per bulk_create / bulk_update batch when regenerating pending reports
+PENDING_BATCH_SIZE = 1000
+# Rows per bulk_create batch when issuing to a whole cohort
+COHORT_ISSUE_BATCH_SIZE = 1000
 
 
 def _is_super_admin(user):
@@ -462,6 +488,8 @@ def list_help_threads(request):
         threads_qs = threads_qs.exclude(user=request.user)
     threads_qs = threads_qs.annotate(
         last_message_at=Subquery(latest_message_qs.values('created_at')[:1]),
+        last_message_content=Subquery(latest_message_qs.values('content')[:1]),
+        last_attachment_type=Subquery(latest_message_qs.values('attachment_type')[:1]),
         unread_count=Count(
             'messages',
             filter=Q(messages__is_admin_read=False, messages__is_admin_deleted=False) & ~Q(messages__sender=request.user)
@@ -473,27 +501,72 @@ def list_help_threads(request):
             Q(user__email__icontains=search)
         )
 
+    # Latest message and unread count come from the annotations above (no per-thread queries)
     threads_data = []
     for thread in threads_qs:
-        visible_messages = thread.messages.filter(is_admin_deleted=False)
-        last_message = visible_messages.order_by('-created_at').first()
-        unread_count = visible_messages.exclude(sender=request.user).filter(is_admin_read=False).count()
         threads_data.append({
             'thread_id': thread.id,
             'user_id': thread.user.id,
             'user_username': thread.user.username,
             'user_role': thread.user.role,
             'user_status': thread.user.approval_status,
-            'last_message': last_message.content if last_message and last_message.content else '',
-            'last_attachment_type': last_message.attachment_type if last_message else None,
-            'last_message_at': last_message.created_at if last_message else None,
-            'unread_count': unread_count,
+            'last_message': thread.last_message_content or '',
+            'last_attachment_type': thread.last_attachment_type,
+            'last_message_at': thread.last_message_at,
+            'unread_count': thread.unread_count,
             'updated_at': thread.updated_at,
         })
 
     return Response({'threads': threads_data}, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_messages_and_logs(request):
+    """Full-text search over help-center messages (scope=help) or the activity log (scope=activity).
+
+    Supports date_from / date_to (YYYY-MM-DD), limit, and cursor paging via next_cursor.
+    """
+    auth_error = _ensure_api_auth(request)
+    if auth_error:
+        return auth_error
+
+    admin_error = _ensure_admin(request)
+    if admin_error:
+        return admin_error
+
+    query = (request.GET.get('q') or '').strip()
+    scope = (request.GET.get('scope') or 'help').strip().lower()
+    if scope not in ('help', 'activity'):
+        return Response({"message": "scope must be 'help' or 'activity'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    date_from_raw = (request.GET.get('date_from') or '').strip()
+    date_to_raw = (request.GET.get('date_to') or '').strip()
+    try:
+        date_from = parse_date(date_from_raw) if date_from_raw else None
+        date_to = parse_date(date_to_raw) if date_to_raw else None
+    except ValueError:
+        # Well formed but not a real date, e.g. 2024-13-45
+        date_from = date_to = None
+    if (date_from_raw and not date_from) or (date_to_raw and not date_to):
+        return Response({"message": "Dates must use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        cursor = int(request.GET.get('cursor')) if request.GET.get('cursor') else None
+        limit = int(request.GET.get('limit') or DEFAULT_SEARCH_LIMIT)
+    except (TypeError, ValueError):
+        return Response({"message": "cursor and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+    search = search_help_messages if scope == 'help' else search_activity_logs
+    results, next_cursor = search(query, date_from=date_from, date_to=date_to, cursor=cursor, limit=limit)
+    return Response({
+        'query': query,
+        'scope': scope,
+        'results': results,
+        'next_cursor': next_cursor,
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_notification_read(request, notification_id):
@@ -749,7 +822,7 @@ def purge_orphan_help_notifications(request):
     valid_user_ids = set(HelpThread.objects.values_list('user_id', flat=True))
 
     removable_ids = []
-    for notification in base_qs.only('id', 'link'):
+    for notification in base_qs.only('id', 'link', 'notification_type', 'recipient_id'):
         link = notification.link or ''
         try:
             parsed = urlparse(link)
@@ -983,37 +1056,14 @@ def bulk_upload_api_view(request):
         key_pair = (code_u, course_u)
         depts_by_cc_course.setdefault(key_pair, []).append(d)
 
-    # 3. Process each student record
-    def parse_int(val):
-        if val is None:
-            return None
-        try:
-            s = str(val).strip()
-            if not s:
-                return None
-            return int(float(s))
-        except (ValueError, TypeError):
-            return None
-
-    for data in student_data_list:
-        usn = str(data.get('usn', '')).strip().upper()
-        name = str(data.get('name', '')).strip()
-        course_code = str(data.get('course_code', '')).strip().upper()
-        course = str(data.get('course', '')).strip().upper()
-        year = normalize_year(str(data.get('year', '')).strip())
-        academic_year = normalize_ay(str(data.get('academic_year', '')).strip())
-        program_type = str(data.get('program_type', '')).strip()
-        intake_val = parse_int(data.get('intake'))
-        existing_val = parse_int(data.get('existing'))
+    # 2. Resolve each (code, course, academic year, year) once; rows of the same cohort reuse it
+    resolved_depts = {}
 
-        # Allow missing 'year' (it's optional on the model)
-        if not usn or not name or not course_code or not course:
-            continue
-
-        # Resolve department with layered strategy
-        dept = None
+    def resolve_dept(course_code, course, academic_year, year, program_type, intake_val, existing_val):
         ay_u = academic_year.upper()
         key_full = (course_code, course, ay_u, year)
+        if key_full in resolved_depts:
+            return resolved_depts[key_full]
         # 1) Full exact match including year
         dept = dept_exact_full.get(key_full)
         if not dept:
@@ -1033,31 +1083,23 @@ def bulk_upload_api_view(request):
                         first = 0
                     return first
                 candidates_sorted = sorted(candidates, key=ay_sort_key, reverse=True)
-                # Prefer exact AY+year match within candidates
+                # Prefer exact AY+year match within candidates; if academic year provided, do not reuse a different AY
                 dept = next((g for g in candidates_sorted if normalize_ay(g.academic_year) == ay_u and normalize_year(str(g.year)) == year), None)
-                # If academic year provided, do not reuse different AY
-                if not dept and ay_u:
-                    dept = None
                 if not dept and not ay_u:
                     dept = next((g for g in candidates_sorted if normalize_year(str(g.year)) == year), None)
                 if not dept and not ay_u and candidates_sorted:
                     dept = candidates_sorted[0]
-            else:
-                # No candidates for this (code, course). Do not reuse mismatched academic years
-                dept = None
 
         # 4) As a last resort, create a Department ONLY if none exists with same (code, ay, year)
         if not dept:
             # Double-check DB to avoid duplicates differing by course casing
-            existing = Department.objects.filter(
+            dept = Department.objects.filter(
                 course_code__iexact=course_code,
                 course__iexact=course,
                 academic_year__iexact=academic_year,
                 year__iexact=year
             ).order_by('id').first()
-            if existing:
-                dept = existing
-            else:
+            if not dept:
                 dept = Department.objects.create(
                     course_code=course_code,
                     course=course,
@@ -1067,53 +1109,91 @@ def bulk_upload_api_view(request):
                     intake=intake_val,
                     existing=existing_val
                 )
-                # Update in-memory indexes so subsequent rows reuse this department
-                code_u = course_code
-                course_u = course
-                ay_u = academic_year
-                year_s = year
-                key_full = (code_u, course_u, ay_u, year_s)
-                dept_exact_full[key_full] = dept
-                key_cc_ay = (code_u, course_u, ay_u)
-                depts_by_cc_ay.setdefault(key_cc_ay, []).append(dept)
-                key_pair = (code_u, course_u)
-                depts_by_cc_course.setdefault(key_pair, []).append(dept)
-
-        if dept:
-            dept_fields = {}
-            if program_type and (dept.program_type or '').strip() != program_type:
-                dept.program_type = program_type
-                dept_fields['program_type'] = program_type
-            if intake_val is not None and dept.intake != intake_val:
-                dept.intake = intake_val
-                dept_fields['intake'] = intake_val
-            if existing_val is not None and dept.existing != existing_val:
-                dept.existing = existing_val
-                dept_fields['existing'] = existing_val
-            if dept_fields:
-                dept.save(update_fields=list(dept_fields.keys()))
+                # Update in-memory indexes so subsequent cohorts reuse this department
+                dept_exact_full[(course_code, course, academic_year, year)] = dept
+                depts_by_cc_ay.setdefault((course_code, course, academic_year), []).append(dept)
+                depts_by_cc_course.setdefault((course_code, course), []).append(dept)
+        resolved_depts[key_full] = dept
+        return dept
+
+    def parse_int(val):
+        if val is None:
+            return None
+        try:
+            s = str(val).strip()
+            if not s:
+                return None
+            return int(float(s))
+        except (ValueError, TypeError):
+            return None
+
+    def parse_row(data):
+        return {
+            'usn': str(data.get('usn', '')).strip().upper(),
+            'name': str(data.get('name', '')).strip(),
+            'course_code': str(data.get('course_code', '')).strip().upper(),
+            'course': str(data.get('course', '')).strip().upper(),
+            'year': normalize_year(str(data.get('year', '')).strip()),
+            'academic_year': normalize_ay(str(data.get('academic_year', '')).strip()),
+            'program_type': str(data.get('program_type', '')).strip(),
+            'intake': parse_int(data.get('intake')),
+            'existing': parse_int(data.get('existing')),
+        }
+
+    def row_dept(row):
+        dept = resolve_dept(row['course_code'], row['course'], row['academic_year'], row['year'],
+                            row['program_type'], row['intake'], row['existing'])
+        dept_fields = []
+        if row['program_type'] and (dept.program_type or '').strip() != row['program_type']:
+            dept.program_type = row['program_type']
+            dept_fields.append('program_type')
+        if row['intake'] is not None and dept.intake != row['intake']:
+            dept.intake = row['intake']
+            dept_fields.append('intake')
+        if row['existing'] is not None and dept.existing != row['existing']:
+            dept.existing = row['existing']
+            dept_fields.append('existing')
+        if dept_fields:
+            dept.save(update_fields=dept_fields)
+        return dept
+
+    rows = [(parse_row(data), data) for data in student_data_list]
+    usns = {row['usn'] for row, _ in rows if row['usn']}
+
+    # 3. Process each student record; existing students come from one lookup and are saved in bulk
+    existing_students = {student.usn: student for student in Student.objects.filter(usn__in=usns)}
+    changed_students = {}
+    for row, data in rows:
+        usn = row['usn']
+        # Allow missing 'year' (it's optional on the model)
+        if not usn or not row['name'] or not row['course_code'] or not row['course']:
+            continue
 
         student_data = {
             'usn': usn,
-            'name': name,
-            'department': dept,
-            'year': year,
+            'name': row['name'],
+            'department': row_dept(row),
+            'year': row['year'],
             'email': str(data.get('email', '')).strip(),
             'phone': str(data.get('phone', '')).strip(),
         }
 
         # Update existing student if found; otherwise prepare for creation
-        student = Student.objects.filter(usn=usn).first()
+        student = existing_students.get(usn)
         if student:
             for key, value in student_data.items():
                 setattr(student, key, value)
-            student.save()
+            changed_students[usn] = student
             updated_count += 1
         else:
             if usn not in seen_new_usns:
                 new_students.append(Student(**student_data))
                 seen_new_usns.add(usn)
 
+    if changed_students:
+        Student.objects.bulk_update(
+            list(changed_students.values()), ['name', 'department', 'year', 'email', 'phone'], batch_size=500,
+        )
     if new_students:
         # Extra safety: skip any remaining conflicts at DB level
         before = Student.objects.count()
@@ -1121,97 +1201,36 @@ def bulk_upload_api_view(request):
         after = Student.objects.count()
         created_count += max(0, after - before)
 
-    # Ensure enrollments exist for all rows
-    created_enrollments = 0
-    updated_enrollments = 0
-    for data in student_data_list:
-        usn = str(data.get('usn', '')).strip().upper()
-        course_code = str(data.get('course_code', '')).strip().upper()
-        course = str(data.get('course', '')).strip().upper()
-        year = normalize_year(str(data.get('year', '')).strip())
-        academic_year = normalize_ay(str(data.get('academic_year', '')).strip())
-        program_type = str(data.get('program_type', '')).strip()
-        intake_val = parse_int(data.get('intake'))
-        existing_val = parse_int(data.get('existing'))
-
-        if not usn or not course_code or not course:
-            continue
-
-        # Resolve student and department again (using same layered logic as above)
-        student = Student.objects.filter(usn=usn).first()
-        if not student:
+    # Ensure enrollments exist for all rows: one lookup of what exists, one bulk insert of the rest
+    students_by_usn = {student.usn: student for student in Student.objects.filter(usn__in=usns)}
+    wanted_enrollments = {}
+    for row, _ in rows:
+        student = students_by_usn.get(row['usn'])
+        if not student or not row['course_code'] or not row['course']:
             continue
+        dept = row_dept(row)
+        key = (student.id, dept.id, normalize_ay(row['academic_year'] or (dept.academic_year or '')), normalize_year(row['year'] or ''))
+        wanted_enrollments.setdefault(key, None)
+    existing_enrollments = set(
+        Enrollment.objects.filter(student_id__in=[student.id for student in students_by_usn.values()])
+        .values_list('student_id', 'department_id', 'academic_year', 'year')
+    )
+    new_enrollments = [
+        Enrollment(student_id=student_id, department_id=dept_id, academic_year=ay, year=year)
+        for student_id, dept_id, ay, year in wanted_enrollments
+        if (student_id, dept_id, ay, year) not in existing_enrollments
+    ]
+    Enrollment.objects.bulk_create(new_enrollments, batch_size=500)
+    created_enrollments = len(new_enrollments)
 
-        ay_u = academic_year.upper()
-        key_full = (course_code, course, ay_u, year)
-        dept = None
-        dept = dept_exact_full.get(key_full)
-        if not dept:
-            group = depts_by_cc_ay.get((course_code, course, ay_u), [])
-            if group:
-                dept = next((g for g in group if str(g.year).strip() == year), None)
-        if not dept:
-            candidates = depts_by_cc_course.get((course_code, course), [])
-            if candidates:
-                def ay_sort_key(d):
-                    ay = normalize_ay(d.academic_year)
-                    try:
-                        first = int(ay.split('-')[0]) if '-' in ay else int(ay) if ay.isdigit() else 0
-                    except Exception:
-                        first = 0
-                    return first
-                candidates_sorted = sorted(candidates, key=ay_sort_key, reverse=True)
-                dept = next((g for g in candidates_sorted if normalize_ay(g.academic_year) == ay_u and normalize_year(str(g.year)) == year), None)
-                if not dept and not ay_u:
-                    dept = next((g for g in candidates_sorted if normalize_year(str(g.year)) == year), None)
-        if not dept:
-            dept = Department.objects.filter(
-                course_code__iexact=course_code,
-                course__iexact=course,
-                academic_year__iexact=academic_year,
-                year__iexact=year
-            ).order_by('id').first()
-        if not dept:
-            dept = Department.objects.create(
-                course_code=course_code,
-                course=course,
-                program_type=program_type or None,
-                academic_year=academic_year,
-                year=year or None,
-                intake=intake_val,
-                existing=existing_val
-            )
-        else:
-            dept_fields = {}
-            if program_type and (dept.program_type or '').strip() != program_type:
-                dept.program_type = program_type
-                dept_fields['program_type'] = program_type
-            if intake_val is not None and dept.intake != intake_val:
-                dept.intake = intake_val
-                dept_fields['intake'] = intake_val
-            if existing_val is not None and dept.existing != existing_val:
-                dept.existing = existing_val
-                dept_fields['existing'] = existing_val
-            if dept_fields:
-                dept.save(update_fields=list(dept_fields.keys()))
-
-        # Upsert Enrollment
-        enrollment, created = Enrollment.objects.get_or_create(
-            student=student,
-            department=dept,
-            academic_year=normalize_ay(academic_year or (dept.academic_year or '')),
-            year=normalize_year(year or '')
-        )
-        if created:
-            created_enrollments += 1
-    
     # Log the bulk upload activity
-    ActivityLog.objects.create(
+    activity.log(
         action='bulk_upload',
         description=(
             f'Bulk upload completed. Students - Created: {created_count}, Updated: {updated_count}; '
             f'Enrollments - Created: {created_enrollments}; Received rows: {len(student_data_list)}'
-        )
+        ),
+        actor=activity.actor(request)
     )
 
     return Response({
@@ -1223,58 +1242,43 @@ def bulk_upload_api_view(request):
     }, status=status.HTTP_200_OK)
 # -----------------------------------------------------------------------------
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def bulk_upload_preview(request):
+    """What ``bulk_upload_api_view`` would do with the same rows, without writing anything.
+
+    Returns counts of students created / updated / unchanged, enrollments to
+    create, unknown departments, duplicate USNs and skipped rows, with a sample
+    of each (``?sample=``, default 20).
+    """
+    rows = request.data
+    if not isinstance(rows, list) or not rows:
+        return Response({"error": "Invalid or empty data list provided."}, status=status.HTTP_400_BAD_REQUEST)
+    if not all(isinstance(row, dict) for row in rows):
+        return Response({"error": "Each row must be an object of student fields."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        sample = max(0, min(int(request.query_params.get('sample', UPLOAD_PREVIEW_SAMPLE)), 500))
+    except (TypeError, ValueError):
+        return Response({'error': 'sample must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(preview_upload(rows, sample=sample), status=status.HTTP_200_OK)
+# -----------------------------------------------------------------------------
+
 # --- Dynamic Requirements: Backfill from legacy Department fields ---
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def backfill_requirements(request):
     """Create Items for legacy codes if missing and populate DepartmentItemRequirement.
-    Non-destructive: repeats safely.
+    Non-destructive: repeats safely. Set-based (see core/backfill.py); ``dry_run`` only counts.
     """
-    # Ensure base items exist
-    legacy_items = [
-        ('2PN', '200 Pages Note Book'),
-        ('2PR', '200 Pages Record'),
-        ('2PO', '200 Pages Observation'),
-        ('1PN', '100 Pages Note Book'),
-        ('1PR', '100 Pages Record'),
-        ('1PO', '100 Pages Observation'),
-    ]
-    created_items = 0
-    for code, name in legacy_items:
-        obj, created = Item.objects.get_or_create(item_code=code, defaults={'name': name, 'quantity': 0})
-        if created:
-            created_items += 1
-
-    # Backfill requirements per department
-    created_reqs = 0
-    updated_reqs = 0
-    for dept in Department.objects.all():
-        for code, field in ITEM_FIELD_MAP.items():
-            req_qty = getattr(dept, field, 0) or 0
-            try:
-                item = Item.objects.get(item_code=code)
-            except Item.DoesNotExist:
-                continue
-            req, created = DepartmentItemRequirement.objects.get_or_create(department=dept, item=item, defaults={'required_qty': req_qty})
-            if created:
-                created_reqs += 1
-            else:
-                # Keep existing value if already set; update only when different and legacy has value
-                if req_qty is not None and req.required_qty != req_qty:
-                    req.required_qty = req_qty
-                    req.save()
-                    updated_reqs += 1
-
-    return Response({
-        'items_created': created_items,
-        'requirements_created': created_reqs,
-        'requirements_updated': updated_reqs
-    }, status=status.HTTP_200_OK)
+    dry_run = str(request.data.get('dry_run', '')).strip().lower() in ('1', 'true', 'yes')
+    counts = run_backfill_requirements(dry_run=dry_run)
+    return Response(counts, status=status.HTTP_200_OK)
 
 
 # --- Dynamic Requirements: Retrieve for a cohort ---
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_on(Department, DepartmentItemRequirement, Item)
 def get_requirements(request):
     code = (request.GET.get('course_code') or '').strip()
     course = (request.GET.get('course') or '').strip()
@@ -1284,18 +1288,11 @@ def get_requirements(request):
     if not (code and course and ay and year):
         return Response({'error': 'Provide course_code, course, academic_year, and year.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    dept = Department.objects.filter(
-        course_code__iexact=code,
-        course__iexact=course,
-        academic_year__iexact=ay,
-        year__iexact=year
-    ).first()
-    if not dept:
+    dept_id = resolve_department_id(code, course, ay, year)
+    if not dept_id:
         return Response({'department_id': None, 'requirements': []}, status=status.HTTP_200_OK)
 
-    qs = DepartmentItemRequirement.objects.filter(department=dept).select_related('item').order_by('item__item_code')
-    data = DepartmentItemRequirementSerializer(qs, many=True).data
-    return Response({'department_id': dept.id, 'requirements': data}, status=status.HTTP_200_OK)
+    return Response({'department_id': dept_id, 'requirements': department_requirements(dept_id)}, status=status.HTTP_200_OK)
 
 
 # --- Dynamic Requirements: Bulk update for a cohort ---
@@ -1329,7 +1326,8 @@ def update_requirements(request):
         if item_id:
             item = Item.objects.filter(id=item_id).first()
         if not item and code:
-            item = Item.objects.filter(item_code__iexact=code).first()
+            cached = resolve_item(code)
+            item = Item.objects.filter(id=cached['id']).first() if cached else None
         if not item:
             # Optionally auto-create when code+name provided
             name = (r.get('item_name') or code or '').strip()
@@ -1343,9 +1341,65 @@ def update_requirements(request):
         )
         upserted += 1
 
+    if upserted:
+        refresh_pending(department_id=dept.id)
     return Response({'upserted': upserted}, status=status.HTTP_200_OK)
 
 
+# --- Reference cache hit/miss counters (this worker process) ---
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def reference_cache_stats(request):
+    auth_error = _ensure_api_auth(request)
+    if auth_error:
+        return auth_error
+
+    admin_error = _ensure_admin(request)
+    if admin_error:
+        return admin_error
+
+    return Response(cache_stats(), status=status.HTTP_200_OK)
+
+
+# --- Prometheus scrape endpoint (request profiling middleware + reference cache) ---
+def _metrics_token_ok(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    scheme, _, supplied = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(supplied.strip(), token)
+
+
+def metrics_view(request):
+    """Admins (session) or a scraper sending ``Authorization: Bearer <METRICS_TOKEN>``."""
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        return HttpResponseNotFound('Metrics are disabled.')
+    if not _metrics_token_ok(request):
+        if not request.user.is_authenticated:
+            response = HttpResponse('Authentication required.', status=status.HTTP_401_UNAUTHORIZED)
+            response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+            return response
+        if request.user.role != User.Role.ADMIN:
+            return HttpResponseForbidden('Admin access required.')
+    body = render_prometheus(extra_lines=reference_cache_lines(cache_stats()))
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- Delta sync for client-side table caches ---
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def sync_table(request, table):
+    """GET /api/sync/<table>/?since=<version>: full snapshot when since is 0, else changes after it."""
+    if table not in SYNC_TABLES:
+        return Response({'error': f"Unknown table. Use one of: {', '.join(SYNC_TABLES)}"}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        since = int(request.GET.get('since') or 0)
+        limit = int(request.GET.get('limit') or SYNC_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return Response({'error': 'since and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+    if since <= 0:
+        return Response(snapshot(table), status=status.HTTP_200_OK)
+    return Response(changes_since(table, since, max(1, min(limit, SYNC_PAGE_SIZE))), status=status.HTTP_200_OK)
+
+
 # --- API FUNCTION: To fetch all student records for Issue page ---
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -1378,10 +1432,11 @@ def get_student_records(request, usn):
     ay = norm_ay(request.GET.get('academic_year') or '')
     year = (request.GET.get('year') or '').strip()
 
+    enrollment_model, issue_model = archive_models_for(ay, Enrollment, IssueRecord)
     picked_department = None
     if code or course or ay or year:
         # Search student's enrollments for a match
-        enrollments = Enrollment.objects.select_related('department').filter(student=student)
+        enrollments = enrollment_model.objects.select_related('department').filter(student=student)
         for e in enrollments:
             d = e.department
             if not d:
@@ -1400,7 +1455,7 @@ def get_student_records(request, usn):
     department = picked_department or base_department
 
     # 1. Get Issued Records (Aggregated by item_code) scoped to cohort when provided
-    issued_qs = IssueRecord.objects.filter(student=student)
+    issued_qs = issue_model.objects.filter(student=student)
     if ay:
         issued_qs = issued_qs.filter(academic_year__iexact=ay)
     if year:
@@ -1414,18 +1469,274 @@ def get_student_records(request, usn):
     detailed_issued_qs = issued_qs.order_by('date_issued')
     detailed_issued_data = IssueRecordSerializer(detailed_issued_qs, many=True).data
 
-    # 3. Calculate Pending Quantities using selected department
-    pending_map = {}
-    for item_code, dept_field in ITEM_FIELD_MAP.items():
-        required_qty = getattr(department, dept_field, 0) or 0
-        issued_qty = issued_map.get(item_code, 0) or 0
-        pending_qty = max(0, required_qty - issued_qty)
-        pending_map[item_code] = pending_qty
+    # 3. Calculate Pending Quantities using selected department (every required item, not only legacy codes)
+    pending_map = pending_for_department(department, issued_map)
 
     return Response({
         "issued": detailed_issued_data,
         "pending": pending_map
     }, status=status.HTTP_200_OK)
+
+
+def _cohort_params(source):
+    """(course_code, course, academic_year, year) from request data or query params, AY dashes normalized."""
+    import re
+    return (
+        (source.get('course_code') or '').strip(),
+        (source.get('course') or '').strip(),
+        re.sub(r"[\u2010-\u2015\u2212]", '-', (source.get('academic_year') or '').strip()),
+        str(source.get('year') or '').strip(),
+    )
+
+
+class _StockChanged(Exception):
+    """Stock fell below the batch total between the check and the decrement."""
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def issue_cohort(request):
+    """Issue a requirement set to a whole cohort in one transaction.
+
+    Body: {"course_code", "course", "academic_year", "year", "usns"?: [...],
+    "items"?: [{"item_code", "quantity"}], "remarks"?}. Without ``items`` the
+    cohort's department requirements are used. Each student gets what is still
+    outstanding for the cohort (requested quantity minus what was already
+    issued for that academic year and year); students with nothing outstanding
+    are skipped. Stock for the whole batch is checked before anything is
+    written and each item is decremented once by the batch total.
+    """
+    data = request.data or {}
+    code, course, ay, year = _cohort_params(data)
+    if not (code and course and ay and year):
+        return Response({'error': 'Provide course_code, course, academic_year, and year.'}, status=status.HTTP_400_BAD_REQUEST)
+    archived = _archived_year_response(ay)
+    if archived:
+        return archived
+
+    usns = data.get('usns')
+    requested_usns = set()
+    if usns is not None and (not isinstance(usns, list) or not usns):
+        return Response({'error': 'usns must be a non-empty list when given.'}, status=status.HTTP_400_BAD_REQUEST)
+    remarks = data.get('remarks')
+    if isinstance(remarks, str):
+        remarks = remarks[:255]
+
+    dept_id = resolve_department_id(code, course, ay, year)
+    if not dept_id:
+        return Response({'error': 'No department found for this cohort.'}, status=status.HTTP_404_NOT_FOUND)
+
+    # Per-student quantities: item_code -> {'id', 'item_code', 'quantity'}
+    wanted = {}
+    if data.get('items') is not None:
+        if not isinstance(data.get('items'), list):
+            return Response({'error': 'items must be a list.'}, status=status.HTTP_400_BAD_REQUEST)
+        for row in data['items']:
+            try:
+                quantity = int(row.get('quantity', 0) or 0)
+            except (AttributeError, TypeError, ValueError):
+                return Response({'error': 'Each item needs an item_code and an integer quantity.'}, status=status.HTTP_400_BAD_REQUEST)
+            cached_item = resolve_item(row.get('item_code'))
+            if cached_item is None:
+                return Response({'error': f"Inventory item code {row.get('item_code')} not found."}, status=status.HTTP_404_NOT_FOUND)
+            if quantity > 0:
+                wanted[cached_item['item_code']] = {**cached_item, 'quantity': quantity}
+    else:
+        for req in department_requirements(dept_id):
+            if req['required_qty'] > 0:
+                cached_item = resolve_item(req['item_code'])
+                if cached_item is None:
+                    return Response({'error': f"Inventory item code {req['item_code']} not found."}, status=status.HTTP_404_NOT_FOUND)
+                wanted[cached_item['item_code']] = {**cached_item, 'quantity': req['required_qty']}
+    if not wanted:
+        return Response({'error': 'Nothing to issue: no item has a quantity above zero.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    enrolled = Enrollment.objects.filter(department_id=dept_id, academic_year__iexact=ay, year=year)
+    if usns is not None:
+        requested_usns = {str(usn).strip() for usn in usns if str(usn).strip()}
+        enrolled = enrolled.filter(student__usn__in=requested_usns)
+    try:
+        with transaction.atomic():
+            # Lock the items first: a concurrent issue for the same cohort waits here and then
+            # reads the records this one wrote, so nobody is issued the same set twice
+            stock = dict(
+                Item.objects.select_for_update().filter(id__in=[entry['id'] for entry in wanted.values()])
+                .order_by('id').values_list('id', 'quantity')
+            )
+            students = dict(enrolled.values_list('student_id', 'student__usn').distinct())
+            not_enrolled = sorted(requested_usns - set(students.values())) if usns is not None else []
+            if not students:
+                return Response({'error': 'No enrolled students matched.', 'not_enrolled': not_enrolled}, status=status.HTTP_404_NOT_FOUND)
+
+            # What each student already holds for this cohort, in one grouped query
+            already = {}
+            issued_rows = IssueRecord.objects.filter(
+                student_id__in=enrolled.values('student_id'), academic_year__iexact=ay, year=year,
+            ).values('student_id', 'item_code').annotate(total=Sum('qty_issued'))
+            for row in issued_rows:
+                key = (row['student_id'], row['item_code'].upper())
+                already[key] = already.get(key, 0) + (row['total'] or 0)
+
+            records = []
+            totals = {item_code: 0 for item_code in wanted}
+            skipped = []
+            for student_id, usn in sorted(students.items(), key=lambda pair: pair[1]):
+                outstanding = {
+                    item_code: max(0, entry['quantity'] - already.get((student_id, item_code.upper()), 0))
+                    for item_code, entry in wanted.items()
+                }
+                if not any(outstanding.values()):
+                    skipped.append(usn)
+                    continue
+                for item_code, quantity in outstanding.items():
+                    if quantity:
+                        totals[item_code] += quantity
+                        records.append(IssueRecord(
+                            student_id=student_id, item_code=item_code, qty_issued=quantity,
+                            status='Issued', remarks=remarks, academic_year=ay, year=year,
+                        ))
+
+            if not records:
+                return Response({
+                    'message': 'Every matched student already has their requirement.',
+                    'students_issued': 0, 'skipped': skipped, 'not_enrolled': not_enrolled, 'items': {},
+                }, status=status.HTTP_200_OK)
+
+            totals = {item_code: qty for item_code, qty in totals.items() if qty}
+            item_ids = {wanted[item_code]['id']: item_code for item_code in totals}
+            short = [
+                {'item_code': item_code, 'required': totals[item_code], 'available': stock.get(item_id, 0)}
+                for item_id, item_code in item_ids.items()
+                if stock.get(item_id, 0) < totals[item_code]
+            ]
+            if short:
+                return Response({'error': 'Insufficient stock for this batch.', 'details': short}, status=status.HTTP_400_BAD_REQUEST)
+
+            for item_id, item_code in item_ids.items():
+                # Conditional decrement: a concurrent issue that got in first makes this match no row
+                updated = Item.objects.filter(id=item_id, quantity__gte=totals[item_code]).update(
+                    quantity=models.F('quantity') - totals[item_code]
+                )
+                if not updated:
+                    raise _StockChanged(item_code)
+            IssueRecord.objects.bulk_create(records, batch_size=COHORT_ISSUE_BATCH_SIZE)
+            bump_table_version(Item, reference=False)  # stock only; the catalog stays valid
+            refresh_pending(dept_id, ay, year)
+    except _StockChanged as exc:
+        return Response({'error': f'Stock for {exc} changed during the batch; nothing was issued. Please retry.'}, status=status.HTTP_409_CONFLICT)
+    except OperationalError as exc:
+        return Response({'error': f'Database busy, nothing was issued: {exc}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    issued_students = len(students) - len(skipped)
+    activity.log(
+        action='books_issued',
+        description=f'Issued {sum(totals.values())} books to {issued_students} students of {code} {ay} year {year}',
+        actor=activity.actor(request), object_type='department', object_id=dept_id
+    )
+    return Response({
+        'message': f'Issued to {issued_students} students.',
+        'students_issued': issued_students,
+        'records_created': len(records),
+        'items': totals,
+        'skipped': skipped,
+        'not_enrolled': not_enrolled,
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def distribution_session(request):
+    """Everything the issue counter needs to serve one cohort locally.
+
+    Returns the roster, the requirement set, per-student issued totals and
+    current stock in a columnar shape: ``issued[item_code][i]`` is what
+    ``students.usn[i]`` already holds for this academic year and year. The
+    roster comes from the reference cache, keyed by the students/enrollments
+    change-log version so that any roster change yields a fresh entry; issued
+    totals and stock are one query each and always current.
+    """
+    code, course, ay, year = _cohort_params(request.GET)
+    if not (code and course and ay and year):
+        return Response({'error': 'Provide course_code, course, academic_year, and year.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    dept_id = resolve_department_id(code, course, ay, year)
+    if not dept_id:
+        return Response({'error': 'No department found for this cohort.'}, status=status.HTTP_404_NOT_FOUND)
+
+    roster = cohort_roster(dept_id, ay, year)
+    requirements = department_requirements(dept_id)
+    codes = [req['item_code'] for req in requirements]
+
+    position = {student_id: index for index, student_id in enumerate(roster['student_id'])}
+    issued = {item_code: [0] * len(position) for item_code in codes}
+    by_upper = {item_code.upper(): item_code for item_code in codes}
+    issued_rows = IssueRecord.objects.filter(
+        student_id__in=Enrollment.objects.filter(department_id=dept_id, academic_year__iexact=ay, year=year).values('student_id'),
+        academic_year__iexact=ay, year=year,
+    ).values('student_id', 'item_code').annotate(total=Sum('qty_issued')).values_list('student_id', 'item_code', 'total')
+    for student_id, item_code, total in issued_rows:
+        column = by_upper.get((item_code or '').upper())
+        if column is not None and student_id in position:
+            issued[column][position[student_id]] += total or 0
+
+    return Response({
+        'department_id': dept_id,
+        'course_code': code, 'course': course, 'academic_year': ay, 'year': year,
+        'roster_version': roster['version'],
+        'items': [
+            {'item_code': req['item_code'], 'name': req['item_name'], 'required_qty': req['required_qty']}
+            for req in requirements
+        ],
+        'students': {'usn': roster['usn'], 'name': roster['name']},
+        'issued': issued,
+        'stock': dict(Item.objects.filter(item_code__in=codes).values_list('item_code', 'quantity')),
+        'generated_at': timezone.now().isoformat(),
+    }, status=status.HTTP_200_OK)
+
+
+PENDING_MATRIX_VALUES = ('required', 'issued', 'pending')
+
+
+def _pending_matrix(params):
+    """(PendingMatrix, None) for the academic year in ``params``, or (None, error Response)."""
+    _, _, ay, year = _cohort_params(params)
+    if not ay:
+        return None, Response({'error': 'Provide academic_year.'}, status=status.HTTP_400_BAD_REQUEST)
+    matrix = build_pending_matrix(ay, course_code=(params.get('course_code') or '').strip(), year=year)
+    if str(params.get('outstanding', '')).lower() in ('1', 'true', 'yes'):
+        matrix = matrix.outstanding()
+    return matrix, None
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def pending_matrix(request):
+    """Students x items pending matrix for a whole academic year, in columns.
+
+    ``pending[item_code][i]`` is what ``students.usn[i]`` is still owed.
+    ``?values=required,issued`` adds those matrices too, ``?course_code=`` and
+    ``?year=`` narrow the roster, ``?outstanding=1`` drops students owed nothing.
+    """
+    matrix, error = _pending_matrix(request.query_params)
+    if error:
+        return error
+    wanted = {value.strip().lower() for value in (request.query_params.get('values') or '').split(',') if value.strip()}
+    include = [name for name in PENDING_MATRIX_VALUES if name in wanted or name == 'pending']
+    return Response({**matrix.columns(include), 'generated_at': timezone.now().isoformat()}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def pending_matrix_export(request):
+    """The pending matrix as CSV / XLSX: one row per student, one column per item."""
+    file_type = (request.query_params.get('file_type') or 'csv').strip().lower()
+    if file_type not in EXPORT_FILE_TYPES:
+        return Response({'error': f"file_type must be one of: {', '.join(EXPORT_FILE_TYPES)}"}, status=status.HTTP_400_BAD_REQUEST)
+    matrix, error = _pending_matrix(request.query_params)
+    if error:
+        return error
+    filename = f"pending_matrix_{matrix.academic_year}_{timezone.localtime():%Y-%m-%d_%H-%M-%S}"
+    return export_response(file_type, filename, matrix.export_headers(), matrix.export_rows(), sheet_title='Pending Matrix')
 # -----------------------------------------------------------------------------
 
 
@@ -1433,52 +1744,187 @@ def get_student_records(request, usn):
 # ViewSets (CRUD operations for models)
 #=============================================================
 
+COLUMNAR_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer]
+FLAT_STREAM_CHUNK_SIZE = 2000
+
+
+class FlatListMixin:
+    """List fast paths.
+
+    ``?flat=1`` builds rows straight from ``values()`` with FK ids instead of nested
+    serializers and honours ``?fields=`` (an unknown name is a 400, as in
+    ``SparseFieldsMixin``). ``flat_aliases`` maps output names to model fields. When
+    the columnar renderer is negotiated (``?format=columnar``) the list is streamed in
+    row chunks; flat + columnar never materialises the queryset. Lists of a model
+    without a default ordering come in pk order, whichever path serves them.
+    """
+    flat_fields = ()
+    flat_aliases = {}
+
+    def _flat_columns(self, request):
+        columns = list(self.flat_fields) + list(self.flat_aliases)
+        raw = request.query_params.get('fields') or ''
+        wanted = {name.strip() for name in raw.split(',') if name.strip()}
+        if wanted:
+            unknown = wanted - set(columns)
+            if unknown:
+                raise unknown_fields_error(unknown, columns)
+            columns = [name for name in columns if name in wanted]
+        return columns
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not getattr(self, 'detail', False) and not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        flat = (request.query_params.get('flat') or '').strip().lower() in ('1', 'true', 'yes')
+        accepted = getattr(request, 'accepted_renderer', None)
+        columnar = isinstance(accepted, ColumnarJSONRenderer)
+        if flat and self.flat_fields:
+            columns = self._flat_columns(request)
+            queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None)
+            aliases = {name: models.F(source) for name, source in self.flat_aliases.items() if name in columns}
+            if aliases:
+                queryset = queryset.annotate(**aliases)
+            if columnar:
+                rows = queryset.values_list(*columns).iterator(chunk_size=FLAT_STREAM_CHUNK_SIZE)
+                return StreamingHttpResponse(iter_columnar(columns, rows), content_type=COLUMNAR_MEDIA_TYPE)
+            return Response(list(queryset.values(*columns)))
+        if columnar:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = self.get_serializer(queryset, many=True).data
+            columns, rows = columnar_from_dicts(data)
+            return StreamingHttpResponse(iter_columnar(columns, rows), content_type=COLUMNAR_MEDIA_TYPE)
+        return super().list(request, *args, **kwargs)
+
+
+class QueryParamFilterMixin:
+    """Apply ``filter_params`` ({query param: ORM lookup}) to list, export and other collection views.
+
+    Values are checked against the field type when the filter is built; a bad
+    one (``?student=abc``, ``?date_from=soon``) is a 400. Detail routes look
+    their object up by pk alone.
+    """
+    filter_params = {}
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, 'detail', False):
+            return queryset
+        for param, lookup in self.filter_params.items():
+            value = (self.request.query_params.get(param) or '').strip()
+            if value:
+                try:
+                    queryset = queryset.filter(**{lookup: value})
+                except (TypeError, ValueError, DjangoValidationError):
+                    raise ParseError({'error': f"Invalid value for {param}: {value}"})
+        return queryset
+
+
+def _archived_year_response(academic_year):
+    """409 for a write into an archived academic year (see core/archive.py), else None."""
+    if academic_year and is_archived_year(academic_year):
+        return Response({'error': f"Academic year {academic_year} is archived and no longer accepts changes."},
+                        status=status.HTTP_409_CONFLICT)
+    return None
+
+
+class ArchivedYearMixin:
+    """Reads filtered to an archived ``?academic_year=`` come from its archive model; writes into one are refused."""
+
+    def update(self, request, *args, **kwargs):
+        academic_year = request.data.get('academic_year') if hasattr(request.data, 'get') else None
+        archived = _archived_year_response(str(academic_year or '').strip())
+        if archived:
+            return archived
+        return super().update(request, *args, **kwargs)
+
+    def get_queryset(self):
+        academic_year = (self.request.query_params.get('academic_year') or '').strip()
+        if self.request.method in SAFE_METHODS and academic_year:
+            model = archive_model_for(self.queryset.model, academic_year)
+            if model is not self.queryset.model:
+                return model.objects.all()
+        return super().get_queryset()
+
+
+class ExportMixin:
+    """``GET <list>/export/?file_type=csv|xlsx`` streamed from a chunked ``values_list`` iterator.
+
+    ``export_columns`` is a sequence of (header, lookup) pairs; list filters apply.
+    """
+    export_columns = ()
+    export_ordering = ('id',)
+    export_basename = 'export'
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        file_type = (request.query_params.get('file_type') or 'csv').strip().lower()
+        if file_type not in EXPORT_FILE_TYPES:
+            return Response({'error': f"file_type must be one of: {', '.join(EXPORT_FILE_TYPES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        headers = [header for header, _ in self.export_columns]
+        lookups = [lookup for _, lookup in self.export_columns]
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None)
+        rows = queryset.order_by(*self.export_ordering).values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        filename = f"{self.export_basename}_{timezone.localtime():%Y-%m-%d_%H-%M-%S}"
+        return export_response(file_type, filename, headers, rows, sheet_title=self.export_basename.replace('_', ' ').title())
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
 
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
     permission_classes = [AllowAny]
+    etag_models = (Department,)
     
     def perform_create(self, serializer):
         department = serializer.save()
         # Log the activity
-        ActivityLog.objects.create(
+        activity.log(
             action='department_added',
-            description=f'Added department: {department.course_code} - {department.course}'
+            description=f'Added department: {department.course_code} - {department.course}',
+            obj=department, actor=activity.actor(self.request)
         )
     
     def perform_update(self, serializer):
         department = serializer.save()
         # Log the activity
-        ActivityLog.objects.create(
+        activity.log(
             action='department_edited',
-            description=f'Edited department: {department.course_code} - {department.course}'
+            description=f'Edited department: {department.course_code} - {department.course}',
+            obj=department, actor=activity.actor(self.request)
         )
     
     def perform_destroy(self, instance):
         # Log before deleting
-        ActivityLog.objects.create(
+        activity.log(
             action='department_deleted',
-            description=f'Deleted department: {instance.course_code} - {instance.course}'
+            description=f'Deleted department: {instance.course_code} - {instance.course}',
+            obj=instance, actor=activity.actor(self.request)
         )
         instance.delete()
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(FlatListMixin, viewsets.ModelViewSet):
     queryset = Student.objects.select_related('department').all()
     serializer_class = StudentSerializer
     permission_classes = [AllowAny]
     lookup_field = 'usn'
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+    flat_fields = ('id', 'usn', 'name', 'department_id', 'year', 'email', 'phone')
     
     def perform_create(self, serializer):
         student = serializer.save()
         # Log the activity
-        ActivityLog.objects.create(
+        activity.log(
             action='student_added',
-            description=f'Added student: {student.usn} - {student.name}'
+            description=f'Added student: {student.usn} - {student.name}',
+            obj=student, actor=activity.actor(self.request)
         )
         try:
             dept = student.department
@@ -1517,9 +1963,10 @@ class StudentViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         student = serializer.save()
         # Log the activity
-        ActivityLog.objects.create(
+        activity.log(
             action='student_edited',
-            description=f'Edited student: {student.usn} - {student.name}'
+            description=f'Edited student: {student.usn} - {student.name}',
+            obj=student, actor=activity.actor(self.request)
         )
         try:
             dept = student.department
@@ -1555,6 +2002,16 @@ class StudentViewSet(viewsets.ModelViewSet):
         except Exception:
             pass
 
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """Ranked USN / name / department type-ahead: /api/students/search/?q=1AB&limit=10."""
+        query = (request.GET.get('q') or '').strip()
+        try:
+            limit = int(request.GET.get('limit') or DEFAULT_SEARCH_LIMIT)
+        except (TypeError, ValueError):
+            limit = DEFAULT_SEARCH_LIMIT
+        return Response({'query': query, 'results': search_students(query, limit)}, status=status.HTTP_200_OK)
+
     def destroy(self, request, *args, **kwargs):
         try:
             student = self.get_object()
@@ -1562,169 +2019,331 @@ class StudentViewSet(viewsets.ModelViewSet):
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
         
         # Log before deleting
-        ActivityLog.objects.create(
+        activity.log(
             action='student_deleted',
-            description=f'Deleted student: {student.usn} - {student.name}'
+            description=f'Deleted student: {student.usn} - {student.name}',
+            obj=student, actor=activity.actor(request)
         )
 
         self.perform_destroy(student)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
     permission_classes = [AllowAny]
+    etag_models = (Item,)
     
     def perform_create(self, serializer):
         item = serializer.save()
         # Log the activity
-        ActivityLog.objects.create(
+        activity.log(
             action='books_issued',
-            description=f'Added inventory item: {item.item_code} - {item.name} (Qty: {item.quantity})'
+            description=f'Added inventory item: {item.item_code} - {item.name} (Qty: {item.quantity})',
+            obj=item, actor=activity.actor(self.request)
         )
     
     def perform_update(self, serializer):
         item = serializer.save()
         # Log the activity
-        ActivityLog.objects.create(
+        activity.log(
             action='books_issued',
-            description=f'Updated inventory: {item.item_code} - {item.name} (Qty: {item.quantity})'
+            description=f'Updated inventory: {item.item_code} - {item.name} (Qty: {item.quantity})',
+            obj=item, actor=activity.actor(self.request)
         )
     
     def perform_destroy(self, instance):
         # Log before deleting
-        ActivityLog.objects.create(
+        activity.log(
             action='books_issued',
-            description=f'Deleted inventory item: {instance.item_code} - {instance.name}'
+            description=f'Deleted inventory item: {instance.item_code} - {instance.name}',
+            obj=instance, actor=activity.actor(self.request)
         )
         instance.delete()
 
-class IssueRecordViewSet(viewsets.ModelViewSet):
-    queryset = IssueRecord.objects.all()
-    serializer_class = IssueRecordSerializer
-    permission_classes = [AllowAny]
 
-    # CRITICAL FIX: Custom create method for bulk issuance and inventory management
-    def create(self, request, *args, **kwargs):
-        from django.db import IntegrityError
-        from django.db.models import Q
+ISSUE_IDEMPOTENCY_SCOPE = 'issue'
+# Most queued issues one sync request may carry
+ISSUE_SYNC_MAX_ENTRIES = 200
+
+
+class _IssueRejected(Exception):
+    """Carries an error Response out of the issue transaction so that it rolls back."""
+
+    def __init__(self, response):
+        super().__init__(response.data)
+        self.response = response
+
+
+def _issue_to_student(data):
+    """Apply one student's issue payload (``student_usn``, ``issues`` and optional cohort fields).
+
+    Must run inside ``transaction.atomic()``. Raises _IssueRejected when the
+    payload cannot be issued, which also rolls back any stock already taken
+    for earlier lines. Returns the saved IssueRecords.
+    """
+    student_usn = data.get('student_usn')
+    issues = data.get('issues', [])
+
+    if not student_usn or not isinstance(issues, list) or len(issues) == 0:
+        raise _IssueRejected(Response({"error": "Missing student_usn or issues list."}, status=status.HTTP_400_BAD_REQUEST))
+
+    student_id = Student.objects.filter(usn=student_usn).values_list('id', flat=True).first()
+    if not student_id:
+        raise _IssueRejected(Response({"error": f"Student with USN {student_usn} not found."}, status=status.HTTP_404_NOT_FOUND))
+
+    saved_records = []
+    issued_by_item = {}
+    # Cohort from request (optional)
+    req_code = (data.get('course_code') or '').strip()
+    req_course = (data.get('course') or '').strip()
+    req_ay = (data.get('academic_year') or '').strip()
+    req_year = (data.get('year') or '').strip()
+    # Helper to infer cohort if not fully provided
+    def infer_cohort():
         try:
-            data = request.data
-            student_usn = data.get('student_usn')
-            issues = data.get('issues', [])
+            stu = Student.objects.select_related('department').get(id=student_id)
+            q = Enrollment.objects.select_related('department').filter(student=stu)
+            if req_code:
+                q = q.filter(department__course_code=req_code)
+            if req_course:
+                q = q.filter(department__course=req_course)
+            if req_ay:
+                q = q.filter(academic_year__iexact=req_ay)
+            if req_year:
+                q = q.filter(year=str(req_year))
+            # Prefer exact year match, else earliest year
+            if req_year:
+                enr = q.first()
+            else:
+                enr = q.order_by('year').first()
+            if enr:
+                return enr.academic_year, str(enr.year)
+        except Exception:
+            pass
+        return None, None
+    cohort_ay, cohort_year = req_ay, req_year
+    if not cohort_ay or not cohort_year:
+        ay_i, yr_i = infer_cohort()
+        cohort_ay = cohort_ay or ay_i
+        cohort_year = cohort_year or yr_i
+    # Normalize AY dashes before saving
+    try:
+        import re as _re
+        def _norm(s: str) -> str:
+            return _re.sub(r"[\u2010-\u2015\u2212]", '-', (s or '').strip())
+        cohort_ay = _norm(cohort_ay)
+    except Exception:
+        pass
+    archived = _archived_year_response(cohort_ay)
+    if archived:
+        raise _IssueRejected(archived)
+    for issue in issues:
+        item_code = (issue.get('item_code') or '').strip()
+        try:
+            quantity = int(issue.get('quantity', 0) or 0)
+        except (TypeError, ValueError):
+            quantity = 0
+        remarks = issue.get('remarks')
+
+        if not item_code or quantity <= 0:
+            continue
 
-            if not student_usn or not isinstance(issues, list) or len(issues) == 0:
-                return Response({"error": "Missing student_usn or issues list."}, status=status.HTTP_400_BAD_REQUEST)
+        # Code -> id comes from the reference cache; the stock row itself is always read fresh
+        cached_item = resolve_item(item_code)
+        inventory_item = Item.objects.filter(id=cached_item['id']).first() if cached_item else None
+        if inventory_item is None:
+            raise _IssueRejected(Response({"error": f"Inventory item code {item_code} not found."}, status=status.HTTP_404_NOT_FOUND))
+
+        if inventory_item.quantity < quantity:
+            raise _IssueRejected(Response({"error": f"Insufficient stock for {item_code}. Available: {inventory_item.quantity}, Requested: {quantity}"}, status=status.HTTP_400_BAD_REQUEST))
+
+        inventory_item.quantity -= quantity
+        inventory_item.save(update_fields=['quantity'])
+        issued_by_item[inventory_item.id] = issued_by_item.get(inventory_item.id, 0) + quantity
+
+        if isinstance(remarks, str) and len(remarks) > 255:
+            remarks = remarks[:255]
+
+        record = IssueRecord(
+            student_id=student_id,
+            item_code=item_code,
+            qty_issued=quantity,
+            status='Issued',
+            remarks=remarks,
+            academic_year=cohort_ay,
+            year=cohort_year
+        )
+        record.save()
+        saved_records.append(record)
 
-            student_id = Student.objects.filter(usn=student_usn).values_list('id', flat=True).first()
-            if not student_id:
-                return Response({"error": f"Student with USN {student_usn} not found."}, status=status.HTTP_404_NOT_FOUND)
+    apply_issue(student_id, cohort_ay, cohort_year, issued_by_item)
+    return saved_records
 
-            saved_records = []
 
-            def perform_issue_transaction():
-                # Use an explicit atomic transaction we can catch at commit time
-                with transaction.atomic():
-                    saved_records_local = []
-                    # Cohort from request (optional)
-                    req_code = (data.get('course_code') or '').strip()
-                    req_course = (data.get('course') or '').strip()
-                    req_ay = (data.get('academic_year') or '').strip()
-                    req_year = (data.get('year') or '').strip()
-                    # Helper to infer cohort if not fully provided
-                    def infer_cohort():
-                        try:
-                            stu = Student.objects.select_related('department').get(id=student_id)
-                            q = Enrollment.objects.select_related('department').filter(student=stu)
-                            if req_code:
-                                q = q.filter(department__course_code=req_code)
-                            if req_course:
-                                q = q.filter(department__course=req_course)
-                            if req_ay:
-                                q = q.filter(academic_year__iexact=req_ay)
-                            if req_year:
-                                q = q.filter(year=str(req_year))
-                            # Prefer exact year match, else earliest year
-                            if req_year:
-                                enr = q.first()
-                            else:
-                                enr = q.order_by('year').first()
-                            if enr:
-                                return enr.academic_year, str(enr.year)
-                        except Exception:
-                            pass
-                        return None, None
-                    cohort_ay, cohort_year = req_ay, req_year
-                    if not cohort_ay or not cohort_year:
-                        ay_i, yr_i = infer_cohort()
-                        cohort_ay = cohort_ay or ay_i
-                        cohort_year = cohort_year or yr_i
-                    # Normalize AY dashes before saving
+def _replay_issue(key, payload_fingerprint, row=None):
+    """Stored response for an already-applied key, or 422 if the key came with a different payload."""
+    row = row or idempotency.stored(ISSUE_IDEMPOTENCY_SCOPE, [key]).get(key)
+    try:
+        return idempotency.replay_response(idempotency.check(row, payload_fingerprint))
+    except idempotency.KeyReused:
+        return idempotency.conflict_response(key)
+
+
+def _remember_issue(key, payload_fingerprint, body):
+    try:
+        with transaction.atomic():
+            idempotency.remember(ISSUE_IDEMPOTENCY_SCOPE, key, payload_fingerprint, status.HTTP_201_CREATED, body)
+    except IntegrityError:
+        # A concurrent retry with the same key committed first: undo this run and answer with its outcome
+        raise _IssueRejected(_replay_issue(key, payload_fingerprint))
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def sync_issue_queue(request):
+    """Apply issues that counters queued while offline, in one transaction.
+
+    Body: {"issues": [{"idempotency_key", "student_usn", "issues", cohort fields...}]}.
+    Each entry runs in its own savepoint, so a rejected entry (unknown student,
+    not enough stock) is rolled back and reported while the rest commit
+    together. Keys already applied, by an earlier sync or by a direct issue
+    that did reach the server, are replayed instead of issued twice.
+    """
+    entries = (request.data or {}).get('issues')
+    if not isinstance(entries, list) or not entries:
+        return Response({'error': 'issues[] is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(entries) > ISSUE_SYNC_MAX_ENTRIES:
+        return Response({'error': f'At most {ISSUE_SYNC_MAX_ENTRIES} queued issues per sync.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    errors = []
+    for index, entry in enumerate(entries):
+        key = entry.get('idempotency_key') if isinstance(entry, dict) else None
+        if not isinstance(key, str) or not key.strip() or len(key.strip()) > idempotency.MAX_KEY_LENGTH:
+            errors.append({'index': index, 'error': f'Each queued issue needs an idempotency_key of 1-{idempotency.MAX_KEY_LENGTH} characters.'})
+    if errors:
+        return Response({'error': 'Invalid queued issues.', 'details': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    idempotency.purge_expired()
+    known = idempotency.stored(ISSUE_IDEMPOTENCY_SCOPE, {entry['idempotency_key'].strip() for entry in entries})
+    results = []
+    applied_books = 0
+    try:
+        with transaction.atomic():
+            for entry in entries:
+                key = entry['idempotency_key'].strip()
+                payload = {field: value for field, value in entry.items() if field != 'idempotency_key'}
+                payload_fingerprint = idempotency.fingerprint(payload)
+                if key in known:
+                    response = _replay_issue(key, payload_fingerprint, known[key])
+                else:
                     try:
-                        import re as _re
-                        def _norm(s: str) -> str:
-                            return _re.sub(r"[\u2010-\u2015\u2212]", '-', (s or '').strip())
-                        cohort_ay = _norm(cohort_ay)
-                    except Exception:
-                        pass
-                    for issue in issues:
-                        item_code = (issue.get('item_code') or '').strip()
-                        try:
-                            quantity = int(issue.get('quantity', 0) or 0)
-                        except (TypeError, ValueError):
-                            quantity = 0
-                        remarks = issue.get('remarks')
+                        with transaction.atomic():
+                            records = _issue_to_student(payload)
+                            body = IssueRecordSerializer(records, many=True).data
+                            _remember_issue(key, payload_fingerprint, body)
+                        response = Response(body, status=status.HTTP_201_CREATED)
+                        applied_books += sum(record.qty_issued for record in records)
+                    except _IssueRejected as rejected:
+                        response = rejected.response
+
+                if response.has_header(idempotency.REPLAY_HEADER):
+                    outcome = 'replayed'
+                elif response.status_code == status.HTTP_201_CREATED:
+                    outcome = 'applied'
+                else:
+                    outcome = 'rejected'
+                result = {'idempotency_key': key, 'status': outcome, 'status_code': response.status_code}
+                if response.status_code < 400:
+                    result['records'] = response.data
+                else:
+                    result['error'] = response.data.get('error') if isinstance(response.data, dict) else response.data
+                results.append(result)
+    except OperationalError as e:
+        return Response({'error': f'Database busy, nothing was synced: {e}'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    counts = {outcome: sum(1 for r in results if r['status'] == outcome) for outcome in ('applied', 'replayed', 'rejected')}
+    if counts['applied']:
+        activity.log(
+            action='books_issued',
+            description=f"Synced {counts['applied']} queued issues ({applied_books} books) from offline counters",
+            actor=activity.actor(request)
+        )
+    return Response({'results': results, **counts}, status=status.HTTP_200_OK)
 
-                        if not item_code or quantity <= 0:
-                            continue
 
-                        try:
-                            inventory_item = Item.objects.get(item_code__iexact=item_code)
-                        except Item.DoesNotExist:
-                            return None, Response({"error": f"Inventory item code {item_code} not found."}, status=status.HTTP_404_NOT_FOUND)
-
-                        if inventory_item.quantity < quantity:
-                            return None, Response({"error": f"Insufficient stock for {item_code}. Available: {inventory_item.quantity}, Requested: {quantity}"}, status=status.HTTP_400_BAD_REQUEST)
-
-                        inventory_item.quantity -= quantity
-                        inventory_item.save()
-
-                        if isinstance(remarks, str) and len(remarks) > 255:
-                            remarks = remarks[:255]
-
-                        record = IssueRecord(
-                            student_id=student_id,
-                            item_code=item_code,
-                            qty_issued=quantity,
-                            status='Issued',
-                            remarks=remarks,
-                            academic_year=cohort_ay,
-                            year=cohort_year
-                        )
-                        record.save()
-                        saved_records_local.append(record)
-
-                    return saved_records_local, None
-
-            # First attempt
-            saved_records, early_response = perform_issue_transaction()
-            if early_response is not None:
-                return early_response
-
-            if saved_records is None:
-                saved_records = []
-
-            created_records_data = IssueRecordSerializer(saved_records, many=True).data
-            
+def _refresh_pending_cohorts(*cohorts):
+    """Recompute PendingItem for each (student_id, academic_year, year) an edit or delete touched."""
+    for student_id, academic_year, year in set(cohorts):
+        refresh_pending(student_ids=[student_id], academic_year=academic_year, year=year)
+
+
+class IssueRecordViewSet(ArchivedYearMixin, ExportMixin, QueryParamFilterMixin, FlatListMixin, viewsets.ModelViewSet):
+    queryset = IssueRecord.objects.all()
+    serializer_class = IssueRecordSerializer
+    permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+    flat_fields = (
+        'id', 'student_id', 'item_code', 'qty_issued', 'date_issued', 'status', 'remarks',
+        'academic_year', 'year',
+    )
+    filter_params = {
+        'student': 'student_id',
+        'usn': 'student__usn__iexact',
+        'item_code': 'item_code__iexact',
+        'academic_year': 'academic_year__iexact',
+        'year': 'year',
+        'status': 'status__iexact',
+        'date_from': 'date_issued__gte',
+        'date_to': 'date_issued__lte',
+    }
+    export_basename = 'issue_history'
+    export_ordering = ('date_issued', 'id')
+    export_columns = (
+        ('USN', 'student__usn'), ('Name', 'student__name'), ('Item Code', 'item_code'),
+        ('Qty Issued', 'qty_issued'), ('Date Issued', 'date_issued'), ('Status', 'status'),
+        ('Remarks', 'remarks'), ('Academic Year', 'academic_year'), ('Year', 'year'),
+    )
+
+    # CRITICAL FIX: Custom create method for bulk issuance and inventory management
+    def create(self, request, *args, **kwargs):
+        data = request.data
+        # Counters retry on flaky networks; a repeated Idempotency-Key replays the first outcome
+        key = idempotency.request_key(request)
+        payload_fingerprint = None
+        if key:
+            if len(key) > idempotency.MAX_KEY_LENGTH:
+                return Response({"error": f"Idempotency-Key must be at most {idempotency.MAX_KEY_LENGTH} characters."}, status=status.HTTP_400_BAD_REQUEST)
+            payload_fingerprint = idempotency.fingerprint(data)
+            row = idempotency.stored(ISSUE_IDEMPOTENCY_SCOPE, [key]).get(key)
+            if row is not None:
+                return _replay_issue(key, payload_fingerprint, row)
+
+        def perform_issue_transaction():
+            with transaction.atomic():
+                records = _issue_to_student(data)
+                body = IssueRecordSerializer(records, many=True).data
+                if key:
+                    _remember_issue(key, payload_fingerprint, body)
+                return records, body
+
+        def issued_response(saved_records, created_records_data):
             # Log the book issue activity
             total_books = sum(record.qty_issued for record in saved_records)
-            ActivityLog.objects.create(
+            activity.log(
                 action='books_issued',
-                description=f'Issued {total_books} books to student {student_usn}'
+                description=f"Issued {total_books} books to student {data.get('student_usn')}",
+                actor=activity.actor(request), object_type='student',
+                object_id=saved_records[0].student_id if saved_records else None
             )
-            
             return Response(created_records_data, status=status.HTTP_201_CREATED)
 
+        try:
+            try:
+                return issued_response(*perform_issue_transaction())
+            except _IssueRejected as rejected:
+                return rejected.response
+
         except IntegrityError as e:
             # Attempt one-time cleanup of orphaned foreign keys in PendingReport and retry
             try:
@@ -1734,37 +2353,97 @@ class IssueRecordViewSet(viewsets.ModelViewSet):
                     orphans.delete()
 
                 # Retry once after cleanup
-                saved_records, early_response = perform_issue_transaction()
-                if early_response is not None:
-                    return early_response
-                if saved_records is None:
-                    saved_records = []
-                created_records_data = IssueRecordSerializer(saved_records, many=True).data
-                
-                # Log the book issue activity
-                total_books = sum(record.qty_issued for record in saved_records)
-                ActivityLog.objects.create(
-                    action='books_issued',
-                    description=f'Issued {total_books} books to student {student_usn}'
-                )
-                
-                return Response(created_records_data, status=status.HTTP_201_CREATED)
+                try:
+                    return issued_response(*perform_issue_transaction())
+                except _IssueRejected as rejected:
+                    return rejected.response
             except Exception:
                 pass
             return Response({"error": f"Database integrity error during issue: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": f"Server error during issue: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class PendingReportViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        before = serializer.instance
+        cohort = (before.student_id, before.academic_year, before.year)
+        with transaction.atomic():
+            record = serializer.save()
+            _refresh_pending_cohorts(cohort, (record.student_id, record.academic_year, record.year))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            _refresh_pending_cohorts((instance.student_id, instance.academic_year, instance.year))
+
+class PendingReportViewSet(ArchivedYearMixin, ExportMixin, QueryParamFilterMixin, FlatListMixin, viewsets.ModelViewSet):
     queryset = PendingReport.objects.all()
     serializer_class = PendingReportSerializer
     permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+    filter_params = {
+        'student': 'student_id',
+        'usn': 'usn__iexact',
+        'course_code': 'course_code__iexact',
+        'course': 'course__iexact',
+        'academic_year': 'academic_year__iexact',
+        'year': 'year',
+    }
+    export_basename = 'pending_reports'
+    export_ordering = ('course_code', 'academic_year', 'year', 'usn')
+    export_columns = (
+        ('USN', 'usn'), ('Name', 'name'), ('Course Code', 'course_code'), ('Course', 'course'),
+        ('Academic Year', 'academic_year'), ('Year', 'year'),
+        ('2PN', 'pn2'), ('2PR', 'pr2'), ('2PO', 'po2'), ('1PN', 'pn1'), ('1PR', 'pr1'), ('1PO', 'po1'),
+    )
+    flat_fields = ('id', 'student_id', 'usn', 'name', 'course', 'course_code', 'academic_year', 'year')
+    # Same output names as PendingReportSerializer for the legacy quantity columns.
+    flat_aliases = {
+        'qty_2PN': 'pn2', 'qty_2PR': 'pr2', 'qty_2PO': 'po2',
+        'qty_1PN': 'pn1', 'qty_1PR': 'pr1', 'qty_1PO': 'po1',
+    }
+
+
+class PendingItemViewSet(ExportMixin, QueryParamFilterMixin, FlatListMixin, viewsets.ReadOnlyModelViewSet):
+    """Per-item pending rows maintained by core/pending.py (read-only; refreshed by generate-pending-reports)."""
+    queryset = PendingItem.objects.select_related('student', 'department', 'item').order_by('id')
+    serializer_class = PendingItemSerializer
+    permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+    filter_params = {
+        'student': 'student_id',
+        'usn': 'student__usn__iexact',
+        'department': 'department_id',
+        'course_code': 'department__course_code__iexact',
+        'course': 'department__course__iexact',
+        'academic_year': 'academic_year__iexact',
+        'year': 'year',
+        'item_code': 'item__item_code__iexact',
+        'min_pending': 'pending_qty__gte',
+    }
+    export_basename = 'pending_items'
+    export_ordering = ('department__course_code', 'academic_year', 'year', 'student__usn', 'item__item_code')
+    export_columns = (
+        ('USN', 'student__usn'), ('Name', 'student__name'), ('Course Code', 'department__course_code'),
+        ('Course', 'department__course'), ('Academic Year', 'academic_year'), ('Year', 'year'),
+        ('Item Code', 'item__item_code'), ('Required', 'required_qty'), ('Issued', 'issued_qty'), ('Pending', 'pending_qty'),
+    )
+    flat_fields = (
+        'id', 'student_id', 'department_id', 'academic_year', 'year', 'item_id',
+        'required_qty', 'issued_qty', 'pending_qty',
+    )
+    flat_aliases = {'usn': 'student__usn', 'item_code': 'item__item_code'}
 
 
-class InventoryOrderViewSet(viewsets.ModelViewSet):
-    queryset = InventoryOrder.objects.select_related('item', 'ordered_by').prefetch_related('receipts').all()
+class InventoryOrderViewSet(FlatListMixin, viewsets.ModelViewSet):
+    queryset = InventoryOrder.objects.select_related('item', 'ordered_by').prefetch_related(
+        Prefetch('receipts', queryset=InventoryReceipt.objects.select_related('item', 'received_by'))
+    ).all()
     serializer_class = InventoryOrderSerializer
     permission_classes = [IsAuthenticated]
+    flat_fields = (
+        'id', 'item_id', 'ordered_qty', 'received_qty', 'status', 'reference',
+        'ordered_at', 'updated_at', 'ordered_by_id',
+    )
 
     def perform_create(self, serializer):
         order = serializer.save(ordered_by=self.request.user)
@@ -1837,6 +2516,114 @@ class InventoryOrderViewSet(viewsets.ModelViewSet):
         }
         return Response(data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='receive-batch')
+    def receive_batch(self, request):
+        """Receive goods against many orders at once (e.g. one delivery note).
+
+        Body: {"deliveries": [{"order_id", "quantity", "note"}]}. All orders are
+        locked together and validated before anything is written.
+        """
+        deliveries = request.data.get('deliveries')
+        if not isinstance(deliveries, list) or not deliveries:
+            return Response({'error': 'deliveries[] is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        lines = []
+        errors = []
+        for index, row in enumerate(deliveries):
+            if not isinstance(row, dict):
+                errors.append({'index': index, 'error': 'Each delivery must be an object.'})
+                continue
+            try:
+                order_id = int(row.get('order_id') or row.get('order'))
+                qty = int(row.get('quantity', 0))
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'order_id and quantity must be integers.'})
+                continue
+            if qty <= 0:
+                errors.append({'index': index, 'error': 'Quantity must be greater than zero.'})
+                continue
+            note = (row.get('note') or '').strip()[:255] or None
+            lines.append((order_id, qty, note))
+        if errors:
+            return Response({'error': 'Invalid deliveries.', 'details': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        order_ids = {order_id for order_id, _, _ in lines}
+        with transaction.atomic():
+            orders = {
+                order.id: order
+                for order in InventoryOrder.objects.select_for_update().filter(id__in=order_ids)
+            }
+            missing = sorted(order_ids - orders.keys())
+            if missing:
+                return Response({'error': 'Orders not found.', 'missing': missing}, status=status.HTTP_404_NOT_FOUND)
+
+            requested = {}
+            for order_id, qty, _ in lines:
+                requested[order_id] = requested.get(order_id, 0) + qty
+            over = [
+                {'order_id': order_id, 'requested': qty, 'pending': orders[order_id].pending_qty}
+                for order_id, qty in requested.items()
+                if qty > orders[order_id].pending_qty
+            ]
+            if over:
+                return Response({'error': 'Quantity exceeds pending amount.', 'details': over}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Lock the affected items too and share one instance per item id.
+            items = {
+                item.id: item
+                for item in Item.objects.select_for_update().filter(id__in={o.item_id for o in orders.values()})
+            }
+            for order in orders.values():
+                order.item = items[order.item_id]
+
+            receipts = [
+                InventoryReceipt(
+                    order=orders[order_id],
+                    item=orders[order_id].item,
+                    quantity=qty,
+                    note=note,
+                    received_by=request.user,
+                )
+                for order_id, qty, note in lines
+            ]
+            receipts = InventoryReceipt.objects.bulk_create(receipts)
+
+            now = timezone.now()
+            log_entries = []
+            for receipt in receipts:
+                order = receipt.order
+                item = receipt.item
+                pending_before = order.pending_qty
+                previous_qty = item.quantity
+                order.received_qty += receipt.quantity
+                item.quantity += receipt.quantity
+                log_entries.append(StockLogEntry(
+                    item=item,
+                    change=receipt.quantity,
+                    pending_delta=order.pending_qty - pending_before,
+                    reason='Received from order',
+                    previous_quantity=previous_qty,
+                    new_quantity=item.quantity,
+                    created_by=request.user,
+                    order=order,
+                    receipt=receipt,
+                ))
+            for order in orders.values():
+                order.refresh_status()
+                order.updated_at = now
+
+            InventoryOrder.objects.bulk_update(list(orders.values()), ['received_qty', 'status', 'updated_at'])
+            Item.objects.bulk_update(list(items.values()), ['quantity'])
+            StockLogEntry.objects.bulk_create(log_entries)
+            bump_table_version(Item, reference=False)  # stock only; the catalog stays valid
+
+        refreshed = self.get_queryset().filter(id__in=order_ids)
+        data = {
+            'orders': InventoryOrderSerializer(refreshed, many=True, context={'request': request}).data,
+            'receipts': InventoryReceiptSerializer(receipts, many=True, context={'request': request}).data,
+        }
+        return Response(data, status=status.HTTP_201_CREATED)
+
 
 class InventoryReceiptViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     queryset = InventoryReceipt.objects.select_related('item', 'order', 'received_by').all()
@@ -1965,10 +2752,24 @@ class InventoryReceiptViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         return Response(self.get_serializer(self.get_queryset(), many=True).data, status=status.HTTP_200_OK)
 
 
-class StockLogEntryViewSet(viewsets.ModelViewSet):
+class StockLogEntryViewSet(ExportMixin, QueryParamFilterMixin, viewsets.ModelViewSet):
     queryset = StockLogEntry.objects.select_related('item', 'created_by', 'order', 'receipt').all()
     serializer_class = StockLogEntrySerializer
     permission_classes = [IsAuthenticated]
+    filter_params = {
+        'item': 'item_id',
+        'item_code': 'item__item_code__iexact',
+        'order': 'order_id',
+        'year': 'created_at__year',
+        'month': 'created_at__month',
+    }
+    export_basename = 'stock_change_log'
+    export_ordering = ('-created_at', '-id')
+    export_columns = (
+        ('Date', 'created_at'), ('Item Code', 'item__item_code'), ('Item', 'item__name'),
+        ('Change', 'change'), ('Pending Delta', 'pending_delta'), ('Previous Qty', 'previous_quantity'),
+        ('New Qty', 'new_quantity'), ('Reason', 'reason'), ('By', 'created_by__username'), ('Order', 'order_id'),
+    )
 
     def perform_create(self, serializer):
         pending_delta = serializer.validated_data.get('pending_delta') or 0
@@ -1989,6 +2790,108 @@ class StockLogEntryViewSet(viewsets.ModelViewSet):
             created_by=self.request.user
         )
 
+    @action(detail=False, methods=['post'], url_path='stock-take')
+    def stock_take(self, request):
+        """Reconcile physical counts for many items in one transaction.
+
+        Body: {"counts": [{"item_id" or "item_code", "counted_qty"}], "reason", "preview"}.
+        Returns a variance report; with preview=true nothing is written.
+        """
+        counts = request.data.get('counts')
+        if not isinstance(counts, list) or not counts:
+            return Response({'error': 'counts[] is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        reason = (request.data.get('reason') or '').strip() or 'Stock take'
+        preview_raw = request.data.get('preview', False)
+        preview = str(preview_raw).strip().lower() in ('1', 'true', 'yes', 'on')
+
+        counted_by_id = {}
+        counted_by_code = {}
+        errors = []
+        for index, row in enumerate(counts):
+            if not isinstance(row, dict):
+                errors.append({'index': index, 'error': 'Each count must be an object.'})
+                continue
+            try:
+                counted_qty = int(row.get('counted_qty'))
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'counted_qty must be an integer.'})
+                continue
+            if counted_qty < 0:
+                errors.append({'index': index, 'error': 'counted_qty cannot be negative.'})
+                continue
+            item_id = row.get('item_id')
+            item_code = (row.get('item_code') or '').strip().upper()
+            if item_id:
+                try:
+                    counted_by_id[int(item_id)] = counted_qty
+                except (TypeError, ValueError):
+                    errors.append({'index': index, 'error': 'item_id must be an integer.'})
+            elif item_code:
+                counted_by_code[item_code] = counted_qty
+            else:
+                errors.append({'index': index, 'error': 'item_id or item_code is required.'})
+        if errors:
+            return Response({'error': 'Invalid counts.', 'details': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Codes are matched case-insensitively, like everywhere else item codes are looked up
+            items_qs = Item.objects.annotate(code_upper=Upper('item_code')).filter(
+                Q(id__in=counted_by_id.keys()) | Q(code_upper__in=counted_by_code.keys())
+            )
+            if not preview:
+                items_qs = items_qs.select_for_update()
+            items = list(items_qs.order_by('item_code'))
+
+            matched_ids = {item.id for item in items}
+            matched_codes = {item.item_code.upper() for item in items}
+            unknown = [str(i) for i in counted_by_id if i not in matched_ids]
+            unknown += [c for c in counted_by_code if c not in matched_codes]
+            if unknown:
+                return Response({'error': 'Unknown items.', 'unknown': unknown}, status=status.HTTP_400_BAD_REQUEST)
+
+            variance = []
+            changed_items = []
+            log_entries = []
+            for item in items:
+                counted_qty = counted_by_id.get(item.id)
+                if counted_qty is None:
+                    counted_qty = counted_by_code[item.item_code.upper()]
+                previous_qty = item.quantity
+                delta = counted_qty - previous_qty
+                variance.append({
+                    'item_id': item.id,
+                    'item_code': item.item_code,
+                    'item_name': item.name,
+                    'system_qty': previous_qty,
+                    'counted_qty': counted_qty,
+                    'variance': delta,
+                })
+                if delta == 0:
+                    continue
+                item.quantity = counted_qty
+                changed_items.append(item)
+                log_entries.append(StockLogEntry(
+                    item=item,
+                    change=delta,
+                    reason=reason,
+                    previous_quantity=previous_qty,
+                    new_quantity=counted_qty,
+                    created_by=request.user,
+                ))
+
+            if not preview and changed_items:
+                Item.objects.bulk_update(changed_items, ['quantity'])
+                StockLogEntry.objects.bulk_create(log_entries)
+                bump_table_version(Item, reference=False)  # stock only; the catalog stays valid
+
+        return Response({
+            'preview': preview,
+            'counted': len(variance),
+            'adjusted': len(changed_items),
+            'net_change': sum(row['variance'] for row in variance),
+            'variance': variance,
+        }, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['delete'], url_path='clear')
     def clear(self, request):
         with transaction.atomic():
@@ -2000,103 +2903,140 @@ class ActivityLogViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        # Return last 20 activity logs, ordered by most recent
-        return ActivityLog.objects.all().order_by('-timestamp')[:20]
+        academic_year = normalize_academic_year(self.request.query_params.get('academic_year') or '')
+        if academic_year and is_archived_year(academic_year):
+            # The year's logs were moved with it (core/archive.py)
+            logs = ArchivedActivityLog.objects.filter(academic_year=academic_year).order_by('-timestamp')
+        else:
+            logs = ActivityLog.objects.all().order_by('-timestamp')
+        # The list shows the last 20; detail routes filter by pk, which a sliced queryset cannot do
+        return logs if self.detail else logs[:20]
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(FlatListMixin, viewsets.ModelViewSet):
     queryset = Enrollment.objects.select_related('student', 'department').all()
     serializer_class = EnrollmentSerializer
     permission_classes = [AllowAny]
+    renderer_classes = COLUMNAR_RENDERER_CLASSES
+    flat_fields = ('id', 'student_id', 'department_id', 'academic_year', 'year')
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            enrollment = serializer.save()
+            _refresh_pending_cohorts((enrollment.student_id, enrollment.academic_year, enrollment.year))
+
+    def perform_update(self, serializer):
+        before = serializer.instance
+        cohort = (before.student_id, before.academic_year, before.year)
+        with transaction.atomic():
+            enrollment = serializer.save()
+            _refresh_pending_cohorts(cohort, (enrollment.student_id, enrollment.academic_year, enrollment.year))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            _refresh_pending_cohorts((instance.student_id, instance.academic_year, instance.year))
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def backfill_enrollments(request):
+    """One Enrollment per student for their current department and year. Set-based (see core/backfill.py)."""
     try:
-        created = 0
-        for s in Student.objects.select_related('department').all():
-            dept = s.department
-            if not dept:
-                continue
-            import re
-            def n_ay(x: str) -> str:
-                x = (x or '').strip().upper()
-                x = re.sub(r"[\u2010-\u2015\u2212]", '-', x).replace('/', '-').replace(' ', '')
-                if '-' in x:
-                    parts = x.split('-')
-                    try:
-                        start = int(parts[0][:4])
-                        end = parts[1]
-                        if len(end) == 2 and end.isdigit():
-                            end_full = int(str(start)[:2] + end)
-                            return f"{start}-{end_full}"
-                    except Exception:
-                        pass
-                return x
-            def n_year(v: str) -> str:
-                import re as _re
-                digits = ''.join(_re.findall(r"\d+", (v or '').strip()))
-                return str(int(digits)) if digits.isdigit() else (v or '').strip()
-            ay = n_ay(dept.academic_year)
-            yr = n_year(str(s.year))
-            if not ay or not yr:
-                continue
-            obj, was_created = Enrollment.objects.get_or_create(
-                student=s,
-                department=dept,
-                academic_year=ay,
-                year=yr
-            )
-            if was_created:
-                created += 1
-        ActivityLog.objects.create(action='enrollment_backfill', description=f'Backfilled enrollments: {created}')
-        return Response({"created": created}, status=status.HTTP_200_OK)
+        dry_run = str(request.data.get('dry_run', '')).strip().lower() in ('1', 'true', 'yes')
+        counts = run_backfill_enrollments(dry_run=dry_run)
+        if not dry_run:
+            activity.log(action='enrollment_backfill', description=f"Backfilled enrollments: {counts['created']}", actor=activity.actor(request))
+        return Response(counts, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
-def purge_student_data(request):
-    """Delete all Students, Enrollments, PendingReports, and IssueRecords.
-    Keeps Departments and Items intact.
+def promote_cohorts(request):
+    """Year-end promotion of every cohort of ``from_academic_year`` into ``to_academic_year``.
+
+    Optional ``course_code`` limits it to one course; ``dry_run`` returns the
+    per-cohort counts without writing. See core/promotion.py.
     """
+    dry_run = str(request.data.get('dry_run', '')).strip().lower() in ('1', 'true', 'yes')
     try:
-        # Gather counts pre-deletion for response transparency
-        counts_before = {
-            "students": Student.objects.count(),
-            "enrollments": Enrollment.objects.count(),
-            "pending_reports": PendingReport.objects.count(),
-            "issue_records": IssueRecord.objects.count(),
-            "departments": Department.objects.count(),
-            "items": Item.objects.count(),
-        }
+        result = promote(
+            request.data.get('from_academic_year'), request.data.get('to_academic_year'),
+            course_code=(request.data.get('course_code') or '').strip() or None, dry_run=dry_run,
+        )
+    except PromotionError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    except OperationalError:
+        return Response({'error': 'Database is busy. Please retry.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response(result, status=status.HTTP_200_OK)
 
-        # Delete in safe order to avoid FK issues
-        Enrollment.objects.all().delete()
-        IssueRecord.objects.all().delete()
-        PendingReport.objects.all().delete()
-        Student.objects.all().delete()
-
-        counts_after = {
-            "students": Student.objects.count(),
-            "enrollments": Enrollment.objects.count(),
-            "pending_reports": PendingReport.objects.count(),
-            "issue_records": IssueRecord.objects.count(),
-            "departments": Department.objects.count(),
-            "items": Item.objects.count(),
-        }
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def archive_academic_years(request):
+    """Move closed academic years into the archive tables (see core/archive.py).
 
-        ActivityLog.objects.create(
+    GET returns the manifest. POST body: {"academic_years": [...]} (or
+    "academic_year"), optional "dry_run" for counts only and "force" to archive
+    a year that still had issues recently.
+    """
+    if request.method == 'GET':
+        return Response({'manifest': archive_manifest()}, status=status.HTTP_200_OK)
+    years = request.data.get('academic_years') or [request.data.get('academic_year')]
+    if not isinstance(years, list):
+        years = [years]
+    dry_run = str(request.data.get('dry_run', '')).strip().lower() in ('1', 'true', 'yes')
+    force = str(request.data.get('force', '')).strip().lower() in ('1', 'true', 'yes')
+    try:
+        result = archive_years(years, dry_run=dry_run, force=force)
+    except ArchiveError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    except OperationalError:
+        return Response({'error': 'Database is busy. Please retry.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({**result, 'manifest': archive_manifest()}, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def purge_student_data(request):
+    """Delete Students with their Enrollments, PendingReports, IssueRecords and pending items.
+    Keeps Departments and Items intact.
+
+    Optional scope: ``academic_year``, ``course_code`` and/or ``department_ids``
+    (students whose current department matches); none purges every student.
+    ``dry_run`` only counts, ``vacuum`` reclaims the freed space afterwards.
+    Chunked raw deletes, see core/purge.py.
+    """
+    department_ids = request.data.get('department_ids') or []
+    if not isinstance(department_ids, list):
+        department_ids = [department_ids]
+    try:
+        department_ids = [int(value) for value in department_ids]
+    except (TypeError, ValueError):
+        return Response({'error': 'department_ids must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.data.get('dry_run', '')).strip().lower() in ('1', 'true', 'yes')
+    vacuum = str(request.data.get('vacuum', '')).strip().lower() in ('1', 'true', 'yes')
+    academic_year = (request.data.get('academic_year') or '').strip()
+    course_code = (request.data.get('course_code') or '').strip()
+    try:
+        result = run_purge(academic_year=academic_year, course_code=course_code, department_ids=department_ids,
+                           dry_run=dry_run, reclaim=vacuum)
+    except PurgeError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    except OperationalError:
+        return Response({'error': 'Database is busy. Please retry.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    scope = ', '.join(filter(None, [academic_year, course_code, department_ids and f"departments {department_ids}"]))
+    if not dry_run:
+        activity.log(
             action='purge_students',
-            description='Purged students, enrollments, pending reports, and issue records.'
+            description=f"Purged {result['students']} students with their enrollments, pending reports and issue records"
+                        + (f" ({scope})." if scope else '.'),
+            actor=activity.actor(request)
         )
+    return Response({
+        "message": "Student-related data purged successfully." if not dry_run else "Dry run: nothing was deleted.",
+        "scope": scope or 'all',
+        **result,
+    }, status=status.HTTP_200_OK)
 
-        return Response({
-            "message": "Student-related data purged successfully.",
-            "before": counts_before,
-            "after": counts_after
-        }, status=status.HTTP_200_OK)
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def generate_pending_reports_view(request):
@@ -2105,43 +3045,61 @@ def generate_pending_reports_view(request):
     using the Department quantities for that enrollment's department.
     """
     try:
-        created_count = 0
+        # Upsert per (student, AY, year): existing reports are updated, missing ones created.
+        # Done set-based (one read of existing keys, then bulk_create / bulk_update).
+        existing = {
+            (student_id, ay, yr): report_id
+            for report_id, student_id, ay, yr in PendingReport.objects.values_list('id', 'student_id', 'academic_year', 'year')
+        }
+        to_create = {}
+        to_update = {}
         enrollments = Enrollment.objects.select_related('student', 'department').all()
-        for enr in enrollments:
+        for enr in enrollments.iterator(chunk_size=PENDING_BATCH_SIZE):
             student = enr.student
             dept = enr.department
             if not student or not dept:
                 continue
-            # Upsert: if report exists for this AY+Year, UPDATE quantities and meta
-            report, created = PendingReport.objects.update_or_create(
+            key = (student.id, enr.academic_year, enr.year)
+            report = PendingReport(
+                id=existing.get(key),
                 student=student,
                 academic_year=enr.academic_year,
                 year=enr.year,
-                defaults={
-                    'usn': student.usn,
-                    'name': student.name,
-                    'course': dept.course,
-                    'course_code': dept.course_code,
-                    'pn2': getattr(dept, 'two_hundred_notebook', 0) or 0,
-                    'pr2': getattr(dept, 'two_hundred_record', 0) or 0,
-                    'po2': getattr(dept, 'two_hundred_observation', 0) or 0,
-                    'pn1': getattr(dept, 'one_hundred_notebook', 0) or 0,
-                    'pr1': getattr(dept, 'one_hundred_record', 0) or 0,
-                    'po1': getattr(dept, 'one_hundred_observation', 0) or 0,
-                }
+                usn=student.usn,
+                name=student.name,
+                course=dept.course,
+                course_code=dept.course_code,
+                pn2=getattr(dept, 'two_hundred_notebook', 0) or 0,
+                pr2=getattr(dept, 'two_hundred_record', 0) or 0,
+                po2=getattr(dept, 'two_hundred_observation', 0) or 0,
+                pn1=getattr(dept, 'one_hundred_notebook', 0) or 0,
+                pr1=getattr(dept, 'one_hundred_record', 0) or 0,
+                po1=getattr(dept, 'one_hundred_observation', 0) or 0,
+            )
+            (to_update if report.id else to_create)[key] = report
+
+        with transaction.atomic():
+            PendingReport.objects.bulk_create(to_create.values(), batch_size=PENDING_BATCH_SIZE)
+            PendingReport.objects.bulk_update(
+                to_update.values(),
+                ['usn', 'name', 'course', 'course_code', 'pn2', 'pr2', 'po2', 'pn1', 'pr1', 'po1'],
+                batch_size=PENDING_BATCH_SIZE,
             )
-            if created:
-                created_count += 1
+        created_count = len(to_create)
+        # Per-item pending rows for every required item (not only the legacy columns above)
+        pending_items = refresh_pending(batch_size=PENDING_BATCH_SIZE)
 
         if created_count > 0:
-            ActivityLog.objects.create(
+            activity.log(
                 action='pending_generated',
-                description=f'Generated pending reports: {created_count} (per enrollment)'
+                description=f'Generated pending reports: {created_count} (per enrollment)',
+                actor=activity.actor(request)
             )
 
         return Response({
             "message": f"Generated {created_count} pending reports successfully.",
-            "created_count": created_count
+            "created_count": created_count,
+            "pending_items": pending_items,
         }, status=status.HTTP_200_OK)
 
     except Exception as e:
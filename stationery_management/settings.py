@@ -78,6 +78,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RequestProfilingMiddleware',  # no-op unless REQUEST_PROFILING_ENABLED
 ]
 
 ROOT_URLCONF = 'stationery_management.urls'
@@ -112,6 +113,41 @@ DATABASES = {
 }
 
 
+# Caches
+# Local memory by default; set DJANGO_CACHE_BACKEND / DJANGO_CACHE_LOCATION to use a
+# shared cache (e.g. django.core.cache.backends.redis.RedisCache) across workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'aims-default'),
+    }
+}
+
+# Read-through cache for items, cohort lookups and requirement vectors (core/caching.py)
+REFERENCE_CACHE_ALIAS = 'default'
+REFERENCE_CACHE_TIMEOUT = int(os.environ.get('REFERENCE_CACHE_TIMEOUT', '300'))
+
+# How long issue Idempotency-Keys are kept for replay (core/idempotency.py)
+IDEMPOTENCY_KEY_RETENTION_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_RETENTION_HOURS', '72'))
+
+
+# Buffer activity log entries per process and write them in bulk (core/activity.py).
+# Off by default: each entry is saved as it is logged.
+ACTIVITY_LOG_BUFFERED = str(os.environ.get('ACTIVITY_LOG_BUFFERED', 'False')).lower() in ('1', 'true', 'yes', 'on')
+ACTIVITY_LOG_BUFFER_SIZE = int(os.environ.get('ACTIVITY_LOG_BUFFER_SIZE', '50'))
+ACTIVITY_LOG_FLUSH_SECONDS = float(os.environ.get('ACTIVITY_LOG_FLUSH_SECONDS', '2'))
+
+
+# Request profiling and /api/metrics (core/middleware.py, core/metrics.py)
+REQUEST_PROFILING_ENABLED = str(os.environ.get('REQUEST_PROFILING_ENABLED', 'False')).lower() in ('1', 'true', 'yes', 'on')
+REQUEST_PROFILING_SLOW_MS = float(os.environ.get('REQUEST_PROFILING_SLOW_MS', '500'))
+REQUEST_PROFILING_SLOW_LOG = os.environ.get('REQUEST_PROFILING_SLOW_LOG', str(BASE_DIR / 'logs' / 'slow_requests.jsonl'))
+REQUEST_PROFILING_TOP_QUERIES = 5
+METRICS_ENABLED = REQUEST_PROFILING_ENABLED
+# Bearer token for Prometheus scrapers; admins can also read /api/metrics with their session
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 